@@ -2,10 +2,13 @@ from fastapi import HTTPException, UploadFile, BackgroundTasks
 from sqlalchemy.orm import Session
 import pandas as pd
 import logging
-from typing import Dict, Optional
+from typing import Any, AsyncIterator, Dict, Optional
 from .ai_service import AiService
 from . import chart as chart_api
+from utils.executor import run_blocking
+from utils.llm_usage import LLMUsage, save_usage
 import io
+import json
 
 logger = logging.getLogger(__name__)
 
@@ -46,24 +49,26 @@ def validate_file(file: UploadFile):
     if not any(file.filename.endswith(t) for t in allowed_types):
         raise HTTPException(status_code=400, detail="不支持的文件类型，仅支持CSV和Excel文件")
 
-def gen_chart_sync(
+async def gen_chart_sync(
     db: Session,
     file: UploadFile,
     user_id: int,
     goal: str,
     name: Optional[str] = None,
-    chart_type: Optional[str] = None
+    chart_type: Optional[str] = None,
+    bypass_cache: bool = False
 ) -> Dict:
-    """同步生成图表"""
+    """同步生成图表（等待AI返回结果，调用期间不阻塞事件循环），bypass_cache 为 True 时不使用缓存的结果"""
+    usage = LLMUsage("generate_chart", user_id)
     try:
         # 1. 验证文件
         validate_file(file)
         
         # 2. 处理文件数据
-        csv_data = process_file(file)
+        csv_data = await run_blocking(process_file, file)
         
         # 3. 调用AI生成图表
-        ai_result = ai_service.generate_chart(goal, chart_type, csv_data)
+        ai_result = await ai_service.generate_chart(goal, chart_type, csv_data, use_cache=not bypass_cache, usage=usage)
         
         # 4. 创建图表记录
         chart_data = {
@@ -78,7 +83,8 @@ def gen_chart_sync(
             "user_id": user_id,
             "is_delete": 0
         }
-        chart_id = chart_api.create_chart(db, chart_data, user_id)
+        chart_id = await run_blocking(chart_api.create_chart, db, chart_data, user_id)
+        await run_blocking(save_usage, db, usage, chart_id)
         
         # 5. 返回结果
         return {
@@ -89,19 +95,108 @@ def gen_chart_sync(
         
     except Exception as e:
         logger.error(f"生成图表失败: {str(e)}")
+        usage.status = 'failed'
+        await run_blocking(save_usage, db, usage)
         raise HTTPException(status_code=500, detail=f"生成图表失败: {str(e)}")
 
+def _sse(event: str, data: Any) -> str:
+    """格式化一条 Server-Sent Events 消息"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+async def gen_chart_stream(
+    db: Session,
+    file: UploadFile,
+    user_id: int,
+    goal: str,
+    name: Optional[str] = None,
+    chart_type: Optional[str] = None,
+    bypass_cache: bool = False
+) -> AsyncIterator[str]:
+    """
+    流式生成图表，返回 Server-Sent Events 消息流
+    文件校验和读取在返回消息流之前完成，失败时直接抛出 HTTPException
+    """
+    # 1. 验证文件
+    validate_file(file)
+    
+    # 2. 处理文件数据
+    csv_data = await run_blocking(process_file, file)
+    
+    return _gen_chart_events(db, csv_data, user_id, goal, name, chart_type, bypass_cache)
+
+async def _gen_chart_events(
+    db: Session,
+    csv_data: str,
+    user_id: int,
+    goal: str,
+    name: Optional[str],
+    chart_type: Optional[str],
+    bypass_cache: bool
+) -> AsyncIterator[str]:
+    """
+    转发AI生成过程中的事件，完成后创建图表记录
+    
+    事件：
+    - chartType / chartData: 图表类型和 ECharts 配置到达时发送一次
+    - genResult: 分析结论的增量文本
+    - done: 图表记录创建完成，数据为图表ID和完整结果
+    - error: 生成或保存失败，响应已经开始，错误只能在消息流中返回
+    """
+    usage = LLMUsage("generate_chart", user_id)
+    try:
+        # 3. 调用AI生成图表，转发中间事件
+        ai_result = None
+        async for event, data in ai_service.generate_chart_stream(goal, chart_type, csv_data,
+                                                                  use_cache=not bypass_cache, usage=usage):
+            if event == "result":
+                ai_result = data
+            else:
+                yield _sse(event, data)
+        
+        # 4. 创建图表记录
+        chart_data = {
+            "name": name or "AI生成图表",
+            "goal": goal,
+            "chart_type": ai_result["chartType"],
+            "chart_data": csv_data,
+            "gen_chart": ai_result["chartData"],
+            "gen_result": ai_result["genResult"],
+            "status": "succeeded",
+            "exec_message": None,
+            "user_id": user_id,
+            "is_delete": 0
+        }
+        chart_id = await run_blocking(chart_api.create_chart, db, chart_data, user_id)
+        await run_blocking(save_usage, db, usage, chart_id)
+        
+        # 5. 返回结果
+        yield _sse("done", {
+            "id": chart_id,
+            "genType": ai_result["chartType"],
+            "genChart": ai_result["chartData"],
+            "genResult": ai_result["genResult"]
+        })
+        
+    except Exception as e:
+        logger.error(f"流式生成图表失败: {str(e)}")
+        usage.status = 'failed'
+        await run_blocking(save_usage, db, usage)
+        yield _sse("error", {"message": f"生成图表失败: {str(e)}"})
+
 async def gen_chart_async_task(
     db: Session,
     chart_id: int,
     csv_data: str,
     goal: str,
-    chart_type: Optional[str] = None
+    chart_type: Optional[str] = None,
+    bypass_cache: bool = False,
+    user_id: Optional[int] = None
 ):
-    """异步生成图表的后台任务"""
+    """异步生成图表的后台任务，在事件循环中等待AI结果，数据库更新在线程池中执行"""
+    usage = LLMUsage("generate_chart", user_id)
     try:
         # 1. 调用AI生成图表
-        ai_result = ai_service.generate_chart(goal, chart_type, csv_data)
+        ai_result = await ai_service.generate_chart(goal, chart_type, csv_data, use_cache=not bypass_cache, usage=usage)
         
         # 2. 更新图表记录
         chart_data = {
@@ -111,17 +206,20 @@ async def gen_chart_async_task(
             "gen_result": ai_result["genResult"],
             "status": "succeeded"
         }
-        chart_api.update_chart(db, chart_data, None, True)
+        await run_blocking(chart_api.update_chart, db, chart_data, None, True)
+        await run_blocking(save_usage, db, usage, chart_id)
         
     except Exception as e:
         logger.error(f"异步生成图表失败: {str(e)}")
+        usage.status = 'failed'
         # 更新图表状态为失败
         chart_data = {
             "id": chart_id,
             "status": "failed",
             "exec_message": str(e)
         }
-        chart_api.update_chart(db, chart_data, None, True)
+        await run_blocking(chart_api.update_chart, db, chart_data, None, True)
+        await run_blocking(save_usage, db, usage, chart_id)
 
 def gen_chart_async(
     db: Session,
@@ -130,7 +228,8 @@ def gen_chart_async(
     user_id: int,
     goal: str,
     name: Optional[str] = None,
-    chart_type: Optional[str] = None
+    chart_type: Optional[str] = None,
+    bypass_cache: bool = False
 ) -> Dict:
     """异步生成图表"""
     try:
@@ -156,7 +255,9 @@ def gen_chart_async(
             chart_id,
             csv_data,
             goal,
-            chart_type
+            chart_type,
+            bypass_cache,
+            user_id
         )
         
         # 5. 返回图表ID
@@ -1,9 +1,16 @@
-from typing import Dict, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 import json
 import logging
-from openai import OpenAI
 from datetime import datetime
 from utils.rag_utils import RAGService
+from utils.llm_client import LLMClient, llm_client
+from utils.llm_cache import LLMCache, llm_cache, cache_key, normalize_csv
+from utils.executor import run_blocking
+from utils.json_stream import JsonStreamParser
+from utils.data_profile import DataProfiler, data_profiler
+from utils.llm_usage import LLMUsage
+from utils.tokens import fit_prompt
+from config import LLM_PROMPT_BUDGETS
 
 logger = logging.getLogger(__name__)
 
@@ -63,47 +70,146 @@ AI服务API模块
 class AiService:
     """AI服务类,处理与AI模型的交互"""
     
-    def __init__(self):
-        # DeepSeek API配置
-        self.api_key = "sk-your-key"
-        self.base_url = "https://api.deepseek.com/v1"
-        self.client = OpenAI(api_key=self.api_key, base_url=self.base_url)
+    # 图表生成提示语模板版本，修改 _build_prompt 或系统提示语后加一，使缓存的旧结果失效
+    PROMPT_VERSION = 2
+    
+    # 提示语超出 token 上限时依次截断的部分：先截断政策内容，再截断数据（数据已按 LLM_PROMPT_DATA_TOKENS 压缩）
+    TRUNCATE_ORDER = ("policy", "data")
+    
+    SYSTEM_PROMPT = "你是一个专业的数据分析和可视化助手，擅长使用 Streamlit 生成图表代码。你需要生成完整可运行的 Python 代码，包含所有必要的导入语句和数据处理步骤。"
+    
+    def __init__(self, llm: Optional[LLMClient] = None, cache: Optional[LLMCache] = None,
+                 profiler: Optional[DataProfiler] = None, prompt_budget: Optional[int] = None):
+        # 大模型客户端（DeepSeek），默认使用全进程共用的连接池和并发上限
+        self.llm = llm or llm_client
+        # 图表生成结果缓存
+        self.cache = cache or llm_cache
+        # 上传数据超出 token 预算时生成数据概要和代表性样本
+        self.profiler = profiler or data_profiler
+        # 图表生成提示语的 token 上限
+        self.prompt_budget = prompt_budget or LLM_PROMPT_BUDGETS["generate_chart"]
         
         # 初始化RAG服务
         self.rag_service = RAGService()
         
-    def generate_chart(self, goal: str, chart_type: Optional[str], csv_data: str) -> Dict[str, str]:
-        """调用AI生成图表和分析结论"""
+    async def generate_chart(self, goal: str, chart_type: Optional[str], csv_data: str, use_cache: bool = True,
+                             usage: Optional[LLMUsage] = None) -> Dict[str, str]:
+        """
+        调用AI生成图表和分析结论
+        相同数据、分析目标、图表类型和政策内容的结果会被缓存，use_cache=False 时跳过缓存重新生成
+        传入 usage 时填写提示语 token 数、调用用量和是否命中缓存
+        """
         try:
-            # 使用RAG检索相关政策
-            policy_context = self.rag_service.query(goal)
-            
-            # 构造提示语
-            prompt = self._build_prompt(goal, chart_type, csv_data, policy_context)
+            key, policy_context = await self._prepare(goal, chart_type, csv_data)
+            if use_cache:
+                cached = await self.cache.aget(key)
+                if cached is not None:
+                    logger.info(f"AI生成图表命中缓存: {key}")
+                    self._mark_cached(usage)
+                    return cached
             
             # 调用 DeepSeek API
-            response = self.client.chat.completions.create(
-                model="deepseek-chat",
-                messages=[
-                    {"role": "system", "content": "你是一个专业的数据分析和可视化助手，擅长使用 Streamlit 生成图表代码。你需要生成完整可运行的 Python 代码，包含所有必要的导入语句和数据处理步骤。"},
-                    {"role": "user", "content": prompt}
-                ],
-                stream=False
-            )
-            
-            # 获取响应内容
-            response_text = response.choices[0].message.content
+            messages = await self._build_messages(goal, chart_type, csv_data, policy_context, usage)
+            response_text = await self.llm.chat(messages, usage=usage)
             
-            # 解析响应
+            # 解析响应，解析成功的结果写入缓存
             result = self.parse_ai_response(response_text)
+            await self.cache.aset(key, result)
             return result
             
         except Exception as e:
             logger.error(f"AI生成图表失败: {str(e)}")
+            self._mark_failed(usage)
+            raise Exception(f"AI生成图表失败: {str(e)}")
+    
+    async def generate_chart_stream(self, goal: str, chart_type: Optional[str], csv_data: str, use_cache: bool = True,
+                                    usage: Optional[LLMUsage] = None) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        流式调用AI生成图表和分析结论
+        
+        依次产生 (事件名, 数据)：
+        - chartType / chartData: 字段完整到达后产生一次
+        - genResult: 分析结论的增量文本，可能产生多次
+        - result: 最后产生一次，数据为校验后的完整结果（与 generate_chart 的返回值相同）
+        """
+        try:
+            key, policy_context = await self._prepare(goal, chart_type, csv_data)
+            if use_cache:
+                cached = await self.cache.aget(key)
+                if cached is not None:
+                    logger.info(f"AI生成图表命中缓存: {key}")
+                    self._mark_cached(usage)
+                    for field in ("chartType", "chartData", "genResult"):
+                        yield field, cached[field]
+                    yield "result", cached
+                    return
+            
+            parser = JsonStreamParser(stream_fields=("genResult",))
+            parts = []
+            messages = await self._build_messages(goal, chart_type, csv_data, policy_context, usage)
+            async for text in self.llm.chat_stream(messages, usage=usage):
+                parts.append(text)
+                for kind, field, value in parser.feed(text):
+                    # genResult 已按增量文本发送过，不再发送完整值；字符串形式的 chartData 留给最终解析
+                    if kind == "delta" or field == "chartType" or (field == "chartData" and isinstance(value, dict)):
+                        yield field, value
+            
+            # 对完整回复做与非流式调用相同的解析和校验
+            result = self.parse_ai_response("".join(parts))
+            await self.cache.aset(key, result)
+            yield "result", result
+            
+        except Exception as e:
+            logger.error(f"AI流式生成图表失败: {str(e)}")
+            self._mark_failed(usage)
             raise Exception(f"AI生成图表失败: {str(e)}")
     
-    def _build_prompt(self, goal: str, chart_type: Optional[str], csv_data: str, policy_context: str) -> str:
-        """构建AI提示语"""
+    async def _prepare(self, goal: str, chart_type: Optional[str], csv_data: str) -> Tuple[str, str]:
+        """检索相关政策，返回缓存键和政策内容"""
+        # 使用RAG检索相关政策（同步的向量检索在线程池中执行）
+        policy_context = await run_blocking(self.rag_service.query, goal)
+        key = cache_key("generate_chart", self.PROMPT_VERSION, self.llm.model, self.profiler.token_budget,
+                        self.prompt_budget, normalize_csv(csv_data), goal, chart_type, policy_context)
+        return key, policy_context
+    
+    def _mark_cached(self, usage: Optional[LLMUsage]):
+        if usage is not None:
+            usage.model = self.llm.model
+            usage.cached = True
+    
+    def _mark_failed(self, usage: Optional[LLMUsage]):
+        """调用成功但回复解析失败、提示语超出上限等情况同样记为失败"""
+        if usage is not None:
+            usage.status = 'failed'
+    
+    async def _build_messages(self, goal: str, chart_type: Optional[str], csv_data: str, policy_context: str,
+                              usage: Optional[LLMUsage] = None) -> List[Dict[str, str]]:
+        """压缩上传数据并在 token 上限内构建对话消息，只在未命中缓存时调用"""
+        # 数据概要和 token 计数都是 CPU 计算，在线程池中执行
+        messages, prompt_tokens = await run_blocking(self._fit_messages, goal, chart_type, csv_data, policy_context)
+        if usage is not None:
+            usage.prompt_tokens = prompt_tokens
+        return messages
+    
+    def _fit_messages(self, goal: str, chart_type: Optional[str], csv_data: str,
+                      policy_context: str) -> Tuple[List[Dict[str, str]], int]:
+        profile = self.profiler.summarize(csv_data)
+        
+        def build(sections: Dict[str, str]) -> List[Dict[str, str]]:
+            return [
+                {"role": "system", "content": self.SYSTEM_PROMPT},
+                {"role": "user", "content": self._build_prompt(goal, chart_type, sections["data"], sections["policy"],
+                                                               summarized=profile["summarized"])}
+            ]
+        
+        return fit_prompt(build, {"policy": policy_context, "data": profile["text"]},
+                          self.prompt_budget, self.TRUNCATE_ORDER)
+    
+    def _build_prompt(self, goal: str, chart_type: Optional[str], csv_data: str, policy_context: str,
+                      summarized: bool = False) -> str:
+        """构建AI提示语，summarized 为 True 时 csv_data 为数据概要和代表性样本"""
+        data_title = "数据概要（原始数据过大，以下为统计信息、分组汇总和代表性样本，请优先依据汇总数据作图）" \
+            if summarized else "数据内容"
         prompt = f"""请根据以下数据和要求生成 ECharts 图表代码：
 
 1. 分析目标：{goal}
@@ -111,7 +217,7 @@ class AiService:
 2. 相关政策和规定：
 {policy_context}
 
-3. 数据内容：
+3. {data_title}：
 {csv_data}
 
 """
@@ -60,9 +60,9 @@ from database import models
 import numpy as np
 from datetime import datetime, timedelta
 import logging
-from geopy.distance import geodesic
 from sklearn.ensemble import RandomForestRegressor
-from typing import List
+from utils.data_snapshot import data_center_snapshot
+from utils.executor import run_blocking, run_cpu
 
 logger = logging.getLogger(__name__)
 
@@ -75,23 +75,13 @@ async def analyze_geo_fence(
     执行地理围栏分析
     """
     try:
-        # 获取所有机房数据
-        data_centers = db.query(models.DataCenter).all()
-        
-        # 筛选范围内的机房
-        compliant_centers = []
-        for dc in data_centers:
-            distance = geodesic(
-                center, 
-                (dc.latitude, dc.longitude)
-            ).meters
-            
-            if distance <= radius:
-                compliant_centers.append(dc)
+        # 通过空间索引筛选范围内的机房（半径单位为米）
+        snapshot = await run_blocking(data_center_snapshot.get, db)
+        indices, _ = snapshot.index.query_radius(center[0], center[1], radius / 1000).neighbors_of(0)
         
         # 计算统计数据
-        if compliant_centers:
-            prices = [dc.rent_price for dc in compliant_centers]
+        if len(indices):
+            prices = snapshot.annual_rent[indices]
             rent_stats = {
                 "median": float(np.median(prices)),
                 "max": float(np.max(prices)),
@@ -109,7 +99,7 @@ async def analyze_geo_fence(
         heatmap_data = [[0.0] * 10 for _ in range(10)]  # 10x10网格
         
         return {
-            "compliant_count": len(compliant_centers),
+            "compliant_count": len(indices),
             "rent_stats": rent_stats,
             "heatmap_data": heatmap_data
         }
@@ -118,57 +108,55 @@ async def analyze_geo_fence(
         logger.error(f"地理围栏分析失败: {str(e)}")
         raise HTTPException(status_code=500, detail=f"地理围栏分析失败: {str(e)}")
 
+def fit_rent_model(X: np.ndarray, y: np.ndarray, new_X: np.ndarray) -> Dict[str, Any]:
+    """
+    训练随机森林租金模型并预测新机房租金
+    CPU 密集计算，在进程池中执行
+    """
+    model = RandomForestRegressor(n_estimators=100)
+    model.fit(X, y)
+    
+    # 预测新机房的租金
+    estimated_price = float(model.predict(new_X)[0])
+    
+    # 获取特征重要性
+    feature_importance = model.feature_importances_
+    factors = {
+        "area": float(feature_importance[0]),
+        "location": float(feature_importance[1] + feature_importance[2])
+    }
+    
+    # 计算置信度（这里用简化的方法）
+    confidence = float(model.score(X, y))
+    
+    return {
+        "estimated_price": estimated_price,
+        "factors": factors,
+        "confidence": confidence
+    }
+
 async def evaluate_model(db: Session, data: Dict[str, Any]) -> Dict[str, Any]:
     """
     执行多维租金评估模型
     """
     try:
-        # 获取历史数据
-        historical_data = db.query(models.DataCenter).all()
+        # 从存量机房快照获取历史数据
+        snapshot = await run_blocking(data_center_snapshot.get, db)
         
-        if not historical_data:
+        if len(snapshot) == 0:
             raise ValueError("没有足够的历史数据进行评估")
             
-        # 准备训练数据
-        X = []  # 特征矩阵
-        y = []  # 目标变量（租金）
-        
-        for dc in historical_data:
-            X.append([
-                dc.area,
-                dc.latitude,
-                dc.longitude
-            ])
-            y.append(dc.rent_price)
-            
-        # 训练随机森林模型
-        model = RandomForestRegressor(n_estimators=100)
-        model.fit(X, y)
-        
-        # 预测新机房的租金
-        new_X = [[
+        # 准备训练数据：特征矩阵和目标变量（年租金）
+        X = np.column_stack((snapshot.area, snapshot.latitude, snapshot.longitude))
+        y = snapshot.annual_rent
+        new_X = np.array([[
             data["area"],
             data["coordinates"][0],
             data["coordinates"][1]
-        ]]
-        
-        estimated_price = float(model.predict(new_X)[0])
-        
-        # 获取特征重要性
-        feature_importance = model.feature_importances_
-        factors = {
-            "area": float(feature_importance[0]),
-            "location": float(feature_importance[1] + feature_importance[2])
-        }
+        ]])
         
-        # 计算置信度（这里用简化的方法）
-        confidence = float(model.score(X, y))
-        
-        return {
-            "estimated_price": estimated_price,
-            "factors": factors,
-            "confidence": confidence
-        }
+        # 模型训练放到进程池执行，不阻塞事件循环
+        return await run_cpu(fit_rent_model, X, y, new_X)
         
     except Exception as e:
         logger.error(f"租金评估失败: {str(e)}")
@@ -184,17 +172,15 @@ async def predict_trend(
     预测租金趋势
     """
     try:
-        # 获取历史数据
-        historical_data = db.query(models.DataCenter)\
-            .filter(models.DataCenter.latitude.between(latitude-0.1, latitude+0.1))\
-            .filter(models.DataCenter.longitude.between(longitude-0.1, longitude+0.1))\
-            .all()
+        # 从存量机房快照筛选周边机房
+        snapshot = await run_blocking(data_center_snapshot.get, db)
+        nearby = (np.abs(snapshot.latitude - latitude) <= 0.1) & (np.abs(snapshot.longitude - longitude) <= 0.1)
             
-        if not historical_data:
+        if not nearby.any():
             raise ValueError("没有足够的历史数据进行预测")
             
         # 计算基准租金（使用周边机房的平均值）
-        base_price = np.mean([dc.rent_price for dc in historical_data])
+        base_price = float(np.mean(snapshot.annual_rent[nearby]))
         
         # 生成预测数据
         # 这里使用简单的时间序列模型，实际可能需要更复杂的模型
@@ -43,13 +43,16 @@
 """
 
 from database import crud
+from database.connection import DatabaseConnection
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
-import bcrypt
 from jose import jwt
 from datetime import datetime, timedelta
+from typing import Callable
 import logging
 from config import JWT_SECRET_KEY, JWT_ALGORITHM, JWT_ACCESS_TOKEN_EXPIRE_MINUTES
+from utils.executor import run_blocking
+from utils.password import password_hasher, PasswordHasherBusy
 
 logger = logging.getLogger(__name__)
 
@@ -70,23 +73,41 @@ def create_access_token(data: dict):
     encoded_jwt = jwt.encode(to_encode, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
     return encoded_jwt
 
-def upgrade_password_to_bcrypt(db: Session, user, plain_password: str):
-    """将明文密码升级为bcrypt加密"""
+def upgrade_password_hash(user_id: int, plain_password: str, session_factory: Callable[[], Session]):
+    """重新计算密码哈希并保存，在哈希线程池中执行"""
     try:
-        hashed_password = bcrypt.hashpw(
-            plain_password.encode(), 
-            bcrypt.gensalt()
-        ).decode()
-        crud.update_user_password(db, user.id, hashed_password)
+        hashed_password = password_hasher.hash_sync(plain_password)
+        # 哈希计算完成后再取数据库连接
+        db = session_factory()
+        try:
+            crud.update_user_password(db, user_id, hashed_password)
+        finally:
+            db.close()
+        logger.info(f"Password hash upgraded for user ID: {user_id}")
     except Exception as e:
         logger.error(f"Failed to upgrade password: {str(e)}")
 
-def login_user(db: Session, user_account: str, password: str):
+def schedule_password_upgrade(user_id: int, plain_password: str, session_factory: Callable[[], Session]):
+    """
+    在后台将明文密码或成本因子较低的哈希升级为当前配置的bcrypt哈希，不等待结果
+    哈希线程池繁忙时跳过，下次登录再升级
+    """
+    try:
+        password_hasher.submit(upgrade_password_hash, user_id, plain_password, session_factory)
+    except PasswordHasherBusy:
+        logger.warning(f"Password hasher busy, skip upgrading password for user ID: {user_id}")
+
+async def login_user(
+    db: Session,
+    user_account: str,
+    password: str,
+    session_factory: Callable[[], Session] = DatabaseConnection.get_session
+):
     """用户登录"""
     logger.info(f"Attempting login for user: {user_account}")
     
     # 获取用户信息
-    user = crud.get_user_by_account(db, user_account)
+    user = await run_blocking(crud.get_user_by_account, db, user_account)
     if not user:
         logger.error(f"User not found: {user_account}")
         raise HTTPException(status_code=400, detail="账号或密码错误")
@@ -96,31 +117,27 @@ def login_user(db: Session, user_account: str, password: str):
         logger.error(f"User is deleted: {user_account}")
         raise HTTPException(status_code=400, detail="账号不存在")
     
-    # 验证密码
+    # 验证密码，bcrypt 计算在哈希线程池中执行
     try:
-        # 首先尝试验证加密密码
-        if bcrypt.checkpw(password.encode(), user.userPassword.encode()):
+        verified = await password_hasher.verify(password, user.userPassword)
+        if verified:
             logger.info("Password verified successfully (bcrypt)")
-            pass
-        else:
-            # 如果密码不正确，检查是否是明文密码
-            if user.userPassword == password:
-                logger.info("Password verified successfully (plaintext)")
-                # 如果是明文密码匹配，则升级为bcrypt加密
-                upgrade_password_to_bcrypt(db, user, password)
-            else:
-                logger.error("Password verification failed")
-                raise HTTPException(status_code=400, detail="账号或密码错误")
     except ValueError:
-        # 如果bcrypt.checkpw失败（可能是因为密码格式不是bcrypt），
-        # 检查是否是明文密码
-        if user.userPassword == password:
+        # 密码格式不是bcrypt，检查是否是明文密码
+        verified = user.userPassword == password
+        if verified:
             logger.info("Password verified successfully (plaintext)")
-            # 如果是明文密码匹配，则升级为bcrypt加密
-            upgrade_password_to_bcrypt(db, user, password)
-        else:
-            logger.error("Password verification failed")
-            raise HTTPException(status_code=400, detail="账号或密码错误")
+    except PasswordHasherBusy:
+        logger.warning("Password hasher queue is full, rejecting login")
+        raise HTTPException(status_code=503, detail="登录请求过多，请稍后重试")
+    
+    if not verified:
+        logger.error("Password verification failed")
+        raise HTTPException(status_code=400, detail="账号或密码错误")
+    
+    # 明文密码或成本因子低于配置值时，在后台升级为当前配置的bcrypt哈希
+    if password_hasher.needs_rehash(user.userPassword):
+        schedule_password_upgrade(user.id, password, session_factory)
     
     # 创建token
     token_data = {"sub": str(user.id), "role": user.userRole}
@@ -147,10 +164,10 @@ def login_user(db: Session, user_account: str, password: str):
     logger.info("Login successful")
     return response_data
 
-def register_user(db: Session, user_data: dict):
+async def register_user(db: Session, user_data: dict):
     """用户注册"""
     # 检查账号是否已存在
-    if crud.get_user_by_account(db, user_data["userAccount"]):
+    if await run_blocking(crud.get_user_by_account, db, user_data["userAccount"]):
         raise HTTPException(status_code=400, detail="账号已存在")
     
     # 如果没有提供用户名，使用账号作为默认用户名
@@ -159,17 +176,17 @@ def register_user(db: Session, user_data: dict):
     
     # 对密码进行bcrypt加密
     try:
-        user_data["userPassword"] = bcrypt.hashpw(
-            user_data["userPassword"].encode(),
-            bcrypt.gensalt()
-        ).decode()
+        user_data["userPassword"] = await password_hasher.hash(user_data["userPassword"])
+    except PasswordHasherBusy:
+        logger.warning("Password hasher queue is full, rejecting registration")
+        raise HTTPException(status_code=503, detail="注册请求过多，请稍后重试")
     except Exception as e:
         logger.error(f"密码加密失败: {str(e)}")
         raise HTTPException(status_code=500, detail="注册失败")
     
     # 创建用户
     try:
-        user = crud.create_user(db, user_data)
+        user = await run_blocking(crud.create_user, db, user_data)
         
         # 创建token
         token = create_access_token({"sub": str(user.id), "role": user.userRole})
@@ -53,51 +53,62 @@
 - 丰富的交互功能
 """
 
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.orm import Session, undefer
+from sqlalchemy import func, select, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException
 import logging
 from typing import Dict, Any, List, Optional
 from database import models
 from datetime import datetime
 import json
+from database.blob_store import get_blob_async, put_blob, release_blob
+from database.fulltext import apply_chart_match
+from utils.pagination import NUMBER, decode_cursor, split_page, get_cached_total, cache_total, invalidate_totals
 
 logger = logging.getLogger(__name__)
 
+def _build_chart(db: Session, chart_data: Dict[str, Any], user_id: int) -> models.Chart:
+    """根据请求数据构建图表记录，id 由数据库自增生成，原始数据保存到 chart_blob"""
+    # 处理gen_chart字段，确保是字符串格式
+    gen_chart = chart_data.get("gen_chart")
+    if isinstance(gen_chart, dict):
+        gen_chart = json.dumps(gen_chart, ensure_ascii=False)
+    
+    csv_data = chart_data.get("chart_data")
+    return models.Chart(
+        name=chart_data.get("name"),
+        goal=chart_data.get("goal"),
+        chart_data_hash=put_blob(db, csv_data) if csv_data else None,
+        chart_type=chart_data.get("chart_type"),
+        gen_chart=gen_chart,
+        gen_result=chart_data.get("gen_result"),
+        status=chart_data.get("status", "waiting"),  # 默认状态为waiting
+        exec_message=chart_data.get("exec_message"),
+        user_id=user_id,
+        is_delete=0
+    )
+
+def _replace_chart_data(db: Session, chart: models.Chart, csv_data: Optional[str]):
+    """替换图表的原始数据，释放原数据的引用"""
+    new_hash = put_blob(db, csv_data) if csv_data else None
+    release_blob(db, chart.chart_data_hash)
+    chart.chart_data_hash = new_hash
+    # 清空迁移前保存在 chart 表中的历史数据
+    chart.chart_data = None
+
 def create_chart(db: Session, chart_data: Dict[str, Any], user_id: int) -> int:
     """
     创建新图表
     返回创建的图表ID
     """
-    logger.info(f"开始创建图表: user_id={user_id}, chart_data={chart_data}")
+    logger.info(f"开始创建图表: user_id={user_id}, name={chart_data.get('name')}")
     try:
-        # 获取当前最大id
-        max_id = db.query(func.max(models.Chart.id)).scalar()
-        new_id = 1 if max_id is None else max_id + 1
-        
-        # 处理gen_chart字段，确保是字符串格式
-        gen_chart = chart_data.get("gen_chart")
-        if isinstance(gen_chart, dict):
-            gen_chart = json.dumps(gen_chart, ensure_ascii=False)
-        
-        # 创建图表记录
-        chart = models.Chart(
-            id=new_id,
-            name=chart_data.get("name"),
-            goal=chart_data.get("goal"),
-            chart_data=chart_data.get("chart_data"),
-            chart_type=chart_data.get("chart_type"),
-            gen_chart=gen_chart,
-            gen_result=chart_data.get("gen_result"),
-            status=chart_data.get("status", "waiting"),  # 默认状态为waiting
-            exec_message=chart_data.get("exec_message"),
-            user_id=user_id,
-            is_delete=0
-        )
-        logger.info(f"图表对象创建成功，准备添加到数据库")
+        # 创建图表记录，id 由数据库自增生成，并发创建不会冲突
+        chart = _build_chart(db, chart_data, user_id)
         db.add(chart)
         db.commit()
-        db.refresh(chart)
+        invalidate_totals(models.Chart.__tablename__)
         logger.info(f"图表创建成功，ID: {chart.id}")
         return chart.id
     except Exception as e:
@@ -105,6 +116,23 @@ def create_chart(db: Session, chart_data: Dict[str, Any], user_id: int) -> int:
         logger.error(f"创建图表失败: {str(e)}")
         raise HTTPException(status_code=500, detail=f"创建图表失败: {str(e)}")
 
+def create_charts(db: Session, charts_data: List[Dict[str, Any]], user_id: int) -> List[int]:
+    """
+    在一个事务中批量创建图表
+    返回创建的图表ID列表，顺序与 charts_data 一致
+    """
+    try:
+        charts = [_build_chart(db, chart_data, user_id) for chart_data in charts_data]
+        db.add_all(charts)
+        db.commit()
+        invalidate_totals(models.Chart.__tablename__)
+        logger.info(f"批量创建图表成功，共 {len(charts)} 个")
+        return [chart.id for chart in charts]
+    except Exception as e:
+        db.rollback()
+        logger.error(f"批量创建图表失败: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"批量创建图表失败: {str(e)}")
+
 def delete_chart(db: Session, chart_id: int, user_id: int, is_admin: bool = False) -> Dict[str, Any]:
     """
     删除图表（逻辑删除）
@@ -123,6 +151,7 @@ def delete_chart(db: Session, chart_id: int, user_id: int, is_admin: bool = Fals
         chart.is_delete = True
         chart.update_time = datetime.now()
         db.commit()
+        invalidate_totals(models.Chart.__tablename__)
         
         return {"success": True, "message": "删除成功"}
     except HTTPException:
@@ -152,7 +181,7 @@ def update_chart(db: Session, chart_data: Dict[str, Any], user_id: int, is_admin
         if "goal" in chart_data:
             chart.goal = chart_data["goal"]
         if "chart_data" in chart_data:
-            chart.chart_data = chart_data["chart_data"]
+            _replace_chart_data(db, chart, chart_data["chart_data"])
         if "chart_type" in chart_data:
             chart.chart_type = chart_data["chart_type"]
         if "gen_chart" in chart_data:
@@ -166,6 +195,7 @@ def update_chart(db: Session, chart_data: Dict[str, Any], user_id: int, is_admin
         
         chart.update_time = datetime.now()
         db.commit()
+        invalidate_totals(models.Chart.__tablename__)
         
         return {"success": True, "message": "更新成功"}
     except HTTPException:
@@ -195,7 +225,7 @@ def edit_chart(db: Session, chart_data: Dict[str, Any], user_id: int) -> Dict[st
         if "goal" in chart_data:
             chart.goal = chart_data["goal"]
         if "chartData" in chart_data:
-            chart.chart_data = chart_data["chartData"]
+            _replace_chart_data(db, chart, chart_data["chartData"])
         if "chartType" in chart_data:
             chart.chart_type = chart_data["chartType"]
         
@@ -203,6 +233,7 @@ def edit_chart(db: Session, chart_data: Dict[str, Any], user_id: int) -> Dict[st
         # 如果用户修改了数据，重置状态为待生成
         chart.status = 0
         db.commit()
+        invalidate_totals(models.Chart.__tablename__)
         
         return {"success": True, "message": "编辑成功"}
     except HTTPException:
@@ -212,82 +243,184 @@ def edit_chart(db: Session, chart_data: Dict[str, Any], user_id: int) -> Dict[st
         logger.error(f"编辑图表失败: {str(e)}")
         raise HTTPException(status_code=500, detail=f"编辑图表失败: {str(e)}")
 
-def get_chart_by_id(db: Session, chart_id: int) -> Dict[str, Any]:
+# 详情接口中延迟加载的大字段：返回字段名 -> 模型列
+CHART_HEAVY_FIELDS = {
+    "chartData": models.Chart.chart_data,
+    "genChart": models.Chart.gen_chart,
+    "genResult": models.Chart.gen_result,
+}
+
+async def get_chart_by_id(db: AsyncSession, chart_id: int, fields: Optional[List[str]] = None) -> Dict[str, Any]:
     """
-    获取图表详情
+    获取图表详情（异步会话）
+    fields 为需要返回的大字段（chartData/genChart/genResult），为 None 时全部返回，
+    未列出的大字段不从数据库读取
     """
+    if fields is None:
+        fields = list(CHART_HEAVY_FIELDS)
+    unknown = [field for field in fields if field not in CHART_HEAVY_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"不支持的字段: {','.join(unknown)}，可选: {','.join(CHART_HEAVY_FIELDS)}")
     try:
-        # 查询图表
-        chart = db.query(models.Chart).filter(models.Chart.id == chart_id, models.Chart.is_delete == 0).first()
+        # 查询图表，只加载请求的大字段
+        chart = await db.scalar(
+            select(models.Chart)
+            .where(models.Chart.id == chart_id, models.Chart.is_delete == 0)
+            .options(*[undefer(CHART_HEAVY_FIELDS[field]) for field in fields])
+        )
         if not chart:
             raise HTTPException(status_code=404, detail="图表不存在或已删除")
         
         # 转换为字典
-        return {
+        result = {
             "id": chart.id,
             "name": chart.name,
             "goal": chart.goal,
-            "chartData": chart.chart_data,
             "chartType": chart.chart_type,
-            "genChart": chart.gen_chart,
-            "genResult": chart.gen_result,
             "status": chart.status,
             "execMessage": chart.exec_message,
             "userId": chart.user_id,
             "createTime": chart.create_time.strftime("%Y-%m-%d %H:%M:%S"),
             "updateTime": chart.update_time.strftime("%Y-%m-%d %H:%M:%S")
         }
+        for field in fields:
+            result[field] = getattr(chart, CHART_HEAVY_FIELDS[field].key)
+        # 原始数据保存在 chart_blob 中，迁移前的图表仍保存在 chart_data 列
+        if "chartData" in fields and chart.chart_data_hash:
+            result["chartData"] = await get_blob_async(db, chart.chart_data_hash)
+        return result
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"获取图表详情失败: {str(e)}")
         raise HTTPException(status_code=500, detail=f"获取图表详情失败: {str(e)}")
 
-def list_chart_by_page(db: Session, page: int, size: int, name: Optional[str] = None, status: Optional[str] = None, user_id: Optional[int] = None) -> Dict[str, Any]:
+def _chart_list_item(chart: models.Chart) -> Dict[str, Any]:
+    """列表接口返回的图表字段，不包含延迟加载的大字段"""
+    return {
+        "id": chart.id,
+        "name": chart.name,
+        "goal": chart.goal,
+        "chartType": chart.chart_type,
+        "status": chart.status,
+        "execMessage": chart.exec_message,
+        "userId": chart.user_id,
+        "createTime": chart.create_time.strftime("%Y-%m-%d %H:%M:%S"),
+        "updateTime": chart.update_time.strftime("%Y-%m-%d %H:%M:%S")
+    }
+
+async def list_chart_by_page(db: AsyncSession, page: int, size: int, name: Optional[str] = None, status: Optional[str] = None, user_id: Optional[int] = None,
+                             cursor: Optional[str] = None, with_total: bool = True) -> Dict[str, Any]:
     """
-    分页获取图表列表
+    分页获取图表列表（异步会话）
+    按 (create_time, id) 倒序排列；传入 cursor 时从游标之后开始读取，忽略 page
+    传入 name 时按名称和分析目标全文检索，结果按相关度排序（见 search_chart_by_page）
     """
+    if name:
+        return await search_chart_by_page(db, name, page, size, status, user_id, cursor=cursor, with_total=with_total)
     try:
         # 构建查询条件
-        query = db.query(models.Chart).filter(models.Chart.is_delete == 0)
+        conditions = [models.Chart.is_delete == 0]
         
-        if name:
-            query = query.filter(models.Chart.name.like(f"%{name}%"))
         if status is not None:
-            query = query.filter(models.Chart.status == status)
+            conditions.append(models.Chart.status == status)
         if user_id:
-            query = query.filter(models.Chart.user_id == user_id)
-        
-        # 统计总数
-        total = query.count()
+            conditions.append(models.Chart.user_id == user_id)
         
-        # 执行分页查询
-        charts = query.order_by(models.Chart.create_time.desc())\
-            .offset((page - 1) * size)\
-            .limit(size)\
-            .all()
+        # 统计总数，按查询条件缓存
+        total = None
+        if with_total:
+            total_key = (models.Chart.__tablename__, status, user_id)
+            total = get_cached_total(total_key)
+            if total is None:
+                total = await db.scalar(select(func.count()).select_from(models.Chart).where(*conditions))
+                cache_total(total_key, total)
         
-        # 转换为字典列表
-        items = []
-        for chart in charts:
-            items.append({
-                "id": chart.id,
-                "name": chart.name,
-                "goal": chart.goal,
-                "chartType": chart.chart_type,
-                "status": chart.status,
-                "execMessage": chart.exec_message,
-                "userId": chart.user_id,
-                "createTime": chart.create_time.strftime("%Y-%m-%d %H:%M:%S"),
-                "updateTime": chart.update_time.strftime("%Y-%m-%d %H:%M:%S")
-            })
+        # 执行分页查询，id 作为第二排序键保证顺序稳定
+        query = select(models.Chart).where(*conditions)\
+            .order_by(models.Chart.create_time.desc(), models.Chart.id.desc())
+        if cursor:
+            try:
+                last_time, last_id = decode_cursor(cursor, (datetime, int))
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            query = query.where(or_(
+                models.Chart.create_time < last_time,
+                and_(models.Chart.create_time == last_time, models.Chart.id < last_id)
+            ))
+        else:
+            query = query.offset((page - 1) * size)
+        # 多取一行判断是否还有下一页
+        rows = (await db.scalars(query.limit(size + 1))).all()
+        charts, next_cursor = split_page(rows, size, lambda chart: [chart.create_time, chart.id])
         
         return {
-            "records": items,
+            "records": [_chart_list_item(chart) for chart in charts],
             "total": total,
             "size": size,
-            "current": page
+            "current": page,
+            "nextCursor": next_cursor
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"分页获取图表列表失败: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"分页获取图表列表失败: {str(e)}") 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"分页获取图表列表失败: {str(e)}")
+
+async def search_chart_by_page(db: AsyncSession, keyword: str, page: int, size: int, status: Optional[str] = None, user_id: Optional[int] = None,
+                               cursor: Optional[str] = None, with_total: bool = True) -> Dict[str, Any]:
+    """
+    按关键词全文检索图表名称和分析目标（异步会话）
+    使用全文索引（MySQL FULLTEXT ngram / SQLite FTS5），按 (相关度, id) 倒序排列；
+    分页参数和返回格式与 list_chart_by_page 相同
+    """
+    try:
+        dialect = db.get_bind().dialect.name
+        conditions = [models.Chart.is_delete == 0]
+        if status is not None:
+            conditions.append(models.Chart.status == status)
+        if user_id:
+            conditions.append(models.Chart.user_id == user_id)
+        
+        # 统计总数，按关键词和查询条件缓存
+        total = None
+        if with_total:
+            total_key = (models.Chart.__tablename__, 'search', keyword, status, user_id)
+            total = get_cached_total(total_key)
+            if total is None:
+                count_query, _ = apply_chart_match(
+                    select(func.count()).select_from(models.Chart).where(*conditions), dialect, keyword
+                )
+                total = await db.scalar(count_query)
+                cache_total(total_key, total)
+        
+        query, relevance = apply_chart_match(select(models.Chart).where(*conditions), dialect, keyword)
+        # 相关度相同时按 id 倒序，保证顺序稳定
+        query = query.add_columns(relevance.label("relevance")).order_by(relevance.desc(), models.Chart.id.desc())
+        if cursor:
+            try:
+                last_relevance, last_id = decode_cursor(cursor, (NUMBER, int))
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            query = query.where(or_(
+                relevance < last_relevance,
+                and_(relevance == last_relevance, models.Chart.id < last_id)
+            ))
+        else:
+            query = query.offset((page - 1) * size)
+        # 多取一行判断是否还有下一页
+        rows = (await db.execute(query.limit(size + 1))).all()
+        rows, next_cursor = split_page(rows, size, lambda row: [row.relevance, row.Chart.id])
+        
+        return {
+            "records": [_chart_list_item(row.Chart) for row in rows],
+            "total": total,
+            "size": size,
+            "current": page,
+            "nextCursor": next_cursor
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"检索图表失败: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"检索图表失败: {str(e)}")
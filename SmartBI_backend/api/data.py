@@ -51,157 +51,359 @@
 """
 
 from sqlalchemy.orm import Session
+from sqlalchemy import insert, update, delete, select, bindparam
 from fastapi import UploadFile, HTTPException
 import pandas as pd
 import numpy as np
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Iterator, Set, Callable
+from itertools import chain
 from database import models
+from database.shadow_table import ShadowTable
 import logging
-from haversine import haversine
 import folium
 import plotly.express as px
 import json
-from io import StringIO, BytesIO
 from .ai_service import AiService
-from openai import OpenAI
 from utils.rag_utils import RAGService
+from utils.geo_utils import NeighborSet
+from utils.spatial_index import SpatialIndex
+from utils.data_snapshot import DataCenterSnapshot, data_center_snapshot
+from utils.file_stream import spooled_upload, iter_file_chunks
+from utils.executor import run_blocking
+from utils.pagination import decode_cursor, invalidate_totals
+from utils.llm_usage import LLMUsage, save_usage
+from utils.tokens import fit_prompt
+from config import LLM_PROMPT_BUDGETS
 
 logger = logging.getLogger(__name__)
 
 # 初始化RAG服务
 rag_service = RAGService()
 
-async def process_existing_data(file: UploadFile, db: Session) -> Dict[str, Any]:
+# 存量机房文件列名与数据表字段的对应关系
+EXISTING_COLUMN_MAP = {
+    '报账点名称': 'report_name',
+    '合同编码': 'contract_code',
+    '合同名称': 'contract_name',
+    '合同期始': 'contract_start',
+    '合同期终': 'contract_end',
+    '合同年租金': 'annual_rent',
+    '合同总金额': 'total_rent',
+    '机房面积': 'area',
+    '经度': 'longitude',
+    '纬度': 'latitude'
+}
+EXISTING_STRING_COLUMNS = ['报账点名称', '合同编码', '合同名称']
+EXISTING_DATE_COLUMNS = ['合同期始', '合同期终']
+EXISTING_NUMERIC_COLUMNS = ['合同年租金', '合同总金额', '机房面积', '经度', '纬度']
+
+# 新增机房文件列名与字段的对应关系
+NEW_COLUMN_MAP = {
+    '机房面积': 'area',
+    '经度': 'longitude',
+    '纬度': 'latitude',
+    '合同年租金': 'annual_rent'
+}
+
+# 批量插入时每批的行数
+BULK_INSERT_BATCH_SIZE = 5000
+# 分块读取上传文件时每块的行数
+INGEST_CHUNK_ROWS = 10000
+
+def coerce_existing_frame(df: pd.DataFrame) -> Tuple[pd.DataFrame, List[Dict[str, Any]]]:
     """
-    处理上传的机房数据文件并存入数据库
-    每次上传新文件时会清空原有数据并插入新数据
+    向量化转换存量机房数据的类型
+    返回可直接入库的记录（列名为数据表字段）以及转换失败的行（Excel行号从2开始）
+    """
+    records = pd.DataFrame(index=df.index)
+    errors = pd.Series('', index=df.index, dtype=object)
+    
+    def mark_failed(column: str, invalid: pd.Series, reason: str):
+        # 每行只记录第一个出错的列
+        invalid = invalid & (errors == '')
+        errors[invalid] = f"{column}{reason}: " + df.loc[invalid, column].astype(str)
+    
+    for column in EXISTING_STRING_COLUMNS:
+        records[EXISTING_COLUMN_MAP[column]] = df[column].astype(str)
+    for column in EXISTING_DATE_COLUMNS:
+        converted = pd.to_datetime(df[column], errors='coerce', format='mixed')
+        mark_failed(column, converted.isna(), "无法转换为日期")
+        records[EXISTING_COLUMN_MAP[column]] = converted
+    for column in EXISTING_NUMERIC_COLUMNS:
+        converted = pd.to_numeric(df[column], errors='coerce').astype(np.float64)
+        mark_failed(column, converted.isna(), "无法转换为数值")
+        records[EXISTING_COLUMN_MAP[column]] = converted
+    
+    failed = errors != ''
+    failed_records = [
+        {'row_index': int(index) + 2, 'error': error}
+        for index, error in errors[failed].items()
+    ]
+    return records[~failed], failed_records
+
+def data_center_page_query(size: int, page: int = 1, cursor: Optional[str] = None):
+    """
+    构建存量机房分页查询，按 id 倒序，多取一行用于判断是否有下一页
+
+    传入 cursor 时从游标之后开始读取（WHERE id < 游标），忽略 page；否则按 page 使用 OFFSET
+
+    Raises:
+        HTTPException: 游标格式不正确
+    """
+    query = select(models.DataCenter).order_by(models.DataCenter.id.desc())
+    if cursor:
+        try:
+            last_id, = decode_cursor(cursor, (int,))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        query = query.where(models.DataCenter.id < last_id)
+    else:
+        query = query.offset((page - 1) * size)
+    return query.limit(size + 1)
+
+def bulk_insert_data_centers(db: Session, records: pd.DataFrame, table=None) -> int:
+    """
+    按批插入存量机房记录，每批使用一条 executemany 语句
+    table 为空时写入 data_centers 表，整表替换时写入影子表
+    返回插入的行数
+    """
+    if table is None:
+        table = models.DataCenter.__table__
+    for start in range(0, len(records), BULK_INSERT_BATCH_SIZE):
+        batch = records.iloc[start:start + BULK_INSERT_BATCH_SIZE]
+        db.execute(insert(table), batch.to_dict('records'))
+    return len(records)
+
+def diff_changed_rows(matched: pd.DataFrame) -> pd.Series:
+    """比较合并后的新旧取值，返回发生变化的行"""
+    changed = pd.Series(False, index=matched.index)
+    for field in EXISTING_COLUMN_MAP.values():
+        new, old = matched[field], matched[f'{field}_old']
+        if pd.api.types.is_float_dtype(new):
+            # 数据库中的 Float 列可能是单精度，按相对误差比较
+            changed |= ~np.isclose(new.to_numpy(), old.to_numpy(dtype=np.float64), rtol=1e-6, atol=0)
+        elif pd.api.types.is_datetime64_any_dtype(new):
+            changed |= new != pd.to_datetime(old)
+        else:
+            changed |= new != old.astype(str)
+    return changed
+
+def upsert_data_centers(db: Session, records: pd.DataFrame, key_fields: List[str]) -> Dict[str, int]:
+    """
+    按主键字段合并一块存量机房数据：新增不存在的记录，更新发生变化的记录
+    只查询本块合同编码对应的已有记录，前面各块新增的记录也会被后面的块匹配到
+    返回新增、更新和未变化的行数
+    """
+    table = models.DataCenter.__table__
+    fields = list(EXISTING_COLUMN_MAP.values())
+    
+    # 同一主键出现多次时以最后一行为准
+    records = records.drop_duplicates(subset=key_fields, keep='last')
+    
+    codes = records['contract_code'].unique().tolist()
+    rows = []
+    for start in range(0, len(codes), BULK_INSERT_BATCH_SIZE):
+        rows.extend(db.execute(
+            select(table.c.id, *[table.c[field] for field in fields])
+            .where(table.c.contract_code.in_(codes[start:start + BULK_INSERT_BATCH_SIZE]))
+        ).all())
+    existing = pd.DataFrame(rows, columns=['id'] + fields)
+    merged = existing.merge(
+        records, on=key_fields, how='outer', suffixes=('_old', ''), indicator=True
+    )
+    
+    # 新增
+    to_insert = merged.loc[merged['_merge'] == 'right_only', fields]
+    bulk_insert_data_centers(db, to_insert)
+    
+    # 更新（数据库中同一主键有多行时全部更新）
+    matched = merged[merged['_merge'] == 'both'].copy()
+    for field in key_fields:
+        matched[f'{field}_old'] = matched[field]
+    changed = matched[diff_changed_rows(matched)]
+    if len(changed):
+        stmt = update(table)\
+            .where(table.c.id == bindparam('b_id'))\
+            .values({field: bindparam(f'b_{field}') for field in fields})
+        params = changed[['id'] + fields].rename(columns=lambda c: f'b_{c}')
+        params['b_id'] = params['b_id'].astype(np.int64)
+        for start in range(0, len(params), BULK_INSERT_BATCH_SIZE):
+            db.execute(stmt, params.iloc[start:start + BULK_INSERT_BATCH_SIZE].to_dict('records'))
+    
+    return {
+        "inserted_count": len(to_insert),
+        "updated_count": len(changed),
+        "unchanged_count": len(matched) - len(changed)
+    }
+
+def delete_missing_data_centers(db: Session, seen_keys: Set[tuple], key_fields: List[str]) -> int:
+    """删除主键不在 seen_keys 中的存量机房记录，返回删除的行数"""
+    table = models.DataCenter.__table__
+    rows = db.execute(select(table.c.id, *[table.c[field] for field in key_fields])).all()
+    missing_ids = [row[0] for row in rows if tuple(row[1:]) not in seen_keys]
+    for start in range(0, len(missing_ids), BULK_INSERT_BATCH_SIZE):
+        db.execute(delete(table).where(table.c.id.in_(missing_ids[start:start + BULK_INSERT_BATCH_SIZE])))
+    return len(missing_ids)
+
+def read_upload_chunks(path: str, filename: str, required_columns: List[str]) -> Iterator[pd.DataFrame]:
+    """
+    分块读取已落盘的上传文件，立即读取第一块并校验必要的列
+    返回的迭代器依次产出去除必要列空值后的数据块
+    """
+    chunks = iter_file_chunks(path, filename, INGEST_CHUNK_ROWS)
+    first = next(chunks, pd.DataFrame())
+    missing_columns = [col for col in required_columns if col not in first.columns]
+    if missing_columns:
+        raise ValueError(f"文件缺少必要的列: {', '.join(missing_columns)}")
+    return (chunk.dropna(subset=required_columns) for chunk in chain([first], chunks))
+
+def coerce_existing_chunks(
+    chunks: Iterator[pd.DataFrame],
+    stats: Dict[str, Any],
+    progress: Optional[Callable[[str, Dict[str, Any]], None]] = None
+) -> Iterator[pd.DataFrame]:
+    """
+    逐块转换存量机房数据的类型，在 stats 中累计总行数、成功行数和失败行
+    每块写入完成后调用 progress 报告进度
     """
+    for chunk in chunks:
+        records, failed_records = coerce_existing_frame(chunk)
+        stats["total_records"] += len(chunk)
+        stats["success_count"] += len(records)
+        stats["failed_records"].extend(failed_records)
+        yield records
+        if progress:
+            progress("writing", stats)
+
+def ingest_existing_file(
+    db: Session,
+    path: str,
+    filename: str,
+    mode: str = "replace",
+    match_report_name: bool = False,
+    delete_missing: bool = False,
+    progress: Optional[Callable[[str, Dict[str, Any]], None]] = None
+) -> Dict[str, Any]:
+    """
+    按块读取已落盘的存量机房数据文件并写入数据库，内存占用与文件大小无关
+    上传接口和后台导入任务共用此函数，参数含义见 process_existing_data
+    
+    progress 为可选的进度回调，参数为当前阶段和累计统计
+    （total_records、success_count、failed_records）
+    """
+    chunks = read_upload_chunks(path, filename, list(EXISTING_COLUMN_MAP))
+    stats = {"total_records": 0, "success_count": 0, "failed_records": []}
+    
+    def report(phase: str):
+        if progress:
+            progress(phase, stats)
+    
     try:
-        # 读取文件内容到内存
-        contents = await file.read()
-        
-        # 读取文件内容
-        if file.filename.endswith('.csv'):
-            # 使用StringIO处理CSV文件
-            df = pd.read_csv(StringIO(contents.decode('utf-8')))
+        batches = coerce_existing_chunks(chunks, stats, progress)
+        if mode == "upsert":
+            # 逐块按主键合并，只写入变化的部分
+            key_fields = ['contract_code', 'report_name'] if match_report_name else ['contract_code']
+            counts = {"inserted_count": 0, "updated_count": 0, "deleted_count": 0, "unchanged_count": 0}
+            seen_keys = set()
+            for records in batches:
+                for name, value in upsert_data_centers(db, records, key_fields).items():
+                    counts[name] += value
+                if delete_missing:
+                    seen_keys.update(records[key_fields].itertuples(index=False, name=None))
+            if delete_missing:
+                report("deleting")
+                counts["deleted_count"] = delete_missing_data_centers(db, seen_keys, key_fields)
+            has_changes = counts["inserted_count"] + counts["updated_count"] + counts["deleted_count"] > 0
         else:
-            # 使用BytesIO处理Excel文件
-            df = pd.read_excel(BytesIO(contents))
+            # 逐块写入影子表并原子替换，加载期间读取接口继续使用原表
+            with ShadowTable(db, models.DataCenter.__table__) as shadow:
+                for records in batches:
+                    bulk_insert_data_centers(db, records, shadow.staging)
+                    # 影子表对读取接口不可见，逐块提交以缩短事务
+                    db.commit()
+                if stats["success_count"] > 0:
+                    report("swapping")
+                    shadow.swap(stats["success_count"])
+            counts = {}
+            has_changes = stats["success_count"] > 0
         
-        # 验证必要的列是否存在
-        required_columns = [
-            '报账点名称', '合同编码', '合同名称', '合同期始', '合同期终',
-            '合同年租金', '合同总金额', '机房面积', '经度', '纬度'
-        ]
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        if missing_columns:
-            raise ValueError(f"文件缺少必要的列: {', '.join(missing_columns)}")
+        failed_records = stats["failed_records"]
+        if failed_records:
+            logger.error(f"{len(failed_records)} 行数据校验失败，首个失败行: {failed_records[0]}")
         
-        # 清理数据：清理必要列的空值
-        df = df.dropna(subset=required_columns)
+        # 提交事务
+        if has_changes:
+            db.commit()
+            # 存量数据已更新，递增数据版本并重新加载快照
+            report("refreshing")
+            data_center_snapshot.refresh(db)
+            invalidate_totals(models.DataCenter.__tablename__)
         
-        try:
-            # 清空原有数据
-            db.query(models.DataCenter).delete()
-            
-            # 转换数据并批量插入
-            success_count = 0
-            failed_records = []
-            
-            for index, row in df.iterrows():
-                try:
-                    # 转换日期格式
-                    contract_start = pd.to_datetime(row['合同期始'])
-                    contract_end = pd.to_datetime(row['合同期终'])
-                    
-                    # 确保数值类型正确
-                    data_center = models.DataCenter(
-                        report_name=str(row['报账点名称']),
-                        contract_code=str(row['合同编码']),
-                        contract_name=str(row['合同名称']),
-                        contract_start=contract_start,
-                        contract_end=contract_end,
-                        annual_rent=float(row['合同年租金'].item() if isinstance(row['合同年租金'], (np.integer, np.floating)) else row['合同年租金']),
-                        total_rent=float(row['合同总金额'].item() if isinstance(row['合同总金额'], (np.integer, np.floating)) else row['合同总金额']),
-                        area=float(row['机房面积'].item() if isinstance(row['机房面积'], (np.integer, np.floating)) else row['机房面积']),
-                        longitude=float(row['经度'].item() if isinstance(row['经度'], (np.integer, np.floating)) else row['经度']),
-                        latitude=float(row['纬度'].item() if isinstance(row['纬度'], (np.integer, np.floating)) else row['纬度'])
-                    )
-                    db.add(data_center)
-                    success_count += 1
-                    
-                except Exception as e:
-                    failed_records.append({
-                        'row_index': index + 2,  # Excel行号从2开始
-                        'error': str(e)
-                    })
-                    logger.error(f"第 {index + 2} 行数据插入失败: {str(e)}")
-                    continue
-            
-            # 提交事务
-            if success_count > 0:
-                db.commit()
-            
-            # 返回处理结果
-            return {
-                "success": True,
-                "message": "机房数据更新成功",
-                "total_records": len(df),
-                "success_count": success_count,
-                "failed_count": len(failed_records),
-                "failed_records": failed_records
-            }
-            
-        except Exception as e:
-            db.rollback()
-            raise Exception(f"数据库操作失败: {str(e)}")
+        # 返回处理结果
+        return {
+            "success": True,
+            "message": "机房数据更新成功",
+            "mode": mode,
+            "total_records": stats["total_records"],
+            "success_count": stats["success_count"],
+            "failed_count": len(failed_records),
+            "failed_records": failed_records,
+            **counts
+        }
+        
+    except Exception as e:
+        db.rollback()
+        raise Exception(f"数据库操作失败: {str(e)}")
+
+async def process_existing_data(
+    file: UploadFile,
+    db: Session,
+    mode: str = "replace",
+    match_report_name: bool = False,
+    delete_missing: bool = False
+) -> Dict[str, Any]:
+    """
+    处理上传的机房数据文件并存入数据库
+    
+    文件先写入临时文件，再按块读取、转换和写入，内存占用与文件大小无关
+    
+    mode:
+    - replace: 新数据写入影子表，校验行数后原子替换原有数据
+    - upsert: 按合同编码（match_report_name 为真时加上报账点名称）合并，
+      只写入新增和变化的记录，delete_missing 为真时删除文件中不存在的记录
+    """
+    try:
+        async with spooled_upload(file) as path:
+            return await run_blocking(
+                ingest_existing_file, db, path, file.filename, mode, match_report_name, delete_missing
+            )
         
     except Exception as e:
         logger.error(f"文件处理失败: {str(e)}")
         raise HTTPException(status_code=400, detail=f"文件处理失败: {str(e)}")
 
+def read_new_data_file(path: str, filename: str) -> List[Dict[str, float]]:
+    """按块读取已落盘的新增机房数据文件，无法转换为数值的行跳过"""
+    result_data = []
+    for chunk in read_upload_chunks(path, filename, list(NEW_COLUMN_MAP)):
+        converted = pd.DataFrame({
+            field: pd.to_numeric(chunk[column], errors='coerce').astype(np.float64)
+            for column, field in NEW_COLUMN_MAP.items()
+        })
+        invalid = converted.isna().any(axis=1)
+        if invalid.any():
+            logger.error(f"{int(invalid.sum())} 行数据无法转换为数值，已跳过")
+        result_data.extend(converted[~invalid].to_dict('records'))
+    return result_data
+
 async def process_new_data(file: UploadFile) -> Dict[str, Any]:
     """
     处理上传的新增机房数据文件
+    文件先写入临时文件，再按块读取和转换
     """
     try:
-        # 读取文件内容到内存
-        contents = await file.read()
-        
-        # 读取文件内容
-        if file.filename.endswith('.csv'):
-            # 使用StringIO处理CSV文件
-            df = pd.read_csv(StringIO(contents.decode('utf-8')))
-        else:
-            # 使用BytesIO处理Excel文件
-            df = pd.read_excel(BytesIO(contents))
-        
-        # 验证必要的列是否存在
-        required_columns = ['机房面积', '经度', '纬度', '合同年租金']
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        if missing_columns:
-            raise ValueError(f"文件缺少必要的列: {', '.join(missing_columns)}")
-        
-        # 清理数据：只移除空值
-        df = df.dropna(subset=required_columns)
-        
-        if len(df) == 0:
-            raise ValueError("没有有效的机房数据")
-        
-        # 转换为字典列表，保持中文列名
-        result_data = []
-        for _, row in df.iterrows():
-            try:
-                data = {
-                    "area": float(row['机房面积']),
-                    "longitude": float(row['经度']),
-                    "latitude": float(row['纬度']),
-                    "annual_rent": float(row['合同年租金'])
-                }
-                result_data.append(data)
-            except Exception as e:
-                logger.error(f"处理行数据失败: {str(e)}")
-                continue
+        async with spooled_upload(file) as path:
+            result_data = await run_blocking(read_new_data_file, path, file.filename)
         
         if not result_data:
             raise ValueError("没有有效的机房数据")
@@ -217,9 +419,77 @@ async def process_new_data(file: UploadFile) -> Dict[str, Any]:
         logger.error(f"文件处理失败: {str(e)}")
         raise HTTPException(status_code=400, detail=f"文件处理失败: {str(e)}")
 
-def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-    """计算两点间距离（公里）"""
-    return haversine((lat1, lon1), (lat2, lon2))
+def resolve_neighbors(new_data: pd.DataFrame, index: SpatialIndex, radius_km: float) -> NeighborSet:
+    """
+    通过空间索引求出每个新增机房指定半径内的存量机房
+    一次请求只查询一次，地图、散点图和稽核结果共享该结果
+    """
+    return index.query_radius(
+        new_data['latitude'].to_numpy(dtype=np.float64),
+        new_data['longitude'].to_numpy(dtype=np.float64),
+        radius_km
+    )
+
+def build_audit_results(new_data: pd.DataFrame, snapshot: DataCenterSnapshot, neighbors: NeighborSet, radius_km: float) -> List[Dict[str, Any]]:
+    """计算每个新增机房的稽核结果"""
+    exist_rent = snapshot.annual_rent
+
+    audit_results = []
+    for i, new_dc in enumerate(new_data[['longitude', 'latitude', 'annual_rent']].itertuples(index=False)):
+        result = {
+            'new_longitude': float(new_dc.longitude),
+            'new_latitude': float(new_dc.latitude),
+            'new_annual_rent': float(new_dc.annual_rent)
+        }
+        indices, distances = neighbors.neighbors_of(i)
+        if len(indices) == 0:
+            # 如果在指定半径内没有找到存量机房，也记录这个结果
+            result['analysis_result'] = f'在{radius_km}公里范围内未找到存量机房'
+            audit_results.append(result)
+            continue
+
+        rents = exist_rent[indices]
+        nearest = indices[distances.argmin()]
+        avg_rent = float(rents.mean())
+        nearest_rent = float(exist_rent[nearest])
+        result.update({
+            'nearby_avg_rent': avg_rent,
+            'nearby_min_rent': float(rents.min()),
+            'nearby_max_rent': float(rents.max()),
+            'nearest_rent': nearest_rent,
+            'nearest_name': snapshot.report_name[nearest],
+            'nearest_contract_code': snapshot.contract_code[nearest],
+            'rent_comparison_avg': '<=' if new_dc.annual_rent <= avg_rent else '>',
+            'rent_comparison_nearest': '<=' if new_dc.annual_rent <= nearest_rent else '>'
+        })
+        audit_results.append(result)
+
+    return audit_results
+
+def build_analysis(db: Session, new_data: pd.DataFrame, radius_km: float) -> Dict[str, Any]:
+    """
+    计算地图、散点图和稽核结果，包含快照加载和空间查询，在线程池中执行
+    如果数据库中没有存量机房数据，则抛出 400 错误
+    """
+    # 获取存量机房快照
+    snapshot = data_center_snapshot.get(db)
+    if len(snapshot) == 0:
+        raise HTTPException(
+            status_code=400, 
+            detail="数据库中没有存量机房数据，请先上传存量机房数据"
+        )
+    
+    # 计算半径内的邻近存量机房
+    neighbors = resolve_neighbors(new_data, snapshot.index, radius_km)
+    
+    return {
+        # 生成地图数据
+        "map_data": generate_map_data(snapshot, new_data, neighbors, radius_km),
+        # 生成散点图数据
+        "scatter_data": generate_scatter_data(snapshot, new_data, neighbors),
+        # 生成稽核结果
+        "audit_results": build_audit_results(new_data, snapshot, neighbors, radius_km)
+    }
 
 async def analyze_data_centers(db: Session, new_data: pd.DataFrame, radius_km: float) -> Dict[str, Any]:
     """
@@ -227,75 +497,7 @@ async def analyze_data_centers(db: Session, new_data: pd.DataFrame, radius_km: f
     如果数据库中没有存量机房数据，则返回错误提示
     """
     try:
-        # 获取所有机房数据
-        existing_centers = db.query(models.DataCenter).all()
-        if not existing_centers:
-            raise HTTPException(
-                status_code=400, 
-                detail="数据库中没有存量机房数据，请先上传存量机房数据"
-            )
-            
-        existing_data = pd.DataFrame([{
-            'area': dc.area,
-            'longitude': dc.longitude,
-            'latitude': dc.latitude,
-            'annual_rent': dc.annual_rent,
-            'report_name': dc.report_name,
-            'contract_code': dc.contract_code
-        } for dc in existing_centers])
-        
-        # 生成地图数据
-        map_data = await generate_map_data(existing_data, new_data, radius_km)
-        
-        # 生成散点图数据
-        scatter_data = await generate_scatter_data(existing_data, new_data, radius_km)
-        
-        # 生成稽核结果
-        audit_results = []
-        for _, new_dc in new_data.iterrows():
-            nearby_centers = []
-            for _, exist_dc in existing_data.iterrows():
-                distance = calculate_distance(
-                    new_dc['latitude'], new_dc['longitude'],
-                    exist_dc['latitude'], exist_dc['longitude']
-                )
-                if distance <= radius_km:
-                    nearby_centers.append({
-                        **exist_dc.to_dict(),
-                        'distance': distance
-                    })
-            
-            if nearby_centers:
-                nearby_df = pd.DataFrame(nearby_centers)
-                result = {
-                    'new_longitude': new_dc['longitude'],
-                    'new_latitude': new_dc['latitude'],
-                    'new_annual_rent': new_dc['annual_rent'],
-                    'nearby_avg_rent': nearby_df['annual_rent'].mean(),
-                    'nearby_min_rent': nearby_df['annual_rent'].min(),
-                    'nearby_max_rent': nearby_df['annual_rent'].max(),
-                    'nearest_rent': nearby_df.loc[nearby_df['distance'].idxmin(), 'annual_rent'],
-                    'nearest_name': nearby_df.loc[nearby_df['distance'].idxmin(), 'report_name'],
-                    'nearest_contract_code': nearby_df.loc[nearby_df['distance'].idxmin(), 'contract_code'],
-                    'rent_comparison_avg': '<=' if new_dc['annual_rent'] <= nearby_df['annual_rent'].mean() else '>',
-                    'rent_comparison_nearest': '<=' if new_dc['annual_rent'] <= nearby_df.loc[nearby_df['distance'].idxmin(), 'annual_rent'] else '>'
-                }
-                audit_results.append(result)
-            else:
-                # 如果在指定半径内没有找到存量机房，也记录这个结果
-                result = {
-                    'new_longitude': new_dc['longitude'],
-                    'new_latitude': new_dc['latitude'],
-                    'new_annual_rent': new_dc['annual_rent'],
-                    'analysis_result': f'在{radius_km}公里范围内未找到存量机房'
-                }
-                audit_results.append(result)
-        
-        return {
-            "map_data": map_data,
-            "scatter_data": scatter_data,
-            "audit_results": audit_results
-        }
+        return await run_blocking(build_analysis, db, new_data, radius_km)
         
     except HTTPException as he:
         raise he
@@ -303,34 +505,26 @@ async def analyze_data_centers(db: Session, new_data: pd.DataFrame, radius_km: f
         logger.error(f"数据分析失败: {str(e)}")
         raise HTTPException(status_code=500, detail=f"数据分析失败: {str(e)}")
 
-async def generate_map_data(existing_data: pd.DataFrame, new_data: pd.DataFrame, radius_km: float) -> Dict[str, Any]:
+def generate_map_data(snapshot: DataCenterSnapshot, new_data: pd.DataFrame, neighbors: NeighborSet, radius_km: float) -> Dict[str, Any]:
     """生成地图展示数据，只包含新增机房周围指定半径内的存量机房"""
     map_center = [34.341575, 108.93977]  # 西安市中心坐标
     
-    # 构建地图数据
-    existing_markers = []
+    exist_lat = snapshot.latitude
+    exist_lng = snapshot.longitude
+    exist_rent = snapshot.annual_rent
     
-    # 遍历每个新增机房
-    for _, new_dc in new_data.iterrows():
-        # 遍历存量机房，检查是否在半径范围内
-        for _, exist_dc in existing_data.iterrows():
-            distance = calculate_distance(
-                new_dc['latitude'], new_dc['longitude'],
-                exist_dc['latitude'], exist_dc['longitude']
-            )
-            # 如果在半径范围内且尚未添加到标记列表中
-            if distance <= radius_km and not any(
-                marker['latitude'] == exist_dc['latitude'] and 
-                marker['longitude'] == exist_dc['longitude'] 
-                for marker in existing_markers
-            ):
-                existing_markers.append({
-                    "type": "existing",
-                    "latitude": exist_dc['latitude'],
-                    "longitude": exist_dc['longitude'],
-                    "annual_rent": exist_dc['annual_rent'],
-                    "distance": round(distance, 2)  # 添加到新增机房的距离信息
-                })
+    # 构建地图数据，同一坐标的存量机房只标记一次，距离取首次出现时到新增机房的距离
+    # 按新增机房顺序展开的邻居列表上向量化去重，避免逐对循环长时间占用 GIL
+    lat = exist_lat[neighbors.indices]
+    lng = exist_lng[neighbors.indices]
+    first = ~pd.DataFrame({'latitude': lat, 'longitude': lng}).duplicated().to_numpy()
+    existing_markers = pd.DataFrame({
+        "type": "existing",
+        "latitude": lat[first],
+        "longitude": lng[first],
+        "annual_rent": exist_rent[neighbors.indices[first]],
+        "distance": np.round(neighbors.distances[first], 2)  # 添加到新增机房的距离信息
+    }).to_dict('records')
     
     new_markers = []
     for _, row in new_data.iterrows():
@@ -349,44 +543,57 @@ async def generate_map_data(existing_data: pd.DataFrame, new_data: pd.DataFrame,
         "radius_km": radius_km
     }
 
-async def generate_scatter_data(existing_data: pd.DataFrame, new_data: pd.DataFrame, radius_km: float) -> Dict[str, Any]:
+def generate_scatter_data(snapshot: DataCenterSnapshot, new_data: pd.DataFrame, neighbors: NeighborSet) -> Dict[str, Any]:
     """生成散点图数据，只包含新增机房周围指定半径内的存量机房"""
-    # 存储在范围内的存量机房
-    nearby_existing = set()
-    
-    # 遍历每个新增机房
-    for _, new_dc in new_data.iterrows():
-        # 遍历存量机房，检查是否在半径范围内
-        for idx, exist_dc in existing_data.iterrows():
-            distance = calculate_distance(
-                new_dc['latitude'], new_dc['longitude'],
-                exist_dc['latitude'], exist_dc['longitude']
-            )
-            # 如果在半径范围内，添加到集合中
-            if distance <= radius_km:
-                nearby_existing.add(idx)
-    
     # 只保留在范围内的存量机房数据
-    filtered_existing = existing_data.iloc[list(nearby_existing)]
+    indices = neighbors.unique_indices()
+    filtered_existing = pd.DataFrame({
+        'longitude': snapshot.longitude[indices],
+        'latitude': snapshot.latitude[indices],
+        'annual_rent': snapshot.annual_rent[indices]
+    })
     
     scatter_data = {
-        "existing": filtered_existing[['longitude', 'latitude', 'annual_rent']].to_dict('records'),
+        "existing": filtered_existing.to_dict('records'),
         "new": new_data[['longitude', 'latitude', 'annual_rent']].to_dict('records')
     }
     return scatter_data
 
-async def generate_audit_summary(audit_results: List[Dict[str, Any]], ai_service: AiService) -> Dict[str, str]:
+# 稽核总结提示语超出 token 上限时依次截断的部分：先截断政策内容，再截断分析数据，分析要求不截断
+AUDIT_SUMMARY_TRUNCATE_ORDER = ("policy", "data")
+
+def build_audit_summary_messages(analysis_data: str, policy_context: str) -> List[Dict[str, str]]:
+    """构建稽核总结的对话消息"""
+    prompt = f"""请根据以下数据分析和评估新增机房的租金定价是否合理：
+
+分析数据：
+{analysis_data}
+
+相关政策和规定：
+{policy_context}
+
+分析要求：
+1. 新增机房的租金应不大于周边规定范围内租金最低的存量机房的租金
+2. 如果大于最低租金，则应不大于周边平均租金
+3. 请分别说明每个新增机房的具体分析情况
+4. 最后给出总体评估结论
+5. 评估结论必须考虑相关政策规定
+
+请生成一段分析总结，包含具体分析和最终结论。"""
+    return [
+        {"role": "system", "content": "你是一个专业的机房租金定价分析专家，擅长分析租金定价的合理性。"},
+        {"role": "user", "content": prompt}
+    ]
+
+async def generate_audit_summary(audit_results: List[Dict[str, Any]], ai_service: AiService,
+                                 db: Optional[Session] = None, user_id: Optional[int] = None) -> Dict[str, str]:
     """
     生成稽核结果总结
     分析每个新增机房的价格是否合理
+    传入 db 时把本次调用的 token 用量和耗时写入 llm_usage 表
     """
+    usage = LLMUsage("audit_summary", user_id)
     try:
-        # 初始化OpenAI客户端
-        client = OpenAI(
-            api_key="sk-yourkey",
-            base_url="https://api.deepseek.com/v1"
-        )
-
         # 构造分析数据
         analysis_data = []
         for result in audit_results:
@@ -416,40 +623,23 @@ async def generate_audit_summary(audit_results: List[Dict[str, Any]], ai_service
             })
 
         # 使用RAG检索相关政策
-        policy_context = rag_service.query("机房租金定价标准")
+        policy_context = await run_blocking(rag_service.query, "机房租金定价标准")
         if policy_context == "未找到相关政策和规定":
             policy_context = "未找到相关政策规定，将按照默认规则进行评估。"
 
-        # 构造提示语
-        prompt = f"""请根据以下数据分析和评估新增机房的租金定价是否合理：
-
-分析数据：
-{json.dumps(analysis_data, ensure_ascii=False, indent=2)}
-
-相关政策和规定：
-{policy_context}
-
-分析要求：
-1. 新增机房的租金应不大于周边规定范围内租金最低的存量机房的租金
-2. 如果大于最低租金，则应不大于周边平均租金
-3. 请分别说明每个新增机房的具体分析情况
-4. 最后给出总体评估结论
-5. 评估结论必须考虑相关政策规定
-
-请生成一段分析总结，包含具体分析和最终结论。"""
-
-        # 调用 AI 接口
-        response = client.chat.completions.create(
-            model="deepseek-chat",
-            messages=[
-                {"role": "system", "content": "你是一个专业的机房租金定价分析专家，擅长分析租金定价的合理性。"},
-                {"role": "user", "content": prompt}
-            ],
-            stream=False
+        # 在 token 上限内构造提示语（token 计数在线程池中执行）
+        messages, usage.prompt_tokens = await run_blocking(
+            fit_prompt,
+            lambda sections: build_audit_summary_messages(sections["data"], sections["policy"]),
+            {"data": json.dumps(analysis_data, ensure_ascii=False, indent=2), "policy": policy_context},
+            LLM_PROMPT_BUDGETS["audit_summary"],
+            AUDIT_SUMMARY_TRUNCATE_ORDER
         )
 
-        # 获取分析结果
-        analysis_result = response.choices[0].message.content
+        # 调用 AI 接口，复用 AiService 的大模型客户端连接池
+        analysis_result = await ai_service.llm.chat(messages, usage=usage)
+        if db is not None:
+            await run_blocking(save_usage, db, usage)
 
         return {
             "summary": analysis_result
@@ -457,4 +647,7 @@ async def generate_audit_summary(audit_results: List[Dict[str, Any]], ai_service
 
     except Exception as e:
         logger.error(f"生成稽核总结失败: {str(e)}")
+        usage.status = 'failed'
+        if db is not None:
+            await run_blocking(save_usage, db, usage)
         raise HTTPException(status_code=500, detail=f"生成稽核总结失败: {str(e)}")
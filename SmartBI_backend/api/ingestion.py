@@ -0,0 +1,244 @@
+"""
+数据导入任务模块
+
+本模块提供存量机房大文件的后台导入任务，包括：
+
+功能列表：
+1. 任务提交
+   - 上传文件写入临时文件后立即返回任务ID
+   - 任务在后台线程池中执行，导入逻辑与同步上传接口相同
+
+2. 进度查询
+   - 任务状态和阶段持久化在 ingestion_job 表中
+   - 报告已读取行数、成功行数、失败行数和处理速度
+   - 数据写入事务未提交时进度只保存在进程内，事务提交后再写入任务表，
+     避免 SQLite 上进度提交等待数据写入锁；执行任务的进程查询时返回进程内的最新进度
+
+3. 重启恢复
+   - 服务启动时将超过 INGESTION_STALE_SECONDS 没有更新的未完成任务标记为失败，查询接口可报告中断原因
+   - 假设只有一个服务进程执行导入任务：多进程部署时无法区分其他进程正在执行的长任务和已中断的任务
+"""
+
+import os
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import HTTPException, UploadFile
+from sqlalchemy.orm import Session
+
+from database import models
+from database.connection import DatabaseConnection
+from config import INGESTION_WORKERS, INGESTION_STALE_SECONDS
+from utils.file_stream import spool_to_tempfile
+from utils.executor import run_blocking
+from . import data as data_api
+
+logger = logging.getLogger(__name__)
+
+# 任务结果中保存的失败行数上限
+MAX_STORED_FAILED_RECORDS = 100
+
+executor = ThreadPoolExecutor(max_workers=INGESTION_WORKERS, thread_name_prefix='ingestion')
+
+# 未结束的任务状态
+ACTIVE_STATUSES = ('waiting', 'running')
+
+# 本进程正在执行的任务的最新进度，数据写入事务未提交时任务表中的进度会落后
+_live_progress: Dict[int, Dict[str, Any]] = {}
+_live_progress_lock = threading.Lock()
+
+
+def _update_job(db: Session, job_id: int, **values):
+    """更新任务记录并立即提交，使查询接口能看到最新进度"""
+    job = db.get(models.IngestionJob, job_id)
+    for name, value in values.items():
+        setattr(job, name, value)
+    db.commit()
+
+
+def run_ingestion_job(
+    job_id: int,
+    path: str,
+    filename: str,
+    mode: str,
+    match_report_name: bool,
+    delete_missing: bool,
+    session_factory: Callable[[], Session] = DatabaseConnection.get_session
+):
+    """
+    在后台线程中执行导入任务
+
+    数据写入和任务进度使用两个独立的会话：
+    增量合并时数据写入是一个长事务，进度需要单独提交才能被查询接口看到。
+    数据会话有未提交的事务时不提交进度（SQLite 同一时间只允许一个写事务，
+    进度提交会等待数据写入锁直至超时），只更新进程内进度，事务提交后再写入任务表
+    """
+    job_db = session_factory()
+    db = session_factory()
+    try:
+        _update_job(job_db, job_id, status='running', phase='reading', start_time=datetime.now())
+
+        def progress(phase: str, stats: Dict[str, Any]):
+            values = {
+                "phase": phase,
+                "total_records": stats["total_records"],
+                "success_count": stats["success_count"],
+                "failed_count": len(stats["failed_records"])
+            }
+            with _live_progress_lock:
+                _live_progress[job_id] = values
+            if not db.in_transaction():
+                _update_job(job_db, job_id, **values)
+
+        result = data_api.ingest_existing_file(
+            db, path, filename, mode, match_report_name, delete_missing, progress
+        )
+        result["failed_records"] = result["failed_records"][:MAX_STORED_FAILED_RECORDS]
+        _update_job(
+            job_db, job_id,
+            status='succeeded',
+            phase='done',
+            total_records=result["total_records"],
+            success_count=result["success_count"],
+            failed_count=result["failed_count"],
+            result=result,
+            finish_time=datetime.now()
+        )
+        logger.info(f"导入任务 {job_id} 完成: 成功 {result['success_count']} 行，失败 {result['failed_count']} 行")
+
+    except Exception as e:
+        logger.error(f"导入任务 {job_id} 失败: {str(e)}")
+        job_db.rollback()
+        _update_job(job_db, job_id, status='failed', exec_message=str(e), finish_time=datetime.now())
+    finally:
+        with _live_progress_lock:
+            _live_progress.pop(job_id, None)
+        db.close()
+        job_db.close()
+        os.remove(path)
+
+
+def create_job(
+    db: Session,
+    filename: str,
+    mode: str,
+    match_report_name: bool,
+    delete_missing: bool,
+    user_id: Optional[int] = None
+) -> models.IngestionJob:
+    """创建等待执行的导入任务记录"""
+    job = models.IngestionJob(
+        filename=filename,
+        mode=mode,
+        options={"match_report_name": match_report_name, "delete_missing": delete_missing},
+        status='waiting',
+        phase='queued',
+        user_id=user_id
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+async def submit_ingestion_job(
+    file: UploadFile,
+    db: Session,
+    mode: str = "replace",
+    match_report_name: bool = False,
+    delete_missing: bool = False,
+    user_id: Optional[int] = None,
+    session_factory: Callable[[], Session] = DatabaseConnection.get_session
+) -> Dict[str, Any]:
+    """
+    提交存量机房数据导入任务
+
+    Returns:
+        Dict: 任务ID和初始状态
+    """
+    path = await spool_to_tempfile(file)
+    try:
+        job = await run_blocking(create_job, db, file.filename, mode, match_report_name, delete_missing, user_id)
+    except Exception as e:
+        db.rollback()
+        os.remove(path)
+        logger.error(f"创建导入任务失败: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"创建导入任务失败: {str(e)}")
+
+    executor.submit(
+        run_ingestion_job,
+        job.id, path, file.filename, mode, match_report_name, delete_missing, session_factory
+    )
+    logger.info(f"导入任务 {job.id} 已提交: {file.filename}")
+    return {"job_id": job.id, "status": job.status}
+
+
+def get_job_status(db: Session, job_id: int) -> Dict[str, Any]:
+    """
+    查询导入任务状态
+
+    Returns:
+        Dict: 任务状态、阶段、行数统计、处理速度（行/秒）和导入结果
+    """
+    job = db.get(models.IngestionJob, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="导入任务不存在")
+
+    progress = {
+        "phase": job.phase,
+        "total_records": job.total_records,
+        "success_count": job.success_count,
+        "failed_count": job.failed_count
+    }
+    if job.status in ACTIVE_STATUSES:
+        with _live_progress_lock:
+            progress.update(_live_progress.get(job_id, {}))
+
+    elapsed = None
+    throughput = None
+    if job.start_time:
+        elapsed = ((job.finish_time or datetime.now()) - job.start_time).total_seconds()
+        if elapsed > 0:
+            throughput = round(progress["total_records"] / elapsed, 1)
+
+    return {
+        "job_id": job.id,
+        "filename": job.filename,
+        "mode": job.mode,
+        "status": job.status,
+        **progress,
+        "elapsed_seconds": elapsed,
+        "rows_per_second": throughput,
+        "result": job.result,
+        "exec_message": job.exec_message,
+        "create_time": job.create_time.strftime("%Y-%m-%d %H:%M:%S"),
+        "finish_time": job.finish_time.strftime("%Y-%m-%d %H:%M:%S") if job.finish_time else None
+    }
+
+
+def recover_interrupted_jobs(db: Session, stale_seconds: int = INGESTION_STALE_SECONDS) -> int:
+    """
+    将服务重启前未完成的任务标记为失败，服务启动时调用
+
+    只处理超过 stale_seconds 没有更新的任务。任务只在提交它的进程内执行，
+    此处假设只有一个服务进程（单 worker）：最近更新过的任务可能仍在其他进程中执行，不做处理
+
+    Returns:
+        int: 标记的任务数
+    """
+    deadline = datetime.now() - timedelta(seconds=stale_seconds)
+    jobs = db.query(models.IngestionJob).filter(
+        models.IngestionJob.status.in_(ACTIVE_STATUSES),
+        models.IngestionJob.update_time < deadline
+    ).all()
+    for job in jobs:
+        job.status = 'failed'
+        job.exec_message = f"服务重启，任务在 {job.phase} 阶段中断"
+        job.finish_time = datetime.now()
+    db.commit()
+    if jobs:
+        logger.warning(f"{len(jobs)} 个导入任务因服务重启中断")
+    return len(jobs)
@@ -1,11 +1,117 @@
+import os
+
 # JWT配置
 JWT_SECRET_KEY = "your-real-secret-key-2024"  # 在生产环境中应该使用环境变量
 JWT_ALGORITHM = "HS256"
 JWT_ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# 认证缓存配置（可通过环境变量覆盖）
+# 用户信息缓存的秒数和条数，修改密码、角色或删除用户时立即失效
+USER_CACHE_TTL = int(os.getenv("SMARTBI_USER_CACHE_TTL", 60))
+USER_CACHE_SIZE = int(os.getenv("SMARTBI_USER_CACHE_SIZE", 10000))
+# 已验证令牌缓存的秒数和条数，缓存时间不超过令牌自身的有效期
+TOKEN_CACHE_TTL = int(os.getenv("SMARTBI_TOKEN_CACHE_TTL", 300))
+TOKEN_CACHE_SIZE = int(os.getenv("SMARTBI_TOKEN_CACHE_SIZE", 10000))
+
+# 密码哈希配置（可通过环境变量覆盖）
+# bcrypt 成本因子，每加 1 计算时间翻倍；登录时成本因子低于该值的哈希会在后台重新计算
+BCRYPT_ROUNDS = int(os.getenv("SMARTBI_BCRYPT_ROUNDS", 12))
+# 同时进行的 bcrypt 计算数
+PASSWORD_HASH_WORKERS = int(os.getenv("SMARTBI_PASSWORD_HASH_WORKERS", max((os.cpu_count() or 2) // 2, 1)))
+# 排队等待的 bcrypt 计算数上限，超过后登录返回 503
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("SMARTBI_PASSWORD_HASH_MAX_QUEUE", 64))
+
 # 数据库配置
 DB_USER = "root"
 DB_PASSWORD = "123456"
 DB_HOST = "localhost"
 DB_PORT = 3306
-DB_NAME = "smartbi" 
\ No newline at end of file
+DB_NAME = "smartbi"
+DATABASE_URL = os.getenv(
+    "SMARTBI_DATABASE_URL",
+    f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+)
+# 异步数据库连接地址，默认使用 aiomysql 驱动；本地开发可设置为 sqlite+aiosqlite:///smartbi.db
+ASYNC_DATABASE_URL = os.getenv(
+    "SMARTBI_ASYNC_DATABASE_URL",
+    f"mysql+aiomysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+)
+
+# 数据库连接池配置（可通过环境变量覆盖，同步和异步引擎各自使用一个连接池）
+# 常驻连接数
+DB_POOL_SIZE = int(os.getenv("SMARTBI_DB_POOL_SIZE", 5))
+# 常驻连接用完后最多额外新建的连接数
+DB_MAX_OVERFLOW = int(os.getenv("SMARTBI_DB_MAX_OVERFLOW", 10))
+# 连接池已满时等待归还连接的秒数
+DB_POOL_TIMEOUT = int(os.getenv("SMARTBI_DB_POOL_TIMEOUT", 30))
+# 连接使用超过该秒数后重建，应小于 MySQL 的 wait_timeout
+DB_POOL_RECYCLE = int(os.getenv("SMARTBI_DB_POOL_RECYCLE", 3600))
+
+# 列表总数缓存的秒数，翻页时在该时间内复用总数
+PAGE_TOTAL_CACHE_TTL = int(os.getenv("SMARTBI_PAGE_TOTAL_CACHE_TTL", 30))
+
+# 大模型接口配置（可通过环境变量覆盖）
+LLM_API_KEY = os.getenv("SMARTBI_LLM_API_KEY", "sk-your-key")
+LLM_BASE_URL = os.getenv("SMARTBI_LLM_BASE_URL", "https://api.deepseek.com/v1")
+LLM_MODEL = os.getenv("SMARTBI_LLM_MODEL", "deepseek-chat")
+# 同时进行的大模型调用数上限，超过后在进程内排队
+LLM_MAX_CONCURRENCY = int(os.getenv("SMARTBI_LLM_MAX_CONCURRENCY", 8))
+# HTTP 连接池的最大连接数和保持的空闲连接数
+LLM_MAX_CONNECTIONS = int(os.getenv("SMARTBI_LLM_MAX_CONNECTIONS", 16))
+LLM_MAX_KEEPALIVE = int(os.getenv("SMARTBI_LLM_MAX_KEEPALIVE", 8))
+# 单次调用的超时秒数（可在调用时覆盖）和建立连接的超时秒数
+LLM_TIMEOUT = float(os.getenv("SMARTBI_LLM_TIMEOUT", 120))
+LLM_CONNECT_TIMEOUT = float(os.getenv("SMARTBI_LLM_CONNECT_TIMEOUT", 10))
+# 连接失败、超时、限流和服务端错误的重试次数，重试间隔为带随机抖动的指数退避，不超过 LLM_RETRY_MAX_WAIT 秒
+LLM_MAX_RETRIES = int(os.getenv("SMARTBI_LLM_MAX_RETRIES", 3))
+LLM_RETRY_MAX_WAIT = float(os.getenv("SMARTBI_LLM_RETRY_MAX_WAIT", 20))
+
+# AI 图表生成结果缓存配置（可通过环境变量覆盖）
+# 相同数据、分析目标、图表类型、提示语版本和检索到的政策内容直接返回缓存结果
+LLM_CACHE_ENABLED = os.getenv("SMARTBI_LLM_CACHE_ENABLED", "1") == "1"
+# 缓存有效期（秒）
+LLM_CACHE_TTL = int(os.getenv("SMARTBI_LLM_CACHE_TTL", 7 * 24 * 3600))
+# 进程内 LRU 缓存条数
+LLM_CACHE_MEMORY_SIZE = int(os.getenv("SMARTBI_LLM_CACHE_MEMORY_SIZE", 256))
+# 磁盘缓存（SQLite 文件，同一台机器上的多个进程共用）路径和条数上限，超出后淘汰最久未使用的条目
+LLM_CACHE_PATH = os.getenv(
+    "SMARTBI_LLM_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "llm_cache.sqlite3")
+)
+LLM_CACHE_DISK_ENTRIES = int(os.getenv("SMARTBI_LLM_CACHE_DISK_ENTRIES", 10000))
+
+# AI 图表生成提示语中数据部分的配置（可通过环境变量覆盖）
+# 数据部分的 token 预算，上传数据超出预算时改为发送数据概要（列类型、统计信息、主要类别、时间范围、分组汇总）和代表性样本行
+LLM_PROMPT_DATA_TOKENS = int(os.getenv("SMARTBI_LLM_PROMPT_DATA_TOKENS", 4000))
+# 数据概要中每个类别列列出的取值数、分组汇总的最多分组数
+DATA_PROFILE_TOP_CATEGORIES = int(os.getenv("SMARTBI_DATA_PROFILE_TOP_CATEGORIES", 10))
+# 代表性样本中均匀抽取的最多行数
+DATA_PROFILE_MAX_SAMPLE_ROWS = int(os.getenv("SMARTBI_DATA_PROFILE_MAX_SAMPLE_ROWS", 200))
+
+# 大模型 token 计数和提示语上限配置（可通过环境变量覆盖）
+# tiktoken 编码名称，DeepSeek 没有公开的 tiktoken 编码，cl100k_base 的计数与其接近
+LLM_TOKEN_ENCODING = os.getenv("SMARTBI_LLM_TOKEN_ENCODING", "cl100k_base")
+# tiktoken 编码文件缓存目录，离线部署时预先放入编码文件，无法加载时按字符估算
+TIKTOKEN_CACHE_DIR = os.getenv(
+    "TIKTOKEN_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "tiktoken")
+)
+# 各接口发送的提示语（含系统提示语）的 token 上限，超出时按接口的截断顺序截断政策内容和数据
+LLM_PROMPT_BUDGETS = {
+    "generate_chart": int(os.getenv("SMARTBI_LLM_PROMPT_BUDGET_CHART", 12000)),
+    "audit_summary": int(os.getenv("SMARTBI_LLM_PROMPT_BUDGET_AUDIT", 8000)),
+}
+
+# 图表原始数据（chart_blob 表）的 zstd 压缩级别，1-22，越大压缩率越高、越慢
+CHART_BLOB_ZSTD_LEVEL = int(os.getenv("SMARTBI_CHART_BLOB_ZSTD_LEVEL", 3))
+
+# 执行器配置（可通过环境变量覆盖）
+# 阻塞调用（同步数据库会话、文件解析、同步 HTTP 客户端）共用的线程数，不宜超过数据库连接池容量
+BLOCKING_POOL_SIZE = int(os.getenv("SMARTBI_BLOCKING_POOL_SIZE", 15))
+# CPU 密集计算（模型训练）使用的进程数
+CPU_POOL_SIZE = int(os.getenv("SMARTBI_CPU_POOL_SIZE", max((os.cpu_count() or 2) // 2, 1)))
+# 后台导入任务线程数，整表替换同一时刻只能执行一个，增量合并可以并行
+INGESTION_WORKERS = int(os.getenv("SMARTBI_INGESTION_WORKERS", 2))
+# 未完成的导入任务超过该秒数没有更新时，服务启动时视为已中断
+# 增量合并在数据事务提交前不更新任务表，该值应大于最长的增量合并耗时
+INGESTION_STALE_SECONDS = int(os.getenv("SMARTBI_INGESTION_STALE_SECONDS", 3600))
@@ -0,0 +1,98 @@
+"""
+图表原始数据存储模块
+
+本模块提供按内容寻址的图表原始数据（上传文件解析出的 CSV）存储，包括：
+
+功能列表：
+1. 写入与去重
+   - 以原始数据的 SHA-256 为主键保存在 chart_blob 表，图表只保存哈希（chart.chart_data_hash）
+   - 相同数据只保存一份，再次写入时引用计数加一
+   - 数据使用 zstd 压缩后保存
+
+2. 读取
+   - 同步会话和异步会话读取并解压
+
+3. 引用计数
+   - 图表改用其他数据时释放原数据的引用，计数归零后删除
+"""
+
+import hashlib
+import logging
+from typing import Optional
+
+import zstandard
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from config import CHART_BLOB_ZSTD_LEVEL
+from database import models
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def compress(data: bytes) -> bytes:
+    # ZstdCompressor 实例不能在线程间共享，每次新建
+    return zstandard.ZstdCompressor(level=CHART_BLOB_ZSTD_LEVEL).compress(data)
+
+
+def decompress(data: bytes) -> bytes:
+    return zstandard.ZstdDecompressor().decompress(data)
+
+
+def put_blob(db: Session, text: str) -> str:
+    """
+    保存原始数据并增加一次引用，不提交事务
+
+    Returns:
+        数据的 SHA-256，写入 chart.chart_data_hash
+    """
+    raw = text.encode('utf-8')
+    digest = content_hash(raw)
+    blob_table = models.ChartBlob.__table__
+
+    # 已有相同数据时只增加引用计数
+    if db.execute(update(blob_table).where(blob_table.c.hash == digest)
+                  .values(ref_count=blob_table.c.ref_count + 1)).rowcount:
+        logger.info(f"图表原始数据已存在，复用: {digest}")
+        return digest
+
+    compressed = compress(raw)
+    try:
+        # 并发写入同一份数据时主键冲突，回滚到保存点后改为增加引用计数
+        with db.begin_nested():
+            db.add(models.ChartBlob(hash=digest, data=compressed, size=len(raw),
+                                    compressed_size=len(compressed), ref_count=1))
+    except IntegrityError:
+        db.execute(update(blob_table).where(blob_table.c.hash == digest)
+                   .values(ref_count=blob_table.c.ref_count + 1))
+        return digest
+    logger.info(f"保存图表原始数据: {digest}，{len(raw)} 字节压缩为 {len(compressed)} 字节")
+    return digest
+
+
+def release_blob(db: Session, digest: Optional[str]):
+    """释放一次引用，引用计数归零时删除数据，不提交事务"""
+    if not digest:
+        return
+    blob_table = models.ChartBlob.__table__
+    db.execute(update(blob_table).where(blob_table.c.hash == digest)
+               .values(ref_count=blob_table.c.ref_count - 1))
+    db.execute(delete(blob_table).where(blob_table.c.hash == digest, blob_table.c.ref_count <= 0))
+
+
+def get_blob(db: Session, digest: str) -> Optional[str]:
+    """读取原始数据，不存在时返回 None"""
+    data = db.scalar(select(models.ChartBlob.data).where(models.ChartBlob.hash == digest))
+    return None if data is None else decompress(data).decode('utf-8')
+
+
+async def get_blob_async(db: AsyncSession, digest: str) -> Optional[str]:
+    """读取原始数据（异步会话），不存在时返回 None"""
+    data = await db.scalar(select(models.ChartBlob.data).where(models.ChartBlob.hash == digest))
+    return None if data is None else decompress(data).decode('utf-8')
@@ -1,10 +1,11 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import text
+import numpy as np
 import pandas as pd
 from typing import Dict, Any, List
 import logging
 from .models import DataCenter
 from fastapi import HTTPException
+from utils.data_snapshot import data_center_snapshot
 
 logger = logging.getLogger(__name__)
 
@@ -66,6 +67,7 @@ def create_batch_existing_data(db: Session, df: pd.DataFrame) -> Dict[str, Any]:
         # 提交事务
         if success_count > 0:
             db.commit()
+            data_center_snapshot.bump_version()
         
         # 返回处理结果
         return {
@@ -88,7 +90,7 @@ def get_existing_data_by_coordinates(
     latitude: float,
     longitude: float,
     radius_km: float
-) -> List[DataCenter]:
+) -> List[Dict[str, Any]]:
     """
     根据坐标和半径获取范围内的存量机房数据
     
@@ -99,37 +101,31 @@ def get_existing_data_by_coordinates(
         radius_km: 半径（公里）
     
     Returns:
-        List[DataCenter]: 范围内的机房列表
+        List[Dict]: 范围内的机房列表（含 distance 字段），按距离升序排列
     """
     try:
-        # 使用 Haversine 公式计算距离的 SQL
-        sql = text("""
-            SELECT *, 
-            (
-                6371 * acos(
-                    cos(radians(:lat)) * cos(radians(latitude)) *
-                    cos(radians(longitude) - radians(:lon)) +
-                    sin(radians(:lat)) * sin(radians(latitude))
-                )
-            ) AS distance
-            FROM data_centers
-            WHERE is_new = false
-            HAVING distance <= :radius
-            ORDER BY distance;
-        """)
-        
-        # 执行查询
-        result = db.execute(
-            sql,
-            {
-                "lat": latitude,
-                "lon": longitude,
-                "radius": radius_km
-            }
-        )
+        # 通过空间索引查询范围内的机房
+        snapshot = data_center_snapshot.get(db)
+        indices, distances = snapshot.index.query_radius(latitude, longitude, radius_km).neighbors_of(0)
+        order = np.argsort(distances, kind='stable')
+        ids = snapshot.ids[indices[order]]
+        
+        # 只加载范围内的机房记录
+        rows = {
+            dc.id: dc
+            for dc in db.query(DataCenter).filter(DataCenter.id.in_(ids.tolist())).all()
+        }
         
         # 转换结果
-        return [dict(row) for row in result]
+        result = []
+        for data_center_id, distance in zip(ids, distances[order]):
+            dc = rows.get(int(data_center_id))
+            if dc is None:
+                continue
+            record = {column.name: getattr(dc, column.name) for column in DataCenter.__table__.columns}
+            record['distance'] = float(distance)
+            result.append(record)
+        return result
         
     except Exception as e:
         logger.error(f"获取范围内的存量机房数据失败: {str(e)}")
@@ -173,6 +169,7 @@ def delete_existing_data(db: Session, data_center_id: int) -> Dict[str, Any]:
         
         db.delete(data_center)
         db.commit()
+        data_center_snapshot.bump_version()
         
         return {
             "success": True,
@@ -230,6 +227,7 @@ def update_existing_data(
         
         db.commit()
         db.refresh(data_center)
+        data_center_snapshot.bump_version()
         
         return {
             "success": True,
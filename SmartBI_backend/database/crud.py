@@ -1,6 +1,7 @@
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 from . import models
+from utils.user_cache import invalidate_user
 import logging
 
 logger = logging.getLogger(__name__)
@@ -53,6 +54,7 @@ def update_user_password(db: Session, user_id: int, new_password: str):
         if db_user:
             db_user.userPassword = new_password
             db.commit()
+            invalidate_user(user_id)
             logger.info(f"Successfully updated password for user ID: {user_id}")
             return True
         return False
@@ -63,4 +65,4 @@ def update_user_password(db: Session, user_id: int, new_password: str):
     except Exception as e:
         db.rollback()
         logger.error(f"Unexpected error while updating user password: {str(e)}")
-        raise 
\ No newline at end of file
+        raise
@@ -0,0 +1,88 @@
+"""
+图表全文检索模块
+
+本模块提供图表名称（name）和分析目标（goal）的全文检索，包括：
+
+功能列表：
+1. 全文索引
+   - MySQL：chart(name, goal) 上的 FULLTEXT 索引，使用 ngram 分词器支持中文
+   - SQLite（本地开发和测试）：外部内容 FTS5 虚拟表 chart_fts，trigram 分词，由触发器与 chart 表同步
+
+2. 检索条件
+   - 关键词按空白拆分，每个词都必须出现（短语匹配，效果与 LIKE '%词%' 相同）
+   - 在查询上加入匹配条件，并返回相关度表达式，相关度越大越相关
+   - 词长小于分词长度（MySQL ngram 为 2，SQLite trigram 为 3）的词全文索引无法匹配，改用 LIKE 条件；
+     全部为短词时只用 LIKE，相关度记为 0
+"""
+
+from typing import List, Tuple
+
+from sqlalchemy import Select, column, func, literal, literal_column, or_, select, table
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.sql import ColumnElement
+
+FULLTEXT_INDEX = 'ft_chart_name_goal'
+FTS_TABLE = 'chart_fts'
+
+# 各数据库全文索引能匹配的最短词长
+MIN_TOKEN_LENGTH = {'mysql': 2, 'sqlite': 3}
+
+# SQLite FTS5 虚拟表及同步触发器，在 chart 表创建后执行
+SQLITE_FTS_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"name, goal, content='chart', content_rowid='id', tokenize='trigram')",
+    f"CREATE TRIGGER IF NOT EXISTS chart_fts_ai AFTER INSERT ON chart BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, name, goal) VALUES (new.id, new.name, new.goal); END",
+    f"CREATE TRIGGER IF NOT EXISTS chart_fts_ad AFTER DELETE ON chart BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, goal) VALUES ('delete', old.id, old.name, old.goal); END",
+    f"CREATE TRIGGER IF NOT EXISTS chart_fts_au AFTER UPDATE OF name, goal ON chart BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, goal) VALUES ('delete', old.id, old.name, old.goal); "
+    f"INSERT INTO {FTS_TABLE}(rowid, name, goal) VALUES (new.id, new.name, new.goal); END",
+]
+
+
+def _split_keyword(keyword: str) -> List[str]:
+    # 双引号在 MySQL 布尔模式和 FTS5 中都是短语定界符，去掉后再拆分
+    return keyword.replace('"', ' ').split()
+
+
+def apply_chart_match(query: Select, dialect: str, keyword: str) -> Tuple[Select, ColumnElement]:
+    """
+    为图表查询加上关键词检索条件
+
+    Args:
+        query: 以 chart 表为主表的查询（列表查询或计数查询）
+        dialect: 数据库方言名称（mysql / sqlite）
+        keyword: 检索关键词，多个词用空白分隔
+
+    Returns:
+        (加上检索条件的查询, 相关度表达式)
+    """
+    # 在函数内导入，避免 models 导入本模块时循环引用
+    from database.models import Chart
+
+    words = _split_keyword(keyword)
+    min_length = MIN_TOKEN_LENGTH.get(dialect, 0)
+    indexed = [word for word in words if min_length and len(word) >= min_length]
+    # 过短的词全文索引无法匹配，用 LIKE 在全文检索命中的结果上继续过滤
+    query = query.where(*[
+        or_(Chart.name.contains(word, autoescape=True), Chart.goal.contains(word, autoescape=True))
+        for word in words if word not in indexed
+    ])
+    if not indexed:
+        return query, literal(0.0)
+
+    if dialect == 'mysql':
+        # 布尔模式下 +"词" 表示必须包含该短语
+        relevance = match(Chart.name, Chart.goal, against=' '.join(f'+"{word}"' for word in indexed)).in_boolean_mode()
+        return query.where(relevance), relevance
+
+    # FTS5 中多个短语之间默认为 AND；bm25 越小越相关，取负数使方向与 MySQL 一致
+    # 先在物化的 CTE 中查出命中的 rowid，避免优化器先扫描 chart 表再逐行查询全文索引
+    fts = table(FTS_TABLE, column('rowid'))
+    matched = select(
+        fts.c.rowid.label('id'),
+        (-func.bm25(literal_column(FTS_TABLE))).label('relevance')
+    ).where(literal_column(FTS_TABLE).match(' '.join(f'"{word}"' for word in indexed)))\
+        .cte('chart_match').prefix_with('MATERIALIZED')
+    return query.join(matched, matched.c.id == Chart.id), matched.c.relevance
@@ -1,8 +1,12 @@
-from sqlalchemy import Column, Integer, String, DateTime, BigInteger, SmallInteger, Float, JSON, ForeignKey, Boolean, Text
+from sqlalchemy import Column, Integer, String, DateTime, BigInteger, SmallInteger, Float, JSON, ForeignKey, Boolean, Text, Index, LargeBinary
+from sqlalchemy.dialects.mysql import LONGBLOB
+from sqlalchemy import DDL, event
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import deferred
 from datetime import datetime
 from sqlalchemy.sql import func
 from .connection import DatabaseConnection
+from .fulltext import FULLTEXT_INDEX, FTS_TABLE, SQLITE_FTS_DDL
 
 Base = declarative_base()
 
@@ -37,6 +41,11 @@ class DataCenter(Base):
     create_time = Column(DateTime(timezone=True), server_default=func.now(), comment='创建时间')
     update_time = Column(DateTime(timezone=True), onupdate=func.now(), comment='更新时间')
 
+    # 索引由 migrations/versions/0002_hot_query_indexes.py 添加到已有数据库
+    __table_args__ = (
+        Index('ix_data_centers_contract_code', 'contract_code'),
+    )
+
 class RentAnalysis(Base):
     """租金分析记录表"""
     __tablename__ = 'rent_analysis'
@@ -52,16 +61,87 @@ class Chart(Base):
     """图表数据表"""
     __tablename__ = 'chart'
     
-    id = Column(BigInteger, primary_key=True, comment='主键')
+    # 自增主键（由 migrations/versions/0003_chart_id_autoincrement.py 迁移），SQLite 只有 INTEGER 主键自增
+    id = Column(BigInteger().with_variant(Integer, 'sqlite'), primary_key=True, autoincrement=True, comment='主键')
     name = Column(String(128), nullable=True, comment='名称')
     goal = Column(Text, nullable=True, comment='分析目标')
-    chart_data = Column(Text, nullable=True, comment='图表数据')
+    # 原始 CSV、ECharts 配置和分析结论体积较大，默认延迟加载，查询时按需 undefer
+    # 新图表的原始 CSV 保存在 chart_blob 表，chart_data 只保留迁移前的历史数据
+    chart_data = deferred(Column(Text, nullable=True, comment='图表数据'))
+    chart_data_hash = Column(String(64), nullable=True, index=True, comment='原始数据在 chart_blob 中的 SHA-256')
     chart_type = Column(String(128), nullable=True, comment='图表类型')
-    gen_chart = Column(Text, nullable=True, comment='生成的图表数据')
-    gen_result = Column(Text, nullable=True, comment='生成的分析结论')
+    gen_chart = deferred(Column(Text, nullable=True, comment='生成的图表数据'))
+    gen_result = deferred(Column(Text, nullable=True, comment='生成的分析结论'))
     status = Column(String(128), nullable=True, comment='任务状态')
     exec_message = Column(Text, nullable=True, comment='执行信息')
     user_id = Column(BigInteger, nullable=False, comment='用户id')
     create_time = Column(DateTime, nullable=False, default=datetime.now, comment='创建时间')
     update_time = Column(DateTime, nullable=False, default=datetime.now, onupdate=datetime.now, comment='更新时间')
-    is_delete = Column(SmallInteger, nullable=False, default=0, comment='是否删除') 
\ No newline at end of file
+    is_delete = Column(SmallInteger, nullable=False, default=0, comment='是否删除') 
+
+    # 索引由 migrations/versions/0002_hot_query_indexes.py 添加到已有数据库
+    __table_args__ = (
+        Index('ix_chart_user_id_is_delete_create_time', 'user_id', 'is_delete', 'create_time', 'id'),
+        Index('ix_chart_is_delete_create_time', 'is_delete', 'create_time', 'id'),
+        Index('ix_chart_status', 'status'),
+        # 名称和分析目标的全文索引（migrations/versions/0004_chart_fulltext.py），SQLite 使用 FTS5 虚拟表代替
+        Index(FULLTEXT_INDEX, 'name', 'goal', mysql_prefix='FULLTEXT', mysql_with_parser='ngram').ddl_if(dialect='mysql'),
+    )
+
+# SQLite 建 chart 表后创建 FTS5 虚拟表和同步触发器，删表前删除虚拟表
+for statement in SQLITE_FTS_DDL:
+    event.listen(Chart.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+event.listen(Chart.__table__, 'before_drop', DDL(f'DROP TABLE IF EXISTS {FTS_TABLE}').execute_if(dialect='sqlite'))
+
+class ChartBlob(Base):
+    """图表原始数据表，按内容的 SHA-256 去重，zstd 压缩保存"""
+    __tablename__ = 'chart_blob'
+
+    hash = Column(String(64), primary_key=True, comment='原始数据的 SHA-256')
+    data = deferred(Column(LargeBinary().with_variant(LONGBLOB(), 'mysql'), nullable=False, comment='zstd 压缩后的数据'))
+    size = Column(BigInteger, nullable=False, comment='原始字节数')
+    compressed_size = Column(BigInteger, nullable=False, comment='压缩后字节数')
+    ref_count = Column(Integer, nullable=False, default=1, comment='引用该数据的图表数')
+    create_time = Column(DateTime, nullable=False, default=datetime.now, comment='创建时间')
+
+class LlmUsage(Base):
+    """大模型调用用量表，每次调用（含命中缓存）一行"""
+    __tablename__ = 'llm_usage'
+
+    id = Column(BigInteger().with_variant(Integer, 'sqlite'), primary_key=True, autoincrement=True, comment='主键')
+    endpoint = Column(String(64), nullable=False, comment='调用场景：generate_chart/audit_summary')
+    model = Column(String(128), nullable=True, comment='模型名称')
+    user_id = Column(BigInteger, nullable=True, comment='用户id')
+    chart_id = Column(BigInteger, nullable=True, index=True, comment='图表id')
+    prompt_tokens = Column(Integer, nullable=True, comment='发送前计算的提示语 token 数')
+    input_tokens = Column(Integer, nullable=True, comment='接口返回的输入 token 数')
+    output_tokens = Column(Integer, nullable=True, comment='输出 token 数')
+    latency_ms = Column(Integer, nullable=True, comment='调用耗时（毫秒，含重试）')
+    cached = Column(SmallInteger, nullable=False, default=0, comment='是否命中结果缓存')
+    status = Column(String(32), nullable=False, comment='调用结果：succeeded/failed')
+    create_time = Column(DateTime, nullable=False, default=datetime.now, comment='创建时间')
+
+    __table_args__ = (
+        Index('ix_llm_usage_endpoint_create_time', 'endpoint', 'create_time'),
+    )
+
+class IngestionJob(Base):
+    """存量机房数据导入任务表"""
+    __tablename__ = 'ingestion_job'
+    
+    id = Column(Integer, primary_key=True, autoincrement=True, comment='主键')
+    filename = Column(String(256), nullable=False, comment='上传文件名')
+    mode = Column(String(32), nullable=False, comment='导入方式：replace/upsert')
+    options = Column(JSON, nullable=True, comment='导入参数')
+    status = Column(String(32), nullable=False, default='waiting', comment='任务状态：waiting/running/succeeded/failed')
+    phase = Column(String(32), nullable=False, default='queued', comment='当前阶段')
+    total_records = Column(Integer, nullable=False, default=0, comment='已读取行数')
+    success_count = Column(Integer, nullable=False, default=0, comment='已处理成功行数')
+    failed_count = Column(Integer, nullable=False, default=0, comment='校验失败行数')
+    result = Column(JSON, nullable=True, comment='导入结果')
+    exec_message = Column(Text, nullable=True, comment='执行信息')
+    user_id = Column(BigInteger, nullable=True, comment='用户id')
+    start_time = Column(DateTime, nullable=True, comment='开始处理时间')
+    finish_time = Column(DateTime, nullable=True, comment='结束时间')
+    create_time = Column(DateTime, nullable=False, default=datetime.now, comment='创建时间')
+    update_time = Column(DateTime, nullable=False, default=datetime.now, onupdate=datetime.now, comment='更新时间')
@@ -0,0 +1,43 @@
+"""
+带统计的数据库连接池
+
+在 SQLAlchemy 的 QueuePool 上记录每次取连接的耗时，包括等待其他请求归还连接和新建连接的时间。
+通过 create_engine(..., poolclass=InstrumentedQueuePool) 使用，异步引擎使用 InstrumentedAsyncQueuePool。
+"""
+
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from utils.metrics import PoolStats
+
+
+class InstrumentedQueuePool(QueuePool):
+    """记录取连接耗时的 QueuePool"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        # 池内没有空闲连接且溢出连接已用完时，本次取连接需要等待
+        waited = self._max_overflow > -1 and self._pool.empty() and self._overflow >= self._max_overflow
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.record(time.perf_counter() - start, waited=True, timed_out=True)
+            raise
+        self.stats.record(time.perf_counter() - start, waited=waited)
+        return connection
+
+    def recreate(self):
+        # engine.dispose() 会重建连接池，统计延续到新连接池
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+
+class InstrumentedAsyncQueuePool(InstrumentedQueuePool, AsyncAdaptedQueuePool):
+    """记录取连接耗时的异步引擎连接池"""
@@ -0,0 +1,131 @@
+"""
+影子表替换模块
+
+本模块提供整表重新加载时使用的影子表操作，包括：
+
+功能列表：
+1. 影子表创建
+   - 按正式表结构创建同构的影子表，索引在影子表上预先建好
+   - 清理上次失败遗留的影子表和旧表
+2. 原子替换
+   - 校验影子表行数后用改名一次性替换正式表
+   - MySQL 使用 RENAME TABLE 同时改名两张表，SQLite 在同一事务内改名
+
+数据写入影子表期间正式表不加锁，读取接口不受影响。
+"""
+
+import logging
+import threading
+from typing import Optional
+
+from sqlalchemy import MetaData, Table, func, inspect, select, text
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+STAGING_SUFFIX = '_staging'
+RETIRED_SUFFIX = '_old'
+# SQLite 的索引名全库唯一且不能改名，影子表索引在两个名字之间交替使用
+SHADOW_INDEX_SUFFIX = '_shadow'
+
+# 同一进程内同一时刻只允许一次整表替换
+_swap_lock = threading.Lock()
+
+
+class ShadowTable:
+    """
+    一次整表替换使用的影子表
+
+    用法：
+        with ShadowTable(db, models.DataCenter.__table__) as shadow:
+            db.execute(insert(shadow.staging), rows)
+            shadow.swap(len(rows))
+
+    离开 with 块时如果没有完成替换，影子表会被删除，正式表保持不变。
+    """
+
+    def __init__(self, db: Session, table: Table):
+        self.db = db
+        self.table = table
+        self.staging: Optional[Table] = None
+        self.swapped = False
+        self._dialect = db.get_bind().dialect
+        self._staging_name = table.name + STAGING_SUFFIX
+        self._retired_name = table.name + RETIRED_SUFFIX
+
+    def __enter__(self) -> 'ShadowTable':
+        _swap_lock.acquire()
+        try:
+            self._create()
+        except Exception:
+            _swap_lock.release()
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if not self.swapped:
+                self.db.rollback()
+                self._drop(self._staging_name)
+                self.db.commit()
+                if exc_type is not None:
+                    logger.warning(f"{self.table.name} 整表替换失败，已删除影子表: {exc_value}")
+        finally:
+            _swap_lock.release()
+        return False
+
+    def _quote(self, name: str) -> str:
+        return self._dialect.identifier_preparer.quote(name)
+
+    def _drop(self, name: str):
+        self.db.execute(text(f"DROP TABLE IF EXISTS {self._quote(name)}"))
+
+    def _create(self):
+        """创建影子表，索引随表一起创建"""
+        self._drop(self._staging_name)
+        self._drop(self._retired_name)
+        self.staging = self.table.to_metadata(MetaData(), name=self._staging_name)
+
+        if self._dialect.name == 'mysql':
+            # LIKE 复制正式表的全部列、索引和自增设置
+            self.db.execute(text(
+                f"CREATE TABLE {self._quote(self._staging_name)} LIKE {self._quote(self.table.name)}"
+            ))
+        else:
+            connection = self.db.connection()
+            used = {index['name'] for index in inspect(connection).get_indexes(self.table.name)}
+            for index in self.staging.indexes:
+                name = index.name.replace(self._staging_name, self.table.name)
+                index.name = name + SHADOW_INDEX_SUFFIX if name in used else name
+            self.staging.create(connection)
+        self.db.commit()
+
+    def swap(self, expected_rows: int):
+        """
+        校验影子表行数后替换正式表
+
+        Args:
+            expected_rows: 影子表应有的行数，不一致时放弃替换并抛出 ValueError
+        """
+        self.db.commit()
+        count = self.db.execute(select(func.count()).select_from(self.staging)).scalar()
+        if count != expected_rows:
+            raise ValueError(f"影子表行数 {count} 与预期 {expected_rows} 不一致，已放弃替换")
+
+        live = self._quote(self.table.name)
+        staging = self._quote(self._staging_name)
+        retired = self._quote(self._retired_name)
+        if self._dialect.name == 'mysql':
+            # 一条 RENAME TABLE 语句内的改名是原子的
+            self.db.execute(text(f"RENAME TABLE {live} TO {retired}, {staging} TO {live}"))
+        else:
+            # pysqlite 不会为 DDL 自动开启事务，这里显式开启，保证两次改名一起生效
+            self.db.execute(text("BEGIN"))
+            self.db.execute(text(f"ALTER TABLE {live} RENAME TO {retired}"))
+            self.db.execute(text(f"ALTER TABLE {staging} RENAME TO {live}"))
+        self.db.commit()
+        self.swapped = True
+
+        self._drop(self._retired_name)
+        self.db.commit()
+        logger.info(f"{self.table.name} 整表替换完成，共 {count} 行")
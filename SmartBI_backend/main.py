@@ -1,7 +1,11 @@
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from router import user, auth, data, analysis, chart, ai, document
+from router import user, auth, data, analysis, chart, ai, document, metrics
+from database.connection import DatabaseConnection, AsyncDatabaseConnection
+from api.ingestion import recover_interrupted_jobs
+from utils.executor import configure_thread_limiter, shutdown_executors
+from utils.llm_client import llm_client
 import logging
 import traceback
 import uvicorn
@@ -62,6 +66,30 @@ app.include_router(analysis.router)
 app.include_router(chart.router)
 app.include_router(ai.router)
 app.include_router(document.router)
+app.include_router(metrics.router)
+
+@app.on_event("startup")
+async def configure_executors():
+    """设置阻塞调用线程池容量，同步路由、同步依赖和 run_blocking 共用"""
+    configure_thread_limiter()
+
+@app.on_event("shutdown")
+async def close_executors():
+    shutdown_executors()
+    await AsyncDatabaseConnection.dispose()
+    await llm_client.aclose()
+
+@app.on_event("startup")
+def recover_ingestion_jobs():
+    """将上次运行时中断的导入任务标记为失败，ingestion_job 表由 alembic 迁移创建"""
+    try:
+        db = DatabaseConnection.get_session()
+        try:
+            recover_interrupted_jobs(db)
+        finally:
+            db.close()
+    except Exception as e:
+        logger.error(f"恢复导入任务状态失败: {str(e)}")
 
 @app.get("/")
 async def root():
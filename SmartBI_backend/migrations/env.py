@@ -0,0 +1,60 @@
+"""
+Alembic 迁移环境
+
+连接地址按以下顺序确定：
+1. 命令行 -x url=...
+2. 调用方在 Config 中设置的 sqlalchemy.url（测试使用）
+3. config.DATABASE_URL
+"""
+
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import create_engine
+
+from config import DATABASE_URL
+from database import models
+
+config = context.config
+
+if config.config_file_name is not None and config.attributes.get('configure_logger', True):
+    fileConfig(config.config_file_name)
+
+target_metadata = models.Base.metadata
+
+
+def get_url() -> str:
+    return context.get_x_argument(as_dictionary=True).get('url') \
+        or config.get_main_option('sqlalchemy.url') \
+        or DATABASE_URL
+
+
+def run_migrations_offline():
+    """生成 SQL 脚本而不连接数据库（alembic upgrade head --sql）"""
+    context.configure(
+        url=get_url(),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    connectable = create_engine(get_url())
+    with connectable.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            # SQLite 不支持大部分 ALTER TABLE，使用批量模式重建表
+            render_as_batch=connection.dialect.name == 'sqlite'
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,24 @@
+"""基线版本
+
+此前的表结构由建表脚本维护，本版本不做修改，作为后续迁移的起点。
+已有数据库直接执行 alembic upgrade head 即可。
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    pass
+
+
+def downgrade() -> None:
+    pass
@@ -0,0 +1,50 @@
+"""热点查询索引
+
+- data_centers(contract_code)：增量合并按合同编码查找已有记录
+- chart(user_id, is_delete, create_time, id)：我的图表列表按用户筛选、按 (create_time, id) 排序和游标翻页
+- chart(is_delete, create_time, id)：全部图表列表按 (create_time, id) 排序和游标翻页
+- chart(status)：按任务状态筛选
+
+索引已存在（例如由 create_all 建表）时跳过。执行计划和耗时对比见 tests/bench_indexes.py。
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ('ix_data_centers_contract_code', 'data_centers', ['contract_code']),
+    ('ix_chart_user_id_is_delete_create_time', 'chart', ['user_id', 'is_delete', 'create_time', 'id']),
+    ('ix_chart_is_delete_create_time', 'chart', ['is_delete', 'create_time', 'id']),
+    ('ix_chart_status', 'chart', ['status']),
+]
+
+
+def _existing_indexes(table: str) -> set:
+    # 生成 SQL 脚本（--sql）时无法查询数据库，按索引都不存在处理
+    if context.is_offline_mode():
+        return set()
+    inspector = sa.inspect(op.get_bind())
+    return {index['name'] for index in inspector.get_indexes(table)}
+
+
+def upgrade() -> None:
+    for name, table, columns in INDEXES:
+        if name not in _existing_indexes(table):
+            op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        if name in _existing_indexes(table):
+            op.drop_index(name, table_name=table)
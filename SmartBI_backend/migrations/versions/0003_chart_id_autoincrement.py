@@ -0,0 +1,39 @@
+"""图表主键改为自增
+
+此前 create_chart 先查询 max(id) 再插入 max(id) + 1，并发创建时会得到相同的 id 并因主键冲突失败。
+改为由数据库分配自增主键：
+- MySQL：chart.id 加上 AUTO_INCREMENT，起始值自动取当前最大 id 之后
+- SQLite：只有 INTEGER PRIMARY KEY 自增，重建表并把 id 改为 INTEGER
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    dialect = op.get_context().dialect.name
+    if dialect == 'mysql':
+        op.execute("ALTER TABLE chart MODIFY id BIGINT NOT NULL AUTO_INCREMENT COMMENT '主键'")
+    elif dialect == 'sqlite':
+        with op.batch_alter_table('chart', recreate='always') as batch:
+            batch.alter_column('id', existing_type=sa.BigInteger(), type_=sa.Integer(), autoincrement=True)
+
+
+def downgrade() -> None:
+    dialect = op.get_context().dialect.name
+    if dialect == 'mysql':
+        op.execute("ALTER TABLE chart MODIFY id BIGINT NOT NULL COMMENT '主键'")
+    elif dialect == 'sqlite':
+        with op.batch_alter_table('chart', recreate='always') as batch:
+            batch.alter_column('id', existing_type=sa.Integer(), type_=sa.BigInteger(), autoincrement=False)
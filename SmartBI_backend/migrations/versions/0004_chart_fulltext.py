@@ -0,0 +1,73 @@
+"""图表名称和分析目标全文索引
+
+图表列表按名称检索时使用 LIKE '%关键词%'，前导通配符无法使用索引，需要扫描整张 chart 表（含大字段）。
+改为全文索引：
+- MySQL：chart(name, goal) 上的 FULLTEXT 索引，ngram 分词器支持中文
+- SQLite：外部内容 FTS5 虚拟表 chart_fts（trigram 分词）和同步触发器，并用已有数据重建索引
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, Sequence[str], None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+FULLTEXT_INDEX = 'ft_chart_name_goal'
+
+SQLITE_UPGRADE = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS chart_fts USING fts5("
+    "name, goal, content='chart', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS chart_fts_ai AFTER INSERT ON chart BEGIN "
+    "INSERT INTO chart_fts(rowid, name, goal) VALUES (new.id, new.name, new.goal); END",
+    "CREATE TRIGGER IF NOT EXISTS chart_fts_ad AFTER DELETE ON chart BEGIN "
+    "INSERT INTO chart_fts(chart_fts, rowid, name, goal) VALUES ('delete', old.id, old.name, old.goal); END",
+    "CREATE TRIGGER IF NOT EXISTS chart_fts_au AFTER UPDATE OF name, goal ON chart BEGIN "
+    "INSERT INTO chart_fts(chart_fts, rowid, name, goal) VALUES ('delete', old.id, old.name, old.goal); "
+    "INSERT INTO chart_fts(rowid, name, goal) VALUES (new.id, new.name, new.goal); END",
+    # 用 chart 表中已有的数据重建全文索引
+    "INSERT INTO chart_fts(chart_fts) VALUES ('rebuild')",
+]
+
+SQLITE_DOWNGRADE = [
+    "DROP TRIGGER IF EXISTS chart_fts_au",
+    "DROP TRIGGER IF EXISTS chart_fts_ad",
+    "DROP TRIGGER IF EXISTS chart_fts_ai",
+    "DROP TABLE IF EXISTS chart_fts",
+]
+
+
+def _has_fulltext_index() -> bool:
+    # 生成 SQL 脚本（--sql）时无法查询数据库，按索引不存在处理
+    if context.is_offline_mode():
+        return False
+    inspector = sa.inspect(op.get_bind())
+    return FULLTEXT_INDEX in {index['name'] for index in inspector.get_indexes('chart')}
+
+
+def upgrade() -> None:
+    dialect = op.get_context().dialect.name
+    if dialect == 'mysql':
+        # 索引已存在（例如由 create_all 建表）时跳过
+        if not _has_fulltext_index():
+            op.create_index(FULLTEXT_INDEX, 'chart', ['name', 'goal'], mysql_prefix='FULLTEXT', mysql_with_parser='ngram')
+    elif dialect == 'sqlite':
+        for statement in SQLITE_UPGRADE:
+            op.execute(statement)
+
+
+def downgrade() -> None:
+    dialect = op.get_context().dialect.name
+    if dialect == 'mysql':
+        if _has_fulltext_index():
+            op.drop_index(FULLTEXT_INDEX, table_name='chart')
+    elif dialect == 'sqlite':
+        for statement in SQLITE_DOWNGRADE:
+            op.execute(statement)
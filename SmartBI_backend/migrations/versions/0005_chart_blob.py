@@ -0,0 +1,112 @@
+"""图表原始数据按内容寻址保存
+
+图表原始 CSV 改为保存在 chart_blob 表：以 SHA-256 为主键去重，zstd 压缩，按引用计数回收。
+chart 表增加 chart_data_hash 列，已有图表的 chart_data 迁移到 chart_blob 后清空。
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+"""
+import hashlib
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+import zstandard
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, Sequence[str], None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+HASH_INDEX = 'ix_chart_chart_data_hash'
+ZSTD_LEVEL = 3
+BATCH_SIZE = 500
+
+chart = sa.table('chart', sa.column('id', sa.BigInteger), sa.column('chart_data', sa.Text),
+                 sa.column('chart_data_hash', sa.String))
+chart_blob = sa.table('chart_blob', sa.column('hash', sa.String), sa.column('data', sa.LargeBinary),
+                      sa.column('size', sa.BigInteger), sa.column('compressed_size', sa.BigInteger),
+                      sa.column('ref_count', sa.Integer), sa.column('create_time', sa.DateTime))
+
+
+def _inspector():
+    # 生成 SQL 脚本（--sql）时无法查询数据库
+    return None if context.is_offline_mode() else sa.inspect(op.get_bind())
+
+
+def _move_chart_data():
+    """把已有图表的 chart_data 写入 chart_blob，分批处理"""
+    bind = op.get_bind()
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(chart.c.id, chart.c.chart_data)
+            .where(chart.c.id > last_id, chart.c.chart_data.is_not(None), chart.c.chart_data_hash.is_(None))
+            .order_by(chart.c.id).limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+        for chart_id, chart_data in rows:
+            raw = chart_data.encode('utf-8')
+            digest = hashlib.sha256(raw).hexdigest()
+            updated = bind.execute(
+                sa.update(chart_blob).where(chart_blob.c.hash == digest).values(ref_count=chart_blob.c.ref_count + 1)
+            ).rowcount
+            if not updated:
+                compressed = compressor.compress(raw)
+                bind.execute(sa.insert(chart_blob).values(
+                    hash=digest, data=compressed, size=len(raw), compressed_size=len(compressed),
+                    ref_count=1, create_time=sa.func.now()
+                ))
+            bind.execute(sa.update(chart).where(chart.c.id == chart_id).values(chart_data_hash=digest, chart_data=None))
+        last_id = rows[-1][0]
+
+
+def _restore_chart_data():
+    """降级前把 chart_blob 中的数据写回 chart_data"""
+    bind = op.get_bind()
+    decompressor = zstandard.ZstdDecompressor()
+    rows = bind.execute(
+        sa.select(chart.c.id, chart_blob.c.data).join(chart_blob, chart_blob.c.hash == chart.c.chart_data_hash)
+    )
+    for chart_id, data in rows.all():
+        bind.execute(sa.update(chart).where(chart.c.id == chart_id)
+                     .values(chart_data=decompressor.decompress(data).decode('utf-8')))
+
+
+def upgrade() -> None:
+    inspector = _inspector()
+    if inspector is None or not inspector.has_table('chart_blob'):
+        op.create_table(
+            'chart_blob',
+            sa.Column('hash', sa.String(64), primary_key=True, comment='原始数据的 SHA-256'),
+            sa.Column('data', sa.LargeBinary().with_variant(mysql.LONGBLOB(), 'mysql'), nullable=False,
+                      comment='zstd 压缩后的数据'),
+            sa.Column('size', sa.BigInteger(), nullable=False, comment='原始字节数'),
+            sa.Column('compressed_size', sa.BigInteger(), nullable=False, comment='压缩后字节数'),
+            sa.Column('ref_count', sa.Integer(), nullable=False, comment='引用该数据的图表数'),
+            sa.Column('create_time', sa.DateTime(), nullable=False, comment='创建时间'),
+        )
+    if inspector is None or 'chart_data_hash' not in {column['name'] for column in inspector.get_columns('chart')}:
+        op.add_column('chart', sa.Column('chart_data_hash', sa.String(64), nullable=True,
+                                         comment='原始数据在 chart_blob 中的 SHA-256'))
+    if inspector is None or HASH_INDEX not in {index['name'] for index in inspector.get_indexes('chart')}:
+        op.create_index(HASH_INDEX, 'chart', ['chart_data_hash'])
+    if inspector is not None:
+        _move_chart_data()
+
+
+def downgrade() -> None:
+    if not context.is_offline_mode():
+        _restore_chart_data()
+    op.drop_index(HASH_INDEX, table_name='chart')
+    if op.get_context().dialect.name == 'sqlite':
+        # batch 模式会重建 chart 表并丢失全文检索触发器，SQLite 3.35 起支持直接删除列
+        op.execute('ALTER TABLE chart DROP COLUMN chart_data_hash')
+    else:
+        op.drop_column('chart', 'chart_data_hash')
+    op.drop_table('chart_blob')
@@ -0,0 +1,47 @@
+"""大模型调用用量表
+
+新增 llm_usage 表，记录每次图表生成和稽核总结调用的提示语 token 数、接口返回的输入/输出 token 数、
+耗时和是否命中缓存，用于按接口、用户和图表统计成本。
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, Sequence[str], None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # create_all 建好的数据库已有该表
+    if not context.is_offline_mode() and sa.inspect(op.get_bind()).has_table('llm_usage'):
+        return
+    op.create_table(
+        'llm_usage',
+        sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), primary_key=True, autoincrement=True,
+                  comment='主键'),
+        sa.Column('endpoint', sa.String(64), nullable=False, comment='调用场景：generate_chart/audit_summary'),
+        sa.Column('model', sa.String(128), nullable=True, comment='模型名称'),
+        sa.Column('user_id', sa.BigInteger(), nullable=True, comment='用户id'),
+        sa.Column('chart_id', sa.BigInteger(), nullable=True, comment='图表id'),
+        sa.Column('prompt_tokens', sa.Integer(), nullable=True, comment='发送前计算的提示语 token 数'),
+        sa.Column('input_tokens', sa.Integer(), nullable=True, comment='接口返回的输入 token 数'),
+        sa.Column('output_tokens', sa.Integer(), nullable=True, comment='输出 token 数'),
+        sa.Column('latency_ms', sa.Integer(), nullable=True, comment='调用耗时（毫秒，含重试）'),
+        sa.Column('cached', sa.SmallInteger(), nullable=False, comment='是否命中结果缓存'),
+        sa.Column('status', sa.String(32), nullable=False, comment='调用结果：succeeded/failed'),
+        sa.Column('create_time', sa.DateTime(), nullable=False, comment='创建时间'),
+    )
+    op.create_index('ix_llm_usage_chart_id', 'llm_usage', ['chart_id'])
+    op.create_index('ix_llm_usage_endpoint_create_time', 'llm_usage', ['endpoint', 'create_time'])
+
+
+def downgrade() -> None:
+    op.drop_table('llm_usage')
@@ -0,0 +1,48 @@
+"""存量机房导入任务表
+
+新增 ingestion_job 表，保存后台导入任务的状态、阶段、行数统计和导入结果。
+此前该表在服务启动时自动创建，已有该表的数据库跳过建表。
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, Sequence[str], None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 服务启动时或 create_all 建好的数据库已有该表
+    if not context.is_offline_mode() and sa.inspect(op.get_bind()).has_table('ingestion_job'):
+        return
+    op.create_table(
+        'ingestion_job',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True, comment='主键'),
+        sa.Column('filename', sa.String(256), nullable=False, comment='上传文件名'),
+        sa.Column('mode', sa.String(32), nullable=False, comment='导入方式：replace/upsert'),
+        sa.Column('options', sa.JSON(), nullable=True, comment='导入参数'),
+        sa.Column('status', sa.String(32), nullable=False, comment='任务状态：waiting/running/succeeded/failed'),
+        sa.Column('phase', sa.String(32), nullable=False, comment='当前阶段'),
+        sa.Column('total_records', sa.Integer(), nullable=False, comment='已读取行数'),
+        sa.Column('success_count', sa.Integer(), nullable=False, comment='已处理成功行数'),
+        sa.Column('failed_count', sa.Integer(), nullable=False, comment='校验失败行数'),
+        sa.Column('result', sa.JSON(), nullable=True, comment='导入结果'),
+        sa.Column('exec_message', sa.Text(), nullable=True, comment='执行信息'),
+        sa.Column('user_id', sa.BigInteger(), nullable=True, comment='用户id'),
+        sa.Column('start_time', sa.DateTime(), nullable=True, comment='开始处理时间'),
+        sa.Column('finish_time', sa.DateTime(), nullable=True, comment='结束时间'),
+        sa.Column('create_time', sa.DateTime(), nullable=False, comment='创建时间'),
+        sa.Column('update_time', sa.DateTime(), nullable=False, comment='更新时间'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('ingestion_job')
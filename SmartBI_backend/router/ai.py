@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, File, Form, UploadFile, BackgroundTasks
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import Dict, Optional
 from database.connection import get_db
@@ -17,22 +18,24 @@ async def gen_chart_by_ai(
     name: Optional[str] = Form(None),
     goal: str = Form(...),
     chart_type: Optional[str] = Form(None),
+    bypass_cache: bool = Form(False),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """同步方式调用AI生成图表"""
+    """同步方式调用AI生成图表，bypass_cache 为 true 时忽略缓存重新生成"""
     try:
         # 获取用户ID
         user_id = current_user.get("id")
         
         # 调用AI生成图表
-        result = ai_manage.gen_chart_sync(
+        result = await ai_manage.gen_chart_sync(
             db=db,
             file=file,
             user_id=user_id,
             goal=goal,
             name=name,
-            chart_type=chart_type
+            chart_type=chart_type,
+            bypass_cache=bypass_cache
         )
         
         return {"code": 1, "data": result}
@@ -40,18 +43,59 @@ async def gen_chart_by_ai(
         logger.error(f"同步生成图表失败: {str(e)}")
         return {"code": 0, "message": str(e)}
 
+# 2.1.1 流式生成图表
+@router.post("/gen/stream")
+async def gen_chart_by_ai_stream(
+    file: UploadFile = File(...),
+    name: Optional[str] = Form(None),
+    goal: str = Form(...),
+    chart_type: Optional[str] = Form(None),
+    bypass_cache: bool = Form(False),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    流式调用AI生成图表（Server-Sent Events）
+    依次推送 chartType、chartData 和 genResult 增量文本事件，图表保存后推送 done 事件，失败时推送 error 事件
+    """
+    try:
+        # 获取用户ID
+        user_id = current_user.get("id")
+        
+        # 文件校验通过后开始推送事件
+        events = await ai_manage.gen_chart_stream(
+            db=db,
+            file=file,
+            user_id=user_id,
+            goal=goal,
+            name=name,
+            chart_type=chart_type,
+            bypass_cache=bypass_cache
+        )
+        
+        return StreamingResponse(
+            events,
+            media_type="text/event-stream",
+            # 关闭代理缓冲，事件到达后立即转发给客户端
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+    except Exception as e:
+        logger.error(f"流式生成图表失败: {str(e)}")
+        return {"code": 0, "message": str(e)}
+
 # 2.2 异步生成图表
 @router.post("/gen/async")
-async def gen_chart_by_ai_async(
+def gen_chart_by_ai_async(
     background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     name: Optional[str] = Form(None),
     goal: str = Form(...),
     chart_type: Optional[str] = Form(None),
+    bypass_cache: bool = Form(False),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """异步方式调用AI生成图表(后台任务)"""
+    """异步方式调用AI生成图表(后台任务)，bypass_cache 为 true 时忽略缓存重新生成"""
     try:
         # 获取用户ID
         user_id = current_user.get("id")
@@ -64,7 +108,8 @@ async def gen_chart_by_ai_async(
             user_id=user_id,
             goal=goal,
             name=name,
-            chart_type=chart_type
+            chart_type=chart_type,
+            bypass_cache=bypass_cache
         )
         
         return {"code": 1, "data": result}
@@ -74,7 +119,7 @@ async def gen_chart_by_ai_async(
 
 # 2.3 消息队列异步生成图表
 @router.post("/gen/async/mq")
-async def gen_chart_by_ai_async_mq(
+def gen_chart_by_ai_async_mq(
     file: UploadFile = File(...),
     name: Optional[str] = Form(None),
     goal: str = Form(...),
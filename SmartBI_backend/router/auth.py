@@ -1,6 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, Header
 from sqlalchemy.orm import Session
-from database.connection import DatabaseConnection
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.connection import get_db, get_async_db
+from database.models import User as UserModel
 from api import auth as auth_api
 from pydantic import BaseModel, Field, validator
 from typing import Optional, Dict, Any
@@ -8,6 +11,7 @@ import re
 from jose import jwt, JWTError
 import logging
 from config import JWT_SECRET_KEY, JWT_ALGORITHM
+from utils import user_cache
 
 logger = logging.getLogger(__name__)
 
@@ -16,16 +20,10 @@ router = APIRouter(prefix="/api/auth", tags=["认证管理"])
 # 用户类型别名
 User = Dict[str, Any]
 
-def get_db():
-    db = DatabaseConnection.get_session()
-    try:
-        yield db
-    finally:
-        db.close()
-
-async def get_current_user(authorization: Optional[str] = Header(None), db: Session = Depends(get_db)) -> User:
+async def get_current_user(authorization: Optional[str] = Header(None), db: AsyncSession = Depends(get_async_db)) -> User:
     """
     从请求头中获取并验证Token，返回当前用户信息
+    已验证的令牌和用户信息会被缓存，缓存命中时不验证签名也不查询数据库
     """
     credentials_exception = HTTPException(
         status_code=401,
@@ -37,76 +35,52 @@ async def get_current_user(authorization: Optional[str] = Header(None), db: Sess
         logger.error("Authorization header is missing")
         raise credentials_exception
     
-    try:
-        # 打印完整的authorization头部内容
-        logger.info(f"Received authorization header: {authorization}")
-        
-        # 解析 Bearer token
-        parts = authorization.split()
-        if len(parts) != 2:
-            logger.error(f"Invalid authorization format: {authorization}")
-            raise credentials_exception
-            
-        scheme, token = parts
-        if scheme.lower() != "bearer":
-            logger.error(f"Invalid scheme: {scheme}")
-            raise credentials_exception
-            
-        # 打印token信息
-        logger.info(f"Attempting to decode token: {token[:10]}...")
-        
+    # 解析 Bearer token
+    parts = authorization.split()
+    if len(parts) != 2 or parts[0].lower() != "bearer":
+        logger.error("Invalid authorization header format")
+        raise credentials_exception
+    token = parts[1]
+    
+    user_id = user_cache.get_cached_token(token)
+    if user_id is None:
         # 解码JWT token
         try:
-            # 打印使用的密钥信息
-            logger.info(f"Using JWT_SECRET_KEY: {JWT_SECRET_KEY[:5]}...")
-            logger.info(f"Using JWT_ALGORITHM: {JWT_ALGORITHM}")
-            
             payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
-            logger.info(f"Token decoded successfully. Payload: {payload}")
-            
-            user_id = payload.get("sub")
-            if user_id is None:
-                logger.error("User ID not found in token")
-                raise credentials_exception
-                
-            try:
-                user_id = int(user_id)
-                logger.info(f"User ID extracted from token: {user_id}")
-            except ValueError:
-                logger.error(f"Invalid user ID format: {user_id}")
-                raise credentials_exception
-            
-            # 从数据库获取用户信息
-            from database.models import User as UserModel
-            user = db.query(UserModel).filter(UserModel.id == user_id, UserModel.isDelete == 0).first()
-            if user is None:
-                logger.error(f"User with ID {user_id} not found in database or is deleted")
-                raise credentials_exception
-                
-            # 构建用户信息
-            user_info = {
-                "id": user.id,
-                "userAccount": user.userAccount,
-                "userName": user.userName,
-                "userAvatar": user.userAvatar,
-                "userRole": user.userRole,
-                "createTime": user.createTime
-            }
-            logger.info(f"User info retrieved successfully: {user_info}")
-            
-            return user_info
-        except JWTError as e:
-            logger.error(f"JWT decode error: {str(e)}")
+            user_id = int(payload.get("sub"))
+        except (JWTError, TypeError, ValueError) as e:
+            logger.error(f"Token verification failed: {str(e)}")
             raise credentials_exception
-    except JWTError as e:
-        logger.error(f"JWT error: {str(e)}")
-        raise credentials_exception
-    except ValueError as e:
-        logger.error(f"Value error: {str(e)}")
-        raise credentials_exception
+        user_cache.cache_token(token, user_id, payload.get("exp"))
+    
+    user_info = user_cache.get_cached_user(user_id)
+    if user_info is not None:
+        return user_info
+    
+    try:
+        # 从数据库获取用户信息
+        user = await db.scalar(
+            select(UserModel).where(UserModel.id == user_id, UserModel.isDelete == 0)
+        )
     except Exception as e:
         logger.error(f"Unexpected error in authentication: {str(e)}")
         raise credentials_exception
+    if user is None:
+        logger.error(f"User with ID {user_id} not found in database or is deleted")
+        raise credentials_exception
+    
+    # 构建用户信息
+    user_info = {
+        "id": user.id,
+        "userAccount": user.userAccount,
+        "userName": user.userName,
+        "userAvatar": user.userAvatar,
+        "userRole": user.userRole,
+        "createTime": user.createTime
+    }
+    user_cache.cache_user(user_id, user_info)
+    logger.debug(f"User {user_id} loaded from database")
+    return user_info
 
 class UserLogin(BaseModel):
     userAccount: str = Field(..., description="登录账号", example="user123")
@@ -157,7 +131,7 @@ async def login(user: UserLogin, db: Session = Depends(get_db)):
     - **userAccount**: 登录账号（至少4位，仅允许字母数字）
     - **userPassword**: 登录密码（至少8位）
     """
-    result = auth_api.login_user(db, user.userAccount, user.userPassword)
+    result = await auth_api.login_user(db, user.userAccount, user.userPassword)
     return result
 
 @router.post("/register", summary="用户注册")
@@ -171,7 +145,7 @@ async def register(user: UserRegister, db: Session = Depends(get_db)):
     - **userAvatar**: 用户头像URL（可选）
     - **userRole**: 用户角色（可选，默认为user）
     """
-    result = auth_api.register_user(db, user.dict(exclude_unset=True))
+    result = await auth_api.register_user(db, user.dict(exclude_unset=True))
     return result
 
 @router.get("/current-user", summary="获取当前用户信息")
@@ -1,8 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel, Field
-from database.connection import get_db
+from database.connection import get_db, get_async_db
 from api import chart as chart_api
 import logging
 from datetime import datetime
@@ -35,8 +36,10 @@ class DeleteRequest(BaseModel):
 class ChartQuery(BaseModel):
     current: int = Field(1, ge=1, description="当前页码")
     size: int = Field(10, ge=1, le=100, description="每页数量")
-    name: Optional[str] = Field(None, description="图表名称")
+    name: Optional[str] = Field(None, description="检索关键词，匹配图表名称和分析目标，结果按相关度排序")
     status: Optional[int] = Field(None, description="图表状态")
+    cursor: Optional[str] = Field(None, description="上一页返回的 nextCursor，传入时忽略 current")
+    withTotal: bool = Field(True, description="是否返回总数，总数会缓存一段时间")
 
 # 响应模型
 class ChartDetail(BaseModel):
@@ -70,7 +73,7 @@ class PageResult(BaseModel):
 
 # 1.1 创建图表
 @router.post("/add", response_model=Dict[str, Any])
-async def add_chart(
+def add_chart(
     chart: ChartCreate,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -94,7 +97,7 @@ async def add_chart(
 
 # 1.2 删除图表
 @router.post("/delete")
-async def delete_chart(
+def delete_chart(
     delete_request: DeleteRequest, 
     current_user: User = Depends(get_current_user), 
     db: Session = Depends(get_db)
@@ -117,7 +120,7 @@ async def delete_chart(
 
 # 1.3 更新图表
 @router.post("/update")
-async def update_chart(
+def update_chart(
     chart_update: ChartUpdate, 
     current_user: User = Depends(get_current_user), 
     db: Session = Depends(get_db)
@@ -140,7 +143,7 @@ async def update_chart(
 
 # 1.4 用户编辑图表
 @router.post("/edit")
-async def edit_chart(
+def edit_chart(
     chart_edit: ChartUpdate, 
     current_user: User = Depends(get_current_user), 
     db: Session = Depends(get_db)
@@ -164,13 +167,15 @@ async def edit_chart(
 @router.get("/get")
 async def get_chart_by_id(
     id: int = Query(..., description="图表ID"),
+    fields: Optional[str] = Query(None, description="需要返回的大字段，逗号分隔，可选 chartData,genChart,genResult，不传时全部返回"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取图表详情"""
     try:
-        # 获取图表详情
-        chart = chart_api.get_chart_by_id(db, id)
+        # 获取图表详情，只读取请求的大字段
+        field_list = [field.strip() for field in fields.split(',') if field.strip()] if fields is not None else None
+        chart = await chart_api.get_chart_by_id(db, id, field_list)
         
         return {"code": 1, "data": chart}
     except HTTPException as e:
@@ -184,20 +189,24 @@ async def get_chart_by_id(
 async def list_chart_by_page(
     query: ChartQuery,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """分页获取图表列表"""
     try:
         # 执行分页查询
-        result = chart_api.list_chart_by_page(
+        result = await chart_api.list_chart_by_page(
             db, 
             query.current, 
             query.size, 
             query.name, 
-            query.status
+            query.status,
+            cursor=query.cursor,
+            with_total=query.withTotal
         )
         
         return {"code": 1, "data": result}
+    except HTTPException as e:
+        raise e
     except Exception as e:
         logger.error(f"分页获取图表列表失败: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -207,7 +216,7 @@ async def list_chart_by_page(
 async def list_my_chart_by_page(
     query: ChartQuery,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """分页获取当前用户的图表"""
     try:
@@ -215,16 +224,20 @@ async def list_my_chart_by_page(
         user_id = current_user.get("id")
         
         # 执行分页查询
-        result = chart_api.list_chart_by_page(
+        result = await chart_api.list_chart_by_page(
             db, 
             query.current, 
             query.size, 
             query.name, 
             query.status, 
-            user_id
+            user_id,
+            cursor=query.cursor,
+            with_total=query.withTotal
         )
         
         return {"code": 1, "data": result}
+    except HTTPException as e:
+        raise e
     except Exception as e:
         logger.error(f"分页获取用户图表列表失败: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
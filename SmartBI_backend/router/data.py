@@ -1,9 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File, Form
 from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel, Field
-from database.connection import get_db
+from database.connection import get_db, get_async_db
 from api import data as data_api
+from api import ingestion as ingestion_api
+from utils.executor import render_json
+from utils.pagination import split_page, get_cached_total, cache_total
 from api.ai_service import AiService
 from database import models
 import pandas as pd
@@ -19,6 +24,9 @@ uploaded_new_data = []
 
 logger = logging.getLogger(__name__)
 
+# 存量机房总数缓存键
+DATA_CENTER_TOTAL_KEY = (models.DataCenter.__tablename__,)
+
 class NewDataCenter(BaseModel):
     location: str = Field(..., description="机房地址")
     rent_price: float = Field(..., gt=0, description="报价金额(元/㎡·天)")
@@ -37,12 +45,41 @@ class DataCenterResponse(BaseModel):
 @router.post("/upload/existing")
 async def upload_existing_data(
     file: UploadFile = File(...),
+    mode: str = Form("replace", description="导入方式：replace 整表替换，upsert 按合同编码增量合并"),
+    match_report_name: bool = Form(False, description="upsert 时是否同时按报账点名称匹配"),
+    delete_missing: bool = Form(False, description="upsert 时是否删除文件中不存在的记录"),
     db: Session = Depends(get_db)
 ):
     """上传存量机房数据"""
     if not file.filename.endswith(('.xlsx', '.csv')):
         raise HTTPException(status_code=400, detail="只支持 Excel 或 CSV 文件")
-    return await data_api.process_existing_data(file, db)
+    if mode not in ("replace", "upsert"):
+        raise HTTPException(status_code=400, detail="导入方式只能是 replace 或 upsert")
+    return await data_api.process_existing_data(file, db, mode, match_report_name, delete_missing)
+
+@router.post("/upload/existing/jobs")
+async def submit_existing_data_job(
+    file: UploadFile = File(...),
+    mode: str = Form("replace", description="导入方式：replace 整表替换，upsert 按合同编码增量合并"),
+    match_report_name: bool = Form(False, description="upsert 时是否同时按报账点名称匹配"),
+    delete_missing: bool = Form(False, description="upsert 时是否删除文件中不存在的记录"),
+    db: Session = Depends(get_db)
+):
+    """提交存量机房数据后台导入任务，立即返回任务ID"""
+    if not file.filename.endswith(('.xlsx', '.csv')):
+        raise HTTPException(status_code=400, detail="只支持 Excel 或 CSV 文件")
+    if mode not in ("replace", "upsert"):
+        raise HTTPException(status_code=400, detail="导入方式只能是 replace 或 upsert")
+    result = await ingestion_api.submit_ingestion_job(file, db, mode, match_report_name, delete_missing)
+    return {"success": True, "data": result}
+
+@router.get("/upload/existing/jobs/{job_id}")
+def get_existing_data_job(
+    job_id: int,
+    db: Session = Depends(get_db)
+):
+    """查询存量机房数据导入任务的状态和进度"""
+    return {"success": True, "data": ingestion_api.get_job_status(db, job_id)}
 
 @router.post("/upload/new")
 async def upload_new_data(
@@ -93,36 +130,41 @@ async def analyze_data(
         if new_data.empty:
             raise HTTPException(status_code=400, detail="没有有效的机房数据")
         
-        # 分析数据
-        return await data_api.analyze_data_centers(db, new_data, radius_km)
+        # 分析数据，结果包含大量标记点，在线程池中序列化
+        return await render_json(await data_api.analyze_data_centers(db, new_data, radius_km))
     except Exception as e:
         logger.error(f"分析失败: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/audit/summary")
 async def generate_summary(
-    audit_results: List[Dict[str, Any]]
+    audit_results: List[Dict[str, Any]],
+    db: Session = Depends(get_db)
 ):
-    """生成稽核结果总结"""
-    return await data_api.generate_audit_summary(audit_results, ai_service)
+    """生成稽核结果总结，调用用量记录在 llm_usage 表"""
+    return await data_api.generate_audit_summary(audit_results, ai_service, db)
 
 @router.get("/centers")
 async def get_data_centers(
     page: int = Query(1, gt=0),
     size: int = Query(10, gt=0),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor，传入时忽略 page"),
+    with_total: bool = Query(True, description="是否返回总数，总数会缓存一段时间"),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """分页获取存量机房数据"""
+    """分页获取存量机房数据，连续翻页时使用 cursor 代替 page"""
     try:
         # 计算总数
-        total = db.query(models.DataCenter).count()
+        total = None
+        if with_total:
+            total = get_cached_total(DATA_CENTER_TOTAL_KEY)
+            if total is None:
+                total = await db.scalar(select(func.count()).select_from(models.DataCenter))
+                cache_total(DATA_CENTER_TOTAL_KEY, total)
         
         # 获取分页数据
-        data = db.query(models.DataCenter)\
-            .order_by(models.DataCenter.id.desc())\
-            .offset((page - 1) * size)\
-            .limit(size)\
-            .all()
+        rows = (await db.scalars(data_api.data_center_page_query(size, page, cursor))).all()
+        data, next_cursor = split_page(rows, size, lambda item: [item.id])
             
         # 转换为字典列表，确保所有数值都是Python原生类型
         result = []
@@ -144,13 +186,16 @@ async def get_data_centers(
         return {
             "success": True,
             "data": result,
-            "total": int(total)
+            "total": total,
+            "next_cursor": next_cursor
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/new")
-async def get_new_data(
+def get_new_data(
     page: int = Query(1, gt=0),
     size: int = Query(10, gt=0),
 ):
@@ -184,22 +229,26 @@ async def get_new_data(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/upload/existing")
-async def get_existing_data(
+def get_existing_data(
     page: int = Query(1, gt=0),
     size: int = Query(3, gt=0),
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor，传入时忽略 page"),
+    with_total: bool = Query(True, description="是否返回总数，总数会缓存一段时间"),
     db: Session = Depends(get_db)
 ):
     """获取存量机房数据列表"""
     try:
         # 计算总数
-        total = db.query(models.DataCenter).count()
+        total = None
+        if with_total:
+            total = get_cached_total(DATA_CENTER_TOTAL_KEY)
+            if total is None:
+                total = db.scalar(select(func.count()).select_from(models.DataCenter))
+                cache_total(DATA_CENTER_TOTAL_KEY, total)
         
         # 获取分页数据
-        data = db.query(models.DataCenter)\
-            .order_by(models.DataCenter.id.desc())\
-            .offset((page - 1) * size)\
-            .limit(size)\
-            .all()
+        rows = db.scalars(data_api.data_center_page_query(size, page, cursor)).all()
+        data, next_cursor = split_page(rows, size, lambda item: [item.id])
             
         return {
             "success": True,
@@ -216,8 +265,11 @@ async def get_existing_data(
                 "longitude": item.longitude,
                 "latitude": item.latitude
             } for item in data],
-            "total": total
+            "total": total,
+            "next_cursor": next_cursor
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -4,6 +4,7 @@ from typing import List
 import os
 import logging
 from utils.rag_utils import RAGService
+from utils.executor import run_blocking
 from pathlib import Path
 
 # 创建路由
@@ -46,10 +47,10 @@ async def import_document(file: UploadFile = File(...)):
             f.write(content)
         
         # 导入文档到向量数据库
-        chunks = rag_service.import_document(str(file_path))
+        chunks = await run_blocking(rag_service.import_document, str(file_path))
         
         # 保存向量数据库
-        rag_service.save_vector_store()
+        await run_blocking(rag_service.save_vector_store)
         
         # 删除临时文件
         os.remove(file_path)
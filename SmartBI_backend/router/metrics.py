@@ -0,0 +1,60 @@
+from fastapi import APIRouter, Depends
+from router.auth import get_current_user
+from utils.metrics import collect_pool_metrics
+from utils.password import password_hasher
+from utils.llm_client import llm_client
+from utils.llm_cache import llm_cache
+from utils.data_profile import data_profiler
+
+# 运行指标包含连接池容量、token 用量和缓存命中率等内部信息，与其他接口一样需要登录
+router = APIRouter(prefix="/api/metrics", tags=["运行指标"], dependencies=[Depends(get_current_user)])
+
+@router.get("/db-pool")
+def get_db_pool_metrics():
+    """
+    数据库连接池指标
+    按引擎（sync/async）返回：
+    - 常驻连接数、已取出连接数、空闲连接数、溢出连接数
+    - 取连接的等待次数、等待时间和超时次数
+    - 取连接耗时直方图（毫秒）
+    """
+    return {"code": 1, "data": collect_pool_metrics()}
+
+@router.get("/password-hash")
+def get_password_hash_metrics():
+    """
+    密码哈希线程池指标
+    - 线程数、排队上限、bcrypt 成本因子
+    - 排队数、执行数、完成数、拒绝数
+    - 排队等待时间和计算耗时直方图（毫秒）
+    """
+    return {"code": 1, "data": password_hasher.metrics()}
+
+@router.get("/llm")
+def get_llm_metrics():
+    """
+    大模型客户端指标
+    - 模型名称、并发上限
+    - 等待数、执行数、调用数、重试数、失败数
+    - 排队等待时间和调用耗时直方图（毫秒）
+    """
+    return {"code": 1, "data": llm_client.metrics()}
+
+@router.get("/llm-cache")
+def get_llm_cache_metrics():
+    """
+    大模型结果缓存指标
+    - 是否启用、过期时间、进程内缓存条数和上限、磁盘缓存条数上限
+    - 进程内命中数、磁盘命中数、未命中数、写入数、淘汰数、命中率
+    """
+    return {"code": 1, "data": llm_cache.metrics()}
+
+@router.get("/data-profile")
+def get_data_profile_metrics():
+    """
+    AI 提示语数据压缩指标
+    - 数据部分的 token 预算
+    - 请求数、压缩数（超出预算改为发送概要的请求数）
+    - 原始 token 数、发送 token 数、节省的 token 数（估算值）
+    """
+    return {"code": 1, "data": data_profiler.metrics()}
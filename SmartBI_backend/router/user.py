@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from database.connection import DatabaseConnection
+from database.connection import get_db
 from api import user as user_api
 from pydantic import BaseModel, Field
 from typing import Optional, List
@@ -8,14 +8,6 @@ from datetime import datetime
 
 router = APIRouter()
 
-# 依赖项：获取数据库会话
-def get_db():
-    db = DatabaseConnection.get_session()
-    try:
-        yield db
-    finally:
-        db.close()
-
 class UserCreate(BaseModel):
     userName: str = Field(..., description="用户昵称", example="张三")
     userAccount: str = Field(..., description="登录账号", example="zhangsan")
@@ -44,7 +36,7 @@ class UserCreateResponse(BaseModel):
     message: str = Field(..., description="响应消息")
 
 @router.post("/users/", response_model=UserCreateResponse, summary="创建新用户")
-async def create_user(user: UserCreate, db: Session = Depends(get_db)):
+def create_user(user: UserCreate, db: Session = Depends(get_db)):
     """
     创建新用户
     
@@ -67,7 +59,7 @@ async def create_user(user: UserCreate, db: Session = Depends(get_db)):
     }
 
 @router.get("/users/", response_model=UserListResponse, summary="获取用户列表")
-async def read_users(
+def read_users(
     skip: int = Query(0, description="跳过的记录数", ge=0),
     limit: int = Query(100, description="返回的最大记录数", ge=1, le=100),
     db: Session = Depends(get_db)
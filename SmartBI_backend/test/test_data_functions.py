@@ -22,7 +22,7 @@ for dir_name in ['api', 'database']:
             pass
 
 from database.models import Base
-from api.data import process_existing_data, analyze_data_centers, calculate_distance
+from api.data import process_existing_data, analyze_data_centers
 from api.ai_service import AiService
 
 # 配置日志
@@ -0,0 +1,99 @@
+"""
+图表列表大字段压测脚本
+
+在临时 SQLite 数据库中写入带有较大原始 CSV 和 ECharts 配置的图表，对比一页列表查询：
+- 加载完整 ORM 对象（undefer 全部大字段，等同于延迟加载之前的行为）
+- 默认查询（大字段延迟加载，不从数据库读取）
+输出每页耗时中位数和 Python 内存分配峰值。
+
+用法：
+    python tests/bench_chart_columns.py [--charts 200] [--csv-kb 200] [--repeat 20]
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+import statistics
+import tracemalloc
+
+# 添加项目根目录到系统路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import undefer
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from database import models
+
+
+def populate(engine, n_charts: int, csv_kb: int):
+    row = "2024-01,华南机房,123456.78\n"
+    chart_data = "月份,机房,租金\n" + row * (csv_kb * 1024 // len(row.encode()))
+    gen_chart = '{"series": [{"data": [' + ','.join(['123.4'] * 5000) + ']}]}'
+    with engine.begin() as conn:
+        conn.execute(insert(models.Chart), [
+            {'id': i + 1, 'name': f'图表{i}', 'goal': '分析租金趋势', 'chart_data': chart_data, 'chart_type': '折线图',
+             'gen_chart': gen_chart, 'gen_result': '租金整体平稳。' * 200, 'status': 'succeed', 'user_id': 1}
+            for i in range(n_charts)
+        ])
+
+
+async def measure(path: str, size: int, repeat: int) -> dict:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    Session = async_sessionmaker(engine, expire_on_commit=False)
+    base = select(models.Chart).where(models.Chart.is_delete == 0)\
+        .order_by(models.Chart.create_time.desc(), models.Chart.id.desc()).limit(size)
+    queries = {
+        "加载全部字段": base.options(undefer('*')),
+        "大字段延迟加载": base,
+    }
+    results = {}
+    try:
+        for label, query in queries.items():
+            durations = []
+            for _ in range(repeat):
+                async with Session() as db:
+                    start = time.perf_counter()
+                    (await db.scalars(query)).all()
+                    durations.append(time.perf_counter() - start)
+            async with Session() as db:
+                tracemalloc.start()
+                charts = (await db.scalars(query)).all()
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                del charts
+            results[label] = (statistics.median(durations) * 1000, peak / 1024 / 1024)
+    finally:
+        await engine.dispose()
+    return results
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, 'bench.db')
+        engine = create_engine(f"sqlite:///{path}")
+        models.Base.metadata.create_all(engine)
+        populate(engine, args.charts, args.csv_kb)
+        engine.dispose()
+        results = asyncio.run(measure(path, args.size, args.repeat))
+
+    print("\n" + "=" * 80)
+    print(f"图表 {args.charts} 个，原始 CSV 约 {args.csv_kb} KB，每页 {args.size} 条，执行 {args.repeat} 次取中位数")
+    print("=" * 80)
+    for label, (ms, peak_mb) in results.items():
+        print(f"{label}: {ms:.2f} ms，内存分配峰值 {peak_mb:.2f} MB")
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="图表列表大字段压测")
+    parser.add_argument("--charts", type=int, default=200, help="图表数")
+    parser.add_argument("--csv-kb", type=int, default=200, help="每个图表原始 CSV 的大小（KB）")
+    parser.add_argument("--size", type=int, default=10, help="每页数量")
+    parser.add_argument("--repeat", type=int, default=20, help="每种查询的执行次数")
+    main(parser.parse_args())
@@ -0,0 +1,100 @@
+"""
+图表关键词检索压测脚本
+
+在临时 SQLite 数据库中写入大量图表（分析目标为较长文本），对比：
+- 原有的 name LIKE '%关键词%' 查询（前导通配符，扫描整张 chart 表）
+- search_chart_by_page 全文检索（FTS5 trigram 索引，按相关度排序）
+
+用法：
+    python tests/bench_chart_search.py [--charts 100000] [--repeat 20]
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+import statistics
+import numpy as np
+
+# 添加项目根目录到系统路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from database import models
+from api import chart as chart_api
+
+WORDS = ['机房', '租金', '销售', '用户', '增长', '分析', '趋势', '对比', '季度', '报表', '成本', '面积', '合同']
+# 站点名从较大的词表中随机选取，检索站点名时命中的图表较少
+SITES = [f'站点{chr(0x4e00 + i)}{chr(0x4f00 + i % 97)}' for i in range(2000)]
+# 前三个关键词较少命中，最后一个关键词命中大量图表，全文检索需要对全部命中结果按相关度排序
+KEYWORDS = [SITES[7], SITES[1234], f'{SITES[42]} 租金', '租金趋势']
+
+
+def populate(engine, n_charts: int):
+    rng = np.random.default_rng(0)
+    rows = []
+    for i in range(n_charts):
+        name = rng.choice(SITES) + ''.join(rng.choice(WORDS, 2))
+        goal = '，'.join(''.join(rng.choice(WORDS, 4)) for _ in range(20))
+        rows.append({'id': i + 1, 'name': name, 'goal': goal, 'chart_type': '柱状图', 'status': 'succeed', 'user_id': 1})
+    with engine.begin() as conn:
+        conn.execute(insert(models.Chart), rows)
+
+
+async def measure(path: str, repeat: int) -> dict:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    Session = async_sessionmaker(engine, expire_on_commit=False)
+    results = {}
+    try:
+        async with Session() as db:
+            for keyword in KEYWORDS:
+                like_query = select(models.Chart).where(
+                    models.Chart.is_delete == 0, *[models.Chart.name.like(f"%{word}%") for word in keyword.split()]
+                )\
+                    .order_by(models.Chart.create_time.desc(), models.Chart.id.desc()).limit(11)
+                timings = {}
+                for label, run in (
+                    ("LIKE", lambda: db.scalars(like_query)),
+                    ("全文检索", lambda: chart_api.search_chart_by_page(db, keyword, 1, 10, with_total=False)),
+                ):
+                    durations = []
+                    for _ in range(repeat):
+                        start = time.perf_counter()
+                        await run()
+                        durations.append(time.perf_counter() - start)
+                    timings[label] = statistics.median(durations) * 1000
+                results[keyword] = timings
+    finally:
+        await engine.dispose()
+    return results
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, 'bench.db')
+        engine = create_engine(f"sqlite:///{path}")
+        models.Base.metadata.create_all(engine)
+        populate(engine, args.charts)
+        engine.dispose()
+        results = asyncio.run(measure(path, args.repeat))
+
+    print("\n" + "=" * 80)
+    print(f"图表 {args.charts} 个，每条查询执行 {args.repeat} 次取中位数")
+    print("=" * 80)
+    for keyword, timings in results.items():
+        print(f"{keyword}: LIKE {timings['LIKE']:.2f} ms，全文检索 {timings['全文检索']:.2f} ms，"
+              f"加速 {timings['LIKE'] / timings['全文检索']:.1f} 倍")
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="图表关键词检索压测")
+    parser.add_argument("--charts", type=int, default=100000, help="图表数")
+    parser.add_argument("--repeat", type=int, default=20, help="每条查询的执行次数")
+    main(parser.parse_args())
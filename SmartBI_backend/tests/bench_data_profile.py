@@ -0,0 +1,60 @@
+"""
+AI 提示语数据压缩压测脚本
+
+生成不同行数的销售数据 CSV，对比原样发送和生成数据概要后提示语数据部分的 token 数，
+并输出生成概要的耗时中位数。
+
+用法：
+    python tests/bench_data_profile.py [--rows 1000 10000 100000] [--budget 4000] [--repeat 5]
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到系统路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+
+from utils.data_profile import DataProfiler
+
+
+def make_csv(rows: int) -> str:
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "日期": pd.date_range("2022-01-01", periods=rows, freq="15min").strftime("%Y-%m-%d %H:%M"),
+        "地区": rng.choice(["华东", "华南", "华北", "西南", "东北"], rows),
+        "机房": [f"机房{i % 300}" for i in range(rows)],
+        "租金": rng.normal(12000, 2000, rows).round(2),
+        "面积": rng.integers(50, 500, rows),
+        "备注": [f"合同HT{i:08d}" for i in range(rows)],
+    }).to_csv(index=False)
+
+
+def main(args):
+    print(f"{'行数':>8} {'CSV(MB)':>8} {'原始tokens':>12} {'发送tokens':>10} {'节省比例':>8} {'耗时(ms)':>9}")
+    for rows in args.rows:
+        csv_data = make_csv(rows)
+        profiler = DataProfiler(token_budget=args.budget)
+        durations = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            result = profiler.summarize(csv_data)
+            durations.append(time.perf_counter() - start)
+        ratio = result["saved_tokens"] / result["original_tokens"]
+        print(f"{rows:>8} {len(csv_data.encode()) / 1024 / 1024:>8.2f} {result['original_tokens']:>12} "
+              f"{result['prompt_tokens']:>10} {ratio:>8.1%} {statistics.median(durations) * 1000:>9.1f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="AI 提示语数据压缩压测")
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--budget', type=int, default=4000)
+    parser.add_argument('--repeat', type=int, default=5)
+    main(parser.parse_args())
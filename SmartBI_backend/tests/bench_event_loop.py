@@ -0,0 +1,173 @@
+"""
+事件循环阻塞压测脚本
+
+在同一个事件循环中持续发起稽核请求（/api/data/analyze），同时以固定并发请求
+/api/auth/current-user，统计轻量接口在空闲和稽核期间的延迟分位数。
+应用通过 httpx 的 ASGI 传输在进程内运行，数据库使用临时 SQLite 文件。
+
+--inline 参数让稽核计算直接在事件循环中执行（即改造前的行为），用于对比。
+
+用法：
+    python tests/bench_event_loop.py [--inline] [--existing 50000] [--new 2000] [--seconds 10]
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import logging
+import tempfile
+import numpy as np
+
+# 添加项目根目录到系统路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+sys.path.insert(0, current_dir)
+
+import httpx
+from jose import jwt
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from config import JWT_SECRET_KEY, JWT_ALGORITHM
+from database import models
+from database.connection import get_db, get_async_db
+from api import data as data_api
+from api.data import bulk_insert_data_centers, coerce_existing_frame
+from utils.executor import configure_thread_limiter
+from test_data_ingest import make_existing_frame
+from test_geo_utils import make_sites
+from main import app
+
+# 配置日志，只输出警告以上，避免请求日志干扰结果
+logging.basicConfig(level=logging.WARNING,
+                   format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def prepare_database(path: str, n_existing: int):
+    """创建测试数据库，写入存量机房和一个用户，返回该用户的令牌和异步引擎"""
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    models.Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+
+    db = Session()
+    records, _ = coerce_existing_frame(make_existing_frame(n_existing))
+    sites = make_sites(n_existing, seed=2)
+    records['latitude'] = sites['latitude'].to_numpy()
+    records['longitude'] = sites['longitude'].to_numpy()
+    bulk_insert_data_centers(db, records)
+    user = models.User(id=1, userAccount='benchuser', userPassword='x', userName='bench', userRole='user')
+    db.add(user)
+    db.commit()
+    user_id = user.id
+    db.close()
+
+    def override_get_db():
+        session = Session()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    AsyncSession = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with AsyncSession() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    token = jwt.encode({"sub": str(user_id)}, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
+    return token, async_engine
+
+
+def percentiles(latencies):
+    values = np.array(latencies) * 1000
+    return {name: float(np.percentile(values, q)) for name, q in (('p50', 50), ('p95', 95), ('p99', 99))}
+
+
+async def probe(client: httpx.AsyncClient, token: str, stop: asyncio.Event, latencies: list):
+    """持续请求 current-user 接口并记录延迟"""
+    headers = {"Authorization": f"Bearer {token}"}
+    while not stop.is_set():
+        start = time.perf_counter()
+        response = await client.get("/api/auth/current-user", headers=headers)
+        latencies.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.text
+        await asyncio.sleep(0.005)
+
+
+async def audit(client: httpx.AsyncClient, csv_bytes: bytes, stop: asyncio.Event, durations: list):
+    """持续发起稽核请求"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        response = await client.post(
+            "/api/data/analyze",
+            files={"file": ("new.csv", csv_bytes, "text/csv")},
+            data={"radius_km": "5"}
+        )
+        durations.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.text
+
+
+async def measure(client, token, csv_bytes, seconds, probes, auditors):
+    stop = asyncio.Event()
+    latencies, durations = [], []
+    tasks = [asyncio.create_task(probe(client, token, stop, latencies)) for _ in range(probes)]
+    tasks += [asyncio.create_task(audit(client, csv_bytes, stop, durations)) for _ in range(auditors)]
+    await asyncio.sleep(seconds)
+    stop.set()
+    await asyncio.gather(*tasks)
+    return latencies, durations
+
+
+async def run_load_test(args):
+    configure_thread_limiter()
+    if args.inline:
+        # 改造前的行为：稽核计算直接在事件循环中执行
+        async def run_inline(func, *func_args, **kwargs):
+            return func(*func_args, **kwargs)
+        data_api.run_blocking = run_inline
+
+    with tempfile.TemporaryDirectory() as workdir:
+        token, async_engine = prepare_database(os.path.join(workdir, 'bench.db'), args.existing)
+        new_sites = make_sites(args.new, seed=1).rename(columns={
+            'area': '机房面积', 'longitude': '经度', 'latitude': '纬度', 'annual_rent': '合同年租金'
+        })
+        csv_bytes = new_sites.to_csv(index=False).encode('utf-8')
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            # 预热：加载快照并构建空间索引
+            await measure(client, token, csv_bytes, 0.5, 1, 1)
+
+            idle, _ = await measure(client, token, csv_bytes, args.seconds, args.probes, 0)
+            busy, audits = await measure(client, token, csv_bytes, args.seconds, args.probes, args.auditors)
+        await async_engine.dispose()
+
+    print("\n" + "=" * 60)
+    print(f"存量机房 {args.existing} 个，每次稽核新增机房 {args.new} 个，"
+          f"稽核在{'事件循环内' if args.inline else '线程池中'}执行")
+    print("=" * 60)
+    for label, latencies in (("空闲时", idle), (f"{args.auditors} 路稽核并发时", busy)):
+        stats = percentiles(latencies)
+        print(f"current-user {label}: {len(latencies)} 次请求，"
+              f"p50 {stats['p50']:.1f} ms，p95 {stats['p95']:.1f} ms，p99 {stats['p99']:.1f} ms")
+    if audits:
+        print(f"稽核请求: {len(audits)} 次，平均 {np.mean(audits):.2f} 秒")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="事件循环阻塞压测")
+    parser.add_argument("--inline", action="store_true", help="稽核计算在事件循环中执行，用于对比")
+    parser.add_argument("--existing", type=int, default=50000, help="存量机房数")
+    parser.add_argument("--new", type=int, default=2000, help="每次稽核的新增机房数")
+    parser.add_argument("--seconds", type=float, default=10, help="每个阶段的持续时间（秒）")
+    parser.add_argument("--probes", type=int, default=4, help="current-user 并发数")
+    parser.add_argument("--auditors", type=int, default=2, help="稽核并发数")
+    asyncio.run(run_load_test(parser.parse_args()))
@@ -0,0 +1,203 @@
+"""
+热点查询索引压测脚本
+
+在临时 SQLite 数据库中写入存量机房和图表数据，先在没有新索引的表上执行热点查询，
+再执行 alembic upgrade head 添加索引后重复执行，输出每条查询的执行计划（EXPLAIN QUERY PLAN）和耗时中位数。
+
+覆盖的查询：
+- 增量合并按合同编码批量查找已有机房（upsert_data_centers）
+- 我的图表列表第一页和游标翻页（list_chart_by_page，按用户筛选）
+- 全部图表列表按状态筛选
+
+用法：
+    python tests/bench_indexes.py [--centers 100000] [--charts 100000] [--repeat 20]
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+import statistics
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到系统路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import MetaData, create_engine, insert, select, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from database import models
+from api import chart as chart_api
+from utils.pagination import encode_cursor, invalidate_totals
+
+# 迁移添加的索引，建表时先去掉
+MIGRATION_INDEXES = {
+    'ix_data_centers_contract_code',
+    'ix_chart_user_id_is_delete_create_time', 'ix_chart_is_delete_create_time', 'ix_chart_status'
+}
+
+
+def create_tables_without_indexes(engine):
+    """按迁移前的表结构建表"""
+    metadata = MetaData()
+    for table in models.Base.metadata.sorted_tables:
+        copy = table.to_metadata(metadata)
+        for index in list(copy.indexes):
+            if index.name in MIGRATION_INDEXES:
+                copy.indexes.discard(index)
+    metadata.create_all(engine)
+
+
+def populate(engine, n_centers: int, n_charts: int, n_users: int):
+    rng = np.random.default_rng(0)
+    centers = pd.DataFrame({
+        'id': np.arange(1, n_centers + 1),
+        'report_name': [f'报账点{i}' for i in range(n_centers)],
+        'contract_code': [f'HT{i:08d}' for i in rng.permutation(n_centers)],
+        'contract_name': '合同',
+        'contract_start': pd.Timestamp('2023-01-01'),
+        'contract_end': pd.Timestamp('2026-01-01'),
+        'annual_rent': rng.uniform(1e4, 1e6, n_centers),
+        'total_rent': rng.uniform(1e4, 3e6, n_centers),
+        'area': rng.uniform(20, 500, n_centers),
+        'longitude': rng.uniform(113.7, 114.6, n_centers),
+        'latitude': rng.uniform(22.4, 22.9, n_centers),
+    })
+    base_time = pd.Timestamp('2024-01-01')
+    charts = pd.DataFrame({
+        'id': np.arange(1, n_charts + 1),
+        'name': [f'图表{i}' for i in range(n_charts)],
+        'chart_type': '柱状图',
+        'status': rng.choice(['succeed', 'succeed', 'succeed', 'running', 'failed'], n_charts),
+        'user_id': rng.integers(1, n_users + 1, n_charts),
+        'create_time': base_time + pd.to_timedelta(rng.integers(0, 365 * 24 * 3600, n_charts), unit='s'),
+        'update_time': base_time,
+        'is_delete': (rng.random(n_charts) < 0.05).astype(int),
+    })
+    with engine.begin() as conn:
+        conn.execute(insert(models.DataCenter), centers.to_dict('records'))
+        conn.execute(insert(models.Chart), charts.to_dict('records'))
+    return centers
+
+
+def build_queries(centers: pd.DataFrame):
+    """返回 {名称: (SQLAlchemy 查询, 参数)}，与接口中使用的查询一致"""
+    codes = centers['contract_code'].sample(1000, random_state=1).tolist()
+    chart = models.Chart
+    return {
+        "按合同编码查找 1000 个机房": select(models.DataCenter).where(models.DataCenter.contract_code.in_(codes)),
+        "我的图表列表第一页": select(chart).where(chart.is_delete == 0, chart.user_id == 7)
+            .order_by(chart.create_time.desc(), chart.id.desc()).limit(11),
+        "全部图表按状态筛选": select(chart).where(chart.is_delete == 0, chart.status == 'failed')
+            .order_by(chart.create_time.desc(), chart.id.desc()).limit(11),
+    }
+
+
+def explain(conn, query) -> str:
+    compiled = query.compile(conn, compile_kwargs={"literal_binds": True})
+    rows = conn.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).fetchall()
+    return "; ".join(row[-1] for row in rows)
+
+
+def time_query(conn, query, repeat: int) -> float:
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        conn.execute(query).fetchall()
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations) * 1000
+
+
+async def time_chart_endpoint(path: str, repeat: int) -> dict:
+    """调用 list_chart_by_page 取我的图表第一页和第 50 页之后的游标页"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    Session = async_sessionmaker(engine, expire_on_commit=False)
+    results = {}
+    try:
+        async with Session() as db:
+            first = await chart_api.list_chart_by_page(db, 1, 10, user_id=7, with_total=False)
+            # 找到第 50 页的游标
+            cursor = first['nextCursor']
+            for _ in range(49):
+                cursor = (await chart_api.list_chart_by_page(db, 1, 10, user_id=7, cursor=cursor, with_total=False))['nextCursor']
+
+            for label, kwargs in (("list_chart_by_page 第一页", {}), ("list_chart_by_page 第 51 页（游标）", {"cursor": cursor})):
+                durations = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    await chart_api.list_chart_by_page(db, 1, 10, user_id=7, with_total=False, **kwargs)
+                    durations.append(time.perf_counter() - start)
+                results[label] = statistics.median(durations) * 1000
+
+            # 总数（缓存失效后的一次统计）
+            durations = []
+            for _ in range(repeat):
+                invalidate_totals(models.Chart.__tablename__)
+                start = time.perf_counter()
+                await chart_api.list_chart_by_page(db, 1, 10, user_id=7)
+                durations.append(time.perf_counter() - start)
+            results["list_chart_by_page 含总数（未缓存）"] = statistics.median(durations) * 1000
+    finally:
+        await engine.dispose()
+    return results
+
+
+def measure(path: str, queries: dict, repeat: int) -> dict:
+    engine = create_engine(f"sqlite:///{path}")
+    results = {}
+    with engine.connect() as conn:
+        conn.execute(text("ANALYZE"))
+        for name, query in queries.items():
+            results[name] = (explain(conn, query), time_query(conn, query, repeat))
+    engine.dispose()
+    for name, ms in asyncio.run(time_chart_endpoint(path, repeat)).items():
+        results[name] = ("", ms)
+    return results
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, 'bench.db')
+        engine = create_engine(f"sqlite:///{path}")
+        create_tables_without_indexes(engine)
+        centers = populate(engine, args.centers, args.charts, args.users)
+        engine.dispose()
+        queries = build_queries(centers)
+
+        before = measure(path, queries, args.repeat)
+
+        config = Config(os.path.join(project_root, 'alembic.ini'))
+        config.set_main_option('script_location', os.path.join(project_root, 'migrations'))
+        config.set_main_option('sqlalchemy.url', f"sqlite:///{path}")
+        config.attributes['configure_logger'] = False
+        command.upgrade(config, 'head')
+
+        after = measure(path, queries, args.repeat)
+
+    print("\n" + "=" * 80)
+    print(f"存量机房 {args.centers} 个，图表 {args.charts} 个（{args.users} 个用户），每条查询执行 {args.repeat} 次取中位数")
+    print("=" * 80)
+    for name in before:
+        plan_before, ms_before = before[name]
+        plan_after, ms_after = after[name]
+        print(f"{name}: 迁移前 {ms_before:.2f} ms，迁移后 {ms_after:.2f} ms，加速 {ms_before / ms_after:.1f} 倍")
+        if plan_before:
+            print(f"    迁移前计划: {plan_before}")
+            print(f"    迁移后计划: {plan_after}")
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="热点查询索引压测")
+    parser.add_argument("--centers", type=int, default=100000, help="存量机房数")
+    parser.add_argument("--charts", type=int, default=100000, help="图表数")
+    parser.add_argument("--users", type=int, default=200, help="用户数")
+    parser.add_argument("--repeat", type=int, default=20, help="每条查询的执行次数")
+    main(parser.parse_args())
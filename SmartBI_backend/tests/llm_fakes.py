@@ -0,0 +1,52 @@
+"""
+大模型接口替身
+
+测试使用 httpx.MockTransport 代替真实的大模型接口，按 OpenAI 接口格式返回结果，包括：
+1. make_client: 使用替身接口的 LLMClient
+2. completion: 非流式回复
+3. stream_response: 流式回复，可在最后一段附带用量
+"""
+
+import os
+import sys
+import json
+from typing import Any, Callable, Dict, Iterable, Optional
+import httpx
+
+# 添加项目根目录到系统路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+
+from utils.llm_client import LLMClient
+
+
+def make_client(handler: Callable[[httpx.Request], httpx.Response], **kwargs) -> LLMClient:
+    """使用 httpx.MockTransport 代替真实的大模型接口，重试等待缩短为 10 毫秒"""
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return LLMClient(api_key='sk-test', base_url='http://llm.test/v1', retry_max_wait=0.01,
+                     http_client=http_client, **kwargs)
+
+
+def completion(content: str, usage: Optional[Dict[str, int]] = None) -> httpx.Response:
+    """按 OpenAI 非流式接口格式返回内容"""
+    body: Dict[str, Any] = {
+        "id": "chatcmpl-test", "object": "chat.completion", "created": 0, "model": "deepseek-chat",
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}]
+    }
+    if usage is not None:
+        body["usage"] = usage
+    return httpx.Response(200, json=body)
+
+
+def stream_response(chunks: Iterable[str], usage: Optional[Dict[str, int]] = None) -> httpx.Response:
+    """按 OpenAI 流式接口格式返回内容，传入 usage 时在最后附加一段只含用量的数据"""
+    events = [{"choices": [{"index": 0, "delta": {"content": chunk}, "finish_reason": None}]} for chunk in chunks]
+    if usage is not None:
+        events.append({"choices": [], "usage": usage})
+    lines = []
+    for event in events:
+        event.update({"id": "chatcmpl-test", "object": "chat.completion.chunk", "created": 0, "model": "deepseek-chat"})
+        lines.append("data: " + json.dumps(event) + "\n\n")
+    lines.append("data: [DONE]\n\n")
+    return httpx.Response(200, headers={"content-type": "text/event-stream"}, content="".join(lines).encode())
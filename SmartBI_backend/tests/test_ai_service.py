@@ -1,4 +1,5 @@
 import unittest
+import asyncio
 import logging
 import json
 import sys
@@ -32,11 +33,11 @@ class TestAiService(unittest.TestCase):
         """测试指定图表类型生成图表"""
         logger.info("开始测试指定图表类型的生成")
         try:
-            result = self.ai_service.generate_chart(
+            result = asyncio.run(self.ai_service.generate_chart(
                 goal="分析月度销售额和利润的变化趋势",
                 chart_type="折线图",
                 csv_data=self.test_csv_data
-            )
+            ))
             
             # 验证返回结果
             self.assertIsInstance(result, dict)
@@ -67,11 +68,11 @@ class TestAiService(unittest.TestCase):
         """测试自动选择图表类型生成图表"""
         logger.info("开始测试自动选择图表类型的生成")
         try:
-            result = self.ai_service.generate_chart(
+            result = asyncio.run(self.ai_service.generate_chart(
                 goal="比较各月份销售额和利润的关系",
                 chart_type=None,
                 csv_data=self.test_csv_data
-            )
+            ))
             
             # 验证返回结果
             self.assertIsInstance(result, dict)
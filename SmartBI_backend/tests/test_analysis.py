@@ -0,0 +1,66 @@
+"""
+租金分析测试模块
+
+本模块用于测试租金分析的功能，包括：
+1. 租金评估模型在进程池中训练
+2. 租金趋势预测使用周边机房的平均租金
+"""
+
+import os
+import sys
+import asyncio
+import unittest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from fastapi import HTTPException
+
+# 添加项目根目录到系统路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+sys.path.insert(0, current_dir)
+
+from database import models
+from api.analysis import evaluate_model, predict_trend
+from utils.data_snapshot import data_center_snapshot
+from utils.executor import shutdown_executors
+from test_data_snapshot import add_centers
+from test_geo_utils import make_sites
+
+
+class TestAnalysis(unittest.TestCase):
+    def setUp(self):
+        engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+        models.Base.metadata.create_all(engine)
+        self.db = sessionmaker(bind=engine)()
+        self.sites = make_sites(200, seed=7)
+        add_centers(self.db, self.sites)
+        data_center_snapshot.refresh(self.db)
+
+    def tearDown(self):
+        self.db.close()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutdown_executors()
+
+    def test_evaluate_model(self):
+        """测试租金评估模型"""
+        result = asyncio.run(evaluate_model(self.db, {"area": 50.0, "coordinates": (34.3, 108.9)}))
+        self.assertGreater(result["estimated_price"], 0)
+        self.assertAlmostEqual(result["factors"]["area"] + result["factors"]["location"], 1.0)
+
+    def test_predict_trend(self):
+        """测试租金趋势预测"""
+        center = self.sites.iloc[0]
+        trend = asyncio.run(predict_trend(self.db, center['latitude'], center['longitude'], 6))
+        self.assertEqual(len(trend), 6)
+        self.assertGreater(trend[-1]['value'], trend[0]['value'])
+
+        with self.assertRaises(HTTPException):
+            asyncio.run(predict_trend(self.db, 0.0, 0.0, 6))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+"""
+异步数据库会话测试模块
+
+本模块用于测试改用异步会话的读取接口，包括：
+1. get_current_user 通过异步会话查询当前用户
+2. 图表详情和分页列表的异步查询
+3. 存量机房分页接口的异步查询
+"""
+
+import os
+import sys
+import asyncio
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from fastapi import HTTPException
+from jose import jwt
+
+# 添加项目根目录到系统路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+
+from config import JWT_SECRET_KEY, JWT_ALGORITHM
+from database import models
+from api import chart as chart_api
+from router.auth import get_current_user
+from router.data import get_data_centers
+from utils import user_cache
+from utils.pagination import invalidate_totals
+
+
+class TestAsyncReadEndpoints(unittest.TestCase):
+    def setUp(self):
+        # 同步引擎建表和写入测试数据，异步引擎（aiosqlite）读取同一个文件
+        fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        engine = create_engine(f"sqlite:///{self.db_path}")
+        models.Base.metadata.create_all(engine)
+        db = sessionmaker(bind=engine)()
+
+        db.add(models.User(id=1, userAccount='tester', userPassword='x', userName='测试用户', userRole='user'))
+        base_time = datetime(2024, 1, 1)
+        for i in range(1, 6):
+            db.add(models.Chart(
+                id=i, name=f'图表{i}', goal='分析', chart_type='柱状图', status='succeed',
+                user_id=1 if i <= 3 else 2, create_time=base_time + timedelta(days=i),
+                is_delete=1 if i == 5 else 0
+            ))
+        for i in range(1, 13):
+            db.add(models.DataCenter(
+                id=i, report_name='报表', contract_code=f'HT{i:03d}', contract_name=f'合同{i}',
+                contract_start=datetime(2023, 1, 1), contract_end=datetime(2025, 1, 1),
+                annual_rent=1000.0 * i, total_rent=2000.0 * i, area=100.0,
+                longitude=116.0, latitude=39.0
+            ))
+        db.commit()
+        db.close()
+        engine.dispose()
+        user_cache.clear()
+        invalidate_totals(models.Chart.__tablename__)
+        invalidate_totals(models.DataCenter.__tablename__)
+
+    def tearDown(self):
+        os.remove(self.db_path)
+
+    def run_with_session(self, func):
+        """在新的事件循环中创建异步会话并执行 func(session)"""
+        async def runner():
+            engine = create_async_engine(f"sqlite+aiosqlite:///{self.db_path}")
+            try:
+                async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+                    return await func(session)
+            finally:
+                await engine.dispose()
+        return asyncio.run(runner())
+
+    def test_get_current_user(self):
+        token = jwt.encode({"sub": "1"}, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
+        user = self.run_with_session(lambda db: get_current_user(f"Bearer {token}", db))
+        self.assertEqual(user['id'], 1)
+        self.assertEqual(user['userAccount'], 'tester')
+
+    def test_get_current_user_unknown(self):
+        token = jwt.encode({"sub": "99"}, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
+        with self.assertRaises(HTTPException) as context:
+            self.run_with_session(lambda db: get_current_user(f"Bearer {token}", db))
+        self.assertEqual(context.exception.status_code, 401)
+
+    def test_get_chart_by_id(self):
+        chart = self.run_with_session(lambda db: chart_api.get_chart_by_id(db, 2))
+        self.assertEqual(chart['id'], 2)
+        self.assertEqual(chart['name'], '图表2')
+
+        # 已删除的图表不可见
+        with self.assertRaises(HTTPException) as context:
+            self.run_with_session(lambda db: chart_api.get_chart_by_id(db, 5))
+        self.assertEqual(context.exception.status_code, 404)
+
+    def test_list_chart_by_page(self):
+        result = self.run_with_session(lambda db: chart_api.list_chart_by_page(db, 1, 2))
+        self.assertEqual(result['total'], 4)
+        self.assertEqual([chart['id'] for chart in result['records']], [4, 3])
+
+        result = self.run_with_session(lambda db: chart_api.list_chart_by_page(db, 2, 2, user_id=1))
+        self.assertEqual(result['total'], 3)
+        self.assertEqual([chart['id'] for chart in result['records']], [1])
+
+    def test_get_data_centers(self):
+        result = self.run_with_session(lambda db: get_data_centers(page=2, size=5, cursor=None, with_total=True, db=db))
+        self.assertTrue(result['success'])
+        self.assertEqual(result['total'], 12)
+        self.assertEqual([item['id'] for item in result['data']], [7, 6, 5, 4, 3])
+
+
+if __name__ == '__main__':
+    unittest.main()
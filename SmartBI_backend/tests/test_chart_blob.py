@@ -0,0 +1,151 @@
+"""
+图表原始数据存储测试模块
+
+本模块用于测试按内容寻址的图表原始数据存储，包括：
+1. 相同原始数据只保存一份压缩数据，引用计数随图表增加
+2. 图表替换数据后释放原数据的引用，计数归零后删除
+3. 图表详情从 chart_blob 读取并解压原始数据
+4. 迁移把已有图表的 chart_data 移入 chart_blob，降级时写回
+"""
+
+import os
+import sys
+import asyncio
+import tempfile
+import unittest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+# 添加项目根目录到系统路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+
+from database import models
+from database.blob_store import content_hash, get_blob
+from api import chart as chart_api
+
+CSV = "月份,机房,租金\n" + "2024-01,华南机房,123456.78\n" * 5000
+
+
+class TestChartBlob(unittest.TestCase):
+    def setUp(self):
+        fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        self.engine = create_engine(f"sqlite:///{self.db_path}")
+        models.Base.metadata.create_all(self.engine)
+        self.db = sessionmaker(bind=self.engine)()
+
+    def tearDown(self):
+        self.db.close()
+        self.engine.dispose()
+        os.remove(self.db_path)
+
+    def create(self, csv_data):
+        return chart_api.create_chart(self.db, {"name": "租金分析", "chart_type": "柱状图", "chart_data": csv_data}, user_id=1)
+
+    def blob(self, csv_data):
+        return self.db.get(models.ChartBlob, content_hash(csv_data.encode('utf-8')))
+
+    def get_detail(self, chart_id):
+        async def runner():
+            engine = create_async_engine(f"sqlite+aiosqlite:///{self.db_path}")
+            try:
+                async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+                    return await chart_api.get_chart_by_id(session, chart_id, ['chartData'])
+            finally:
+                await engine.dispose()
+        return asyncio.run(runner())
+
+    def test_identical_data_stored_once(self):
+        ids = [self.create(CSV) for _ in range(3)]
+        ids += chart_api.create_charts(self.db, [{"name": "批量", "chart_data": CSV}] * 2, user_id=1)
+
+        self.assertEqual(self.db.query(models.ChartBlob).count(), 1)
+        blob = self.blob(CSV)
+        self.assertEqual(blob.ref_count, 5)
+        self.assertEqual(blob.size, len(CSV.encode('utf-8')))
+        self.assertLess(blob.compressed_size * 20, blob.size)
+
+        charts = self.db.query(models.Chart).all()
+        self.assertEqual({chart.chart_data_hash for chart in charts}, {blob.hash})
+        self.assertEqual({chart.chart_data for chart in charts}, {None})
+        self.assertEqual(self.get_detail(ids[0])['chartData'], CSV)
+
+    def test_replaced_data_released(self):
+        first = self.create(CSV)
+        second = self.create(CSV)
+        new_csv = "月份,租金\n1月,100\n"
+
+        chart_api.edit_chart(self.db, {"id": first, "chartData": new_csv}, user_id=1)
+        self.assertEqual(self.blob(CSV).ref_count, 1)
+        self.assertEqual(get_blob(self.db, content_hash(new_csv.encode('utf-8'))), new_csv)
+
+        chart_api.update_chart(self.db, {"id": second, "chart_data": new_csv}, None, True)
+        self.assertIsNone(self.blob(CSV))
+        self.assertEqual(self.blob(new_csv).ref_count, 2)
+        self.assertEqual(self.get_detail(second)['chartData'], new_csv)
+
+        # 替换为相同数据时引用计数不变
+        chart_api.update_chart(self.db, {"id": second, "chart_data": new_csv}, None, True)
+        self.db.expire_all()
+        self.assertEqual(self.blob(new_csv).ref_count, 2)
+
+    def test_legacy_chart_data(self):
+        self.db.add(models.Chart(id=1, name='历史图表', chart_data=CSV, user_id=1))
+        self.db.commit()
+        self.assertEqual(self.get_detail(1)['chartData'], CSV)
+
+
+class TestChartBlobMigration(unittest.TestCase):
+    def setUp(self):
+        fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        self.url = f"sqlite:///{self.db_path}"
+        self.engine = create_engine(self.url)
+
+        self.config = Config(os.path.join(project_root, 'alembic.ini'))
+        self.config.set_main_option('script_location', os.path.join(project_root, 'migrations'))
+        self.config.set_main_option('sqlalchemy.url', self.url)
+        self.config.attributes['configure_logger'] = False
+
+    def tearDown(self):
+        self.engine.dispose()
+        os.remove(self.db_path)
+
+    def test_upgrade_moves_chart_data(self):
+        models.Base.metadata.create_all(self.engine)
+        command.upgrade(self.config, 'head')
+        command.downgrade(self.config, '0004')
+        with self.engine.begin() as conn:
+            for chart_id, csv_data in ((1, CSV), (2, CSV), (3, "a,b\n1,2\n"), (4, None)):
+                conn.execute(text("INSERT INTO chart (id, name, chart_data, user_id, create_time, update_time, is_delete) "
+                                  "VALUES (:id, '图表', :data, 1, '2024-01-01', '2024-01-01', 0)"),
+                             {"id": chart_id, "data": csv_data})
+
+        command.upgrade(self.config, 'head')
+        db = sessionmaker(bind=self.engine)()
+        try:
+            self.assertEqual(db.query(models.ChartBlob).count(), 2)
+            self.assertEqual(db.get(models.ChartBlob, content_hash(CSV.encode('utf-8'))).ref_count, 2)
+            charts = {chart.id: chart for chart in db.query(models.Chart)}
+            self.assertEqual({chart.chart_data for chart in charts.values()}, {None})
+            self.assertIsNone(charts[4].chart_data_hash)
+            self.assertEqual(get_blob(db, charts[1].chart_data_hash), CSV)
+        finally:
+            db.close()
+
+        command.downgrade(self.config, '0004')
+        with self.engine.connect() as conn:
+            restored = dict(conn.execute(text("SELECT id, chart_data FROM chart")).all())
+            triggers = conn.execute(text("SELECT count(*) FROM sqlite_master WHERE type = 'trigger'")).scalar()
+        self.assertEqual(restored, {1: CSV, 2: CSV, 3: "a,b\n1,2\n", 4: None})
+        # 删除列时保留全文检索触发器
+        self.assertEqual(triggers, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
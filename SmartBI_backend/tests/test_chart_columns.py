@@ -0,0 +1,109 @@
+"""
+图表大字段延迟加载测试模块
+
+本模块用于测试图表大字段（chart_data/gen_chart/gen_result）的按需加载，包括：
+1. 列表查询不读取大字段
+2. 详情查询默认返回全部大字段，fields 参数只读取请求的大字段
+3. 不支持的字段返回 400
+4. 同步会话更新图表状态时不读取大字段
+"""
+
+import os
+import re
+import sys
+import asyncio
+import tempfile
+import unittest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from fastapi import HTTPException
+
+# 添加项目根目录到系统路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+
+from database import models
+from api import chart as chart_api
+from router.chart import get_chart_by_id
+from utils.pagination import invalidate_totals
+
+HEAVY_COLUMNS = ('chart.chart_data', 'chart.gen_chart', 'chart.gen_result')
+
+
+class TestChartColumns(unittest.TestCase):
+    def setUp(self):
+        fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        self.engine = create_engine(f"sqlite:///{self.db_path}")
+        models.Base.metadata.create_all(self.engine)
+        self.db = sessionmaker(bind=self.engine)()
+        self.chart_id = chart_api.create_chart(self.db, {
+            "name": "租金分析", "goal": "分析租金", "chart_type": "柱状图",
+            "chart_data": "月份,租金\n" + "1月,100\n" * 10000,
+            "gen_chart": {"series": [{"data": [100] * 1000}]},
+            "gen_result": "租金保持平稳",
+        }, user_id=1)
+        invalidate_totals(models.Chart.__tablename__)
+        self.statements = []
+
+    def tearDown(self):
+        self.db.close()
+        self.engine.dispose()
+        os.remove(self.db_path)
+
+    def run_with_session(self, func):
+        async def runner():
+            engine = create_async_engine(f"sqlite+aiosqlite:///{self.db_path}")
+            event.listen(engine.sync_engine, "before_cursor_execute",
+                         lambda conn, cursor, statement, *args: self.statements.append(statement))
+            try:
+                async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+                    return await func(session)
+            finally:
+                await engine.dispose()
+        return asyncio.run(runner())
+
+    def selected_heavy_columns(self):
+        return {column for column in HEAVY_COLUMNS
+                if any(re.search(rf'\b{re.escape(column)}\b', statement) for statement in self.statements)}
+
+    def test_list_skips_heavy_columns(self):
+        result = self.run_with_session(lambda db: chart_api.list_chart_by_page(db, 1, 10, with_total=False))
+        self.assertEqual(result['records'][0]['name'], "租金分析")
+        self.assertNotIn('chartData', result['records'][0])
+        self.assertEqual(self.selected_heavy_columns(), set())
+
+    def test_detail_defaults_to_all_fields(self):
+        chart = self.run_with_session(lambda db: chart_api.get_chart_by_id(db, self.chart_id))
+        self.assertTrue(chart['chartData'].startswith("月份,租金"))
+        self.assertIn('"series"', chart['genChart'])
+        self.assertEqual(chart['genResult'], "租金保持平稳")
+        self.assertEqual(self.selected_heavy_columns(), set(HEAVY_COLUMNS))
+
+    def test_detail_fields(self):
+        result = self.run_with_session(lambda db: get_chart_by_id(
+            id=self.chart_id, fields="genChart, genResult", current_user={"id": 1}, db=db
+        ))
+        chart = result['data']
+        self.assertNotIn('chartData', chart)
+        self.assertEqual(chart['genResult'], "租金保持平稳")
+        self.assertEqual(chart['name'], "租金分析")
+        self.assertEqual(self.selected_heavy_columns(), {'chart.gen_chart', 'chart.gen_result'})
+
+    def test_detail_unknown_field(self):
+        with self.assertRaises(HTTPException) as context:
+            self.run_with_session(lambda db: chart_api.get_chart_by_id(db, self.chart_id, ['genChart', 'password']))
+        self.assertEqual(context.exception.status_code, 400)
+
+    def test_status_update_skips_heavy_columns(self):
+        event.listen(self.engine, "before_cursor_execute",
+                     lambda conn, cursor, statement, *args: self.statements.append(statement))
+        self.db.expire_all()
+        chart_api.update_chart(self.db, {"id": self.chart_id, "status": "running"}, None, True)
+        self.assertEqual(self.selected_heavy_columns(), set())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+"""
+图表创建测试模块
+
+本模块用于测试图表 id 由数据库自增生成，包括：
+1. 多个线程使用独立会话同时创建图表，id 不重复且全部创建成功
+2. 批量创建图表在一个事务中完成，返回的 id 与输入顺序一致
+3. 已有手工指定 id 的图表时，新图表的 id 从最大 id 之后开始
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+# 添加项目根目录到系统路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+
+from database import models
+from api import chart as chart_api
+
+
+class TestChartCreate(unittest.TestCase):
+    def setUp(self):
+        # 并发创建需要多个连接共享同一个数据库，使用文件数据库
+        fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        self.engine = create_engine(
+            f"sqlite:///{self.db_path}",
+            connect_args={"check_same_thread": False, "timeout": 30}
+        )
+        models.Base.metadata.create_all(self.engine)
+        self.Session = sessionmaker(bind=self.engine)
+
+    def tearDown(self):
+        self.engine.dispose()
+        os.remove(self.db_path)
+
+    def chart_data(self, i: int) -> dict:
+        return {"name": f"图表{i}", "goal": "分析趋势", "chart_type": "柱状图", "gen_chart": {"series": [i]}}
+
+    def test_concurrent_create(self):
+        barrier = threading.Barrier(8)
+
+        def create(i):
+            db = self.Session()
+            try:
+                barrier.wait(5)
+                return chart_api.create_chart(db, self.chart_data(i), user_id=1)
+            finally:
+                db.close()
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            ids = list(executor.map(create, range(40)))
+
+        self.assertEqual(len(set(ids)), 40)
+        db = self.Session()
+        try:
+            self.assertEqual(db.query(models.Chart).count(), 40)
+        finally:
+            db.close()
+
+    def test_bulk_create(self):
+        statements = []
+        event.listen(self.engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+        db = self.Session()
+        try:
+            ids = chart_api.create_charts(db, [self.chart_data(i) for i in range(5)], user_id=2)
+            self.assertEqual(len(set(ids)), 5)
+            names = [db.get(models.Chart, chart_id).name for chart_id in ids]
+        finally:
+            db.close()
+
+        self.assertEqual(names, [f"图表{i}" for i in range(5)])
+        # 不再查询 max(id)
+        self.assertFalse([sql for sql in statements if 'max(' in sql.lower()])
+
+    def test_continues_after_existing_ids(self):
+        db = self.Session()
+        try:
+            db.add(models.Chart(id=100, name='已有图表', user_id=1))
+            db.commit()
+            chart_id = chart_api.create_chart(db, self.chart_data(1), user_id=1)
+        finally:
+            db.close()
+        self.assertEqual(chart_id, 101)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,189 @@
+"""
+图表全文检索测试模块
+
+本模块用于测试图表名称和分析目标的全文检索，包括：
+1. 关键词命中名称或分析目标，多个词须全部出现，结果按相关度排序
+2. 新建、修改、删除图表后全文索引同步更新
+3. 游标翻页与页码分页结果一致，总数正确，排序键类型不符的游标返回 400
+4. 短关键词使用 LIKE 匹配
+5. 检索查询使用 FTS5 全文索引，不扫描 chart 表
+6. 迁移为已有数据建立全文索引
+"""
+
+import os
+import sys
+import asyncio
+import tempfile
+import unittest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from fastapi import HTTPException
+
+# 添加项目根目录到系统路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+sys.path.insert(0, current_dir)
+
+from database import models
+from database.fulltext import apply_chart_match
+from api import chart as chart_api
+from utils.pagination import encode_cursor, invalidate_totals
+from bench_indexes import create_tables_without_indexes
+
+CHARTS = [
+    ("华南机房租金分析", "分析深圳机房租金趋势"),
+    ("销售报表", "按月统计销售额"),
+    ("机房租金", "机房租金对比"),
+    ("用户增长", "分析机房租金对用户增长的影响"),
+    ("Revenue Report", "quarterly revenue"),
+]
+
+
+class TestChartSearch(unittest.TestCase):
+    def setUp(self):
+        fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        self.engine = create_engine(f"sqlite:///{self.db_path}")
+        models.Base.metadata.create_all(self.engine)
+        self.db = sessionmaker(bind=self.engine)()
+        for name, goal in CHARTS:
+            chart_api.create_chart(self.db, {"name": name, "goal": goal, "chart_type": "柱状图"}, user_id=1)
+        invalidate_totals(models.Chart.__tablename__)
+
+    def tearDown(self):
+        self.db.close()
+        self.engine.dispose()
+        os.remove(self.db_path)
+
+    def run_with_session(self, func):
+        async def runner():
+            engine = create_async_engine(f"sqlite+aiosqlite:///{self.db_path}")
+            try:
+                async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+                    return await func(session)
+            finally:
+                await engine.dispose()
+        return asyncio.run(runner())
+
+    def search(self, keyword, size=10, cursor=None, page=1, with_total=True, user_id=None):
+        return self.run_with_session(lambda db: chart_api.list_chart_by_page(
+            db, page, size, keyword, None, user_id, cursor=cursor, with_total=with_total
+        ))
+
+    def test_relevance_order(self):
+        result = self.search("机房租金")
+        names = [chart['name'] for chart in result['records']]
+        # 名称和分析目标都命中的图表排在前面，未命中的不返回
+        self.assertEqual(names[0], "机房租金")
+        self.assertEqual(set(names), {"华南机房租金分析", "机房租金", "用户增长"})
+        self.assertEqual(result['total'], 3)
+
+    def test_all_words_required(self):
+        result = self.search("机房租金 用户增长")
+        self.assertEqual([chart['name'] for chart in result['records']], ["用户增长"])
+        # 英文不区分大小写
+        self.assertEqual(self.search("REVENUE")['total'], 1)
+
+    def test_index_follows_writes(self):
+        chart_id = chart_api.create_chart(self.db, {"name": "新建机房租金看板", "chart_type": "饼图"}, user_id=2)
+        self.assertEqual(self.search("机房租金")['total'], 4)
+
+        chart_api.edit_chart(self.db, {"id": chart_id, "name": "新建看板"}, user_id=2)
+        self.assertEqual(self.search("机房租金")['total'], 3)
+        self.assertEqual(self.search("新建看板")['total'], 1)
+
+        self.assertEqual(self.search("机房租金", user_id=1)['total'], 3)
+        ids = [chart['id'] for chart in self.search("机房租金")['records']]
+        chart_api.delete_chart(self.db, ids[0], 1)
+        self.assertEqual(self.search("机房租金")['total'], 2)
+
+    def test_cursor_matches_pages(self):
+        for i in range(7):
+            chart_api.create_chart(self.db, {"name": f"机房租金明细{i}", "chart_type": "柱状图"}, user_id=1)
+        invalidate_totals(models.Chart.__tablename__)
+
+        by_cursor = []
+        cursor = None
+        while True:
+            result = self.search("机房租金", size=3, cursor=cursor, with_total=False)
+            by_cursor += [chart['id'] for chart in result['records']]
+            cursor = result['nextCursor']
+            if cursor is None:
+                break
+
+        by_page = []
+        for page in range(1, 5):
+            result = self.search("机房租金", size=3, page=page)
+            self.assertEqual(result['total'], 10)
+            by_page += [chart['id'] for chart in result['records']]
+
+        self.assertEqual(len(by_cursor), 10)
+        self.assertEqual(by_cursor, by_page)
+
+    def test_invalid_cursor(self):
+        for values in (["x", 1], [1.5, "abc"]):
+            with self.assertRaises(HTTPException) as context:
+                self.search("机房租金", cursor=encode_cursor(values), with_total=False)
+            self.assertEqual(context.exception.status_code, 400)
+
+    def test_short_keyword_falls_back_to_like(self):
+        result = self.search("销售")
+        self.assertEqual([chart['name'] for chart in result['records']], ["销售报表"])
+
+        # 短词在全文检索命中的结果上用 LIKE 过滤
+        result = self.search("机房租金 用户")
+        self.assertEqual([chart['name'] for chart in result['records']], ["用户增长"])
+
+    def test_uses_fulltext_index(self):
+        query, _ = apply_chart_match(select(models.Chart).where(models.Chart.is_delete == 0), 'sqlite', "机房租金")
+        with self.engine.connect() as conn:
+            compiled = query.compile(conn, compile_kwargs={"literal_binds": True})
+            plan = " ".join(row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {compiled}")))
+        self.assertIn('SCAN chart_fts VIRTUAL TABLE INDEX', plan)
+        self.assertIn('SEARCH chart USING INTEGER PRIMARY KEY', plan)
+
+
+class TestChartFulltextMigration(unittest.TestCase):
+    def setUp(self):
+        fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        self.url = f"sqlite:///{self.db_path}"
+        self.engine = create_engine(self.url)
+
+        self.config = Config(os.path.join(project_root, 'alembic.ini'))
+        self.config.set_main_option('script_location', os.path.join(project_root, 'migrations'))
+        self.config.set_main_option('sqlalchemy.url', self.url)
+        self.config.attributes['configure_logger'] = False
+
+    def tearDown(self):
+        self.engine.dispose()
+        os.remove(self.db_path)
+
+    def count_matches(self, keyword):
+        with self.engine.connect() as conn:
+            return conn.execute(text("SELECT count(*) FROM chart_fts WHERE chart_fts MATCH :q"), {"q": keyword}).scalar()
+
+    def test_upgrade_indexes_existing_rows(self):
+        # 迁移前的表结构没有 FTS5 虚拟表，已有图表由迁移重建索引
+        create_tables_without_indexes(self.engine)
+        with self.engine.begin() as conn:
+            conn.execute(models.Chart.__table__.insert(), [
+                {"id": 1, "name": "机房租金分析", "goal": None, "user_id": 1},
+                {"id": 2, "name": "销售报表", "goal": "机房租金占比", "user_id": 1},
+            ])
+
+        command.upgrade(self.config, 'head')
+        self.assertEqual(self.count_matches('"机房租金"'), 2)
+
+        command.downgrade(self.config, '0003')
+        with self.engine.connect() as conn:
+            tables = conn.execute(text("SELECT name FROM sqlite_master WHERE name LIKE 'chart_fts%'")).fetchall()
+        self.assertEqual(tables, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,190 @@
+"""
+流式生成图表测试模块
+
+本模块用于测试流式生成图表，包括：
+1. 增量 JSON 解析在任意分块位置下结果一致，转义字符和代理对跨分块时正确解码
+2. genResult 增量文本在回复结束前就能得到
+3. LLMClient.chat_stream 建立流失败时重试，逐段返回内容
+4. 流式生成接口按顺序推送事件，完成后保存图表记录和调用用量
+5. 大模型回复无法解析时调用用量记为失败
+"""
+
+import io
+import os
+import sys
+import json
+import asyncio
+import tempfile
+import unittest
+from unittest import mock
+import httpx
+from fastapi import HTTPException, UploadFile
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# 添加项目根目录到系统路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+sys.path.insert(0, current_dir)
+
+from api import ai_manage
+from api.ai_service import AiService
+from database import models
+from database.blob_store import get_blob
+from utils.json_stream import JsonStreamParser
+from utils.llm_cache import LLMCache
+from llm_fakes import completion, make_client, stream_response
+
+CHART_DATA = {"title": {"text": "销售额 {月度}"}, "xAxis": {"data": ["1月", "2月"]},
+              "series": [{"data": [1, 2.5], "type": "bar"}]}
+GEN_RESULT = '销售额"上升"\n二月增长 😀 \\ 结束'
+ANSWER = '```json\n' + json.dumps({"chartType": "柱状图", "chartData": CHART_DATA, "count": 2,
+                                   "genResult": GEN_RESULT}, ensure_ascii=True, indent=2) + '\n```'
+
+
+def collect(parser: JsonStreamParser, chunks):
+    fields, deltas = {}, []
+    for chunk in chunks:
+        for kind, field, value in parser.feed(chunk):
+            if kind == 'delta':
+                deltas.append(value)
+            else:
+                fields[field] = value
+    return fields, deltas
+
+
+class TestJsonStreamParser(unittest.TestCase):
+    def test_any_chunk_size(self):
+        # 转义后的回复包含 \uXXXX、代理对和字符串内的括号，逐一测试各种分块大小
+        for size in range(1, 40):
+            chunks = [ANSWER[i:i + size] for i in range(0, len(ANSWER), size)]
+            parser = JsonStreamParser(stream_fields=('genResult',))
+            fields, deltas = collect(parser, chunks)
+            self.assertTrue(parser.done)
+            self.assertEqual(fields, {"chartType": "柱状图", "chartData": CHART_DATA, "count": 2,
+                                      "genResult": GEN_RESULT}, size)
+            self.assertEqual(''.join(deltas), GEN_RESULT, size)
+
+    def test_delta_before_end(self):
+        parser = JsonStreamParser(stream_fields=('genResult',))
+        events = parser.feed('{"chartType": "饼图", "genResult": "占比最高的是')
+        self.assertEqual(events, [('field', 'chartType', '饼图'), ('delta', 'genResult', '占比最高的是')])
+        events = parser.feed('华东", "chartData": {"series": [')
+        self.assertEqual(events, [('delta', 'genResult', '华东'), ('field', 'genResult', '占比最高的是华东')])
+        self.assertEqual(parser.feed(']}}'), [('field', 'chartData', {"series": []})])
+
+
+class TestChatStream(unittest.TestCase):
+    def test_retry_then_stream(self):
+        requests = []
+
+        def handler(request):
+            requests.append(json.loads(request.content))
+            if len(requests) == 1:
+                return httpx.Response(503, json={"error": {"message": "busy"}})
+            return stream_response(["你", "好"])
+
+        client = make_client(handler)
+
+        async def runner():
+            try:
+                return [text async for text in client.chat_stream([{"role": "user", "content": "hi"}])]
+            finally:
+                await client.aclose()
+
+        self.assertEqual(asyncio.run(runner()), ["你", "好"])
+        self.assertTrue(requests[1]["stream"])
+        metrics = client.metrics()
+        self.assertEqual((metrics['calls'], metrics['retries'], metrics['running']), (1, 1, 0))
+
+
+class TestGenChartStream(unittest.TestCase):
+    def setUp(self):
+        fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        self.engine = create_engine(f"sqlite:///{self.db_path}")
+        models.Base.metadata.create_all(self.engine)
+        self.db = sessionmaker(bind=self.engine)()
+
+    def tearDown(self):
+        self.db.close()
+        self.engine.dispose()
+        os.remove(self.db_path)
+
+    def run_stream(self, handler):
+        service = AiService(llm=make_client(handler), cache=LLMCache(path=None, enabled=False))
+        content = "月份,销售额\n1月,1\n2月,2.5\n".encode('utf-8')
+        file = UploadFile(file=io.BytesIO(content), filename='data.csv', size=len(content))
+
+        async def runner():
+            try:
+                events = await ai_manage.gen_chart_stream(self.db, file, user_id=1, goal="分析销售额趋势",
+                                                          name="销售额", chart_type="柱状图")
+                return [message async for message in events]
+            finally:
+                await service.llm.aclose()
+
+        with mock.patch.object(ai_manage, 'ai_service', service), \
+                mock.patch.object(service.rag_service, 'query', return_value="未找到相关政策和规定"):
+            messages = asyncio.run(runner())
+        events = []
+        for message in messages:
+            event, data = message.rstrip('\n').split('\n')
+            events.append((event[len('event: '):], json.loads(data[len('data: '):])))
+        return events
+
+    def test_events_and_persist(self):
+        chunks = [ANSWER[i:i + 7] for i in range(0, len(ANSWER), 7)]
+        events = self.run_stream(lambda request: stream_response(chunks))
+
+        names = [event for event, _ in events]
+        self.assertEqual(names[:2], ["chartType", "chartData"])
+        self.assertEqual(names[-1], "done")
+        self.assertGreater(names.count("genResult"), 1)
+        self.assertEqual(''.join(data for event, data in events if event == "genResult"), GEN_RESULT)
+
+        done = events[-1][1]
+        chart = self.db.get(models.Chart, done["id"])
+        self.assertEqual((chart.status, chart.chart_type, chart.gen_result), ("succeeded", "柱状图", GEN_RESULT))
+        self.assertEqual(json.loads(chart.gen_chart), CHART_DATA)
+        self.assertEqual(get_blob(self.db, chart.chart_data_hash), "月份,销售额\n1月,1\n2月,2.5\n")
+        # 接口未返回用量时按回复内容计算输出 token 数
+        usage = self.db.query(models.LlmUsage).one()
+        self.assertEqual((usage.endpoint, usage.user_id, usage.chart_id), ("generate_chart", 1, chart.id))
+        self.assertGreater(usage.prompt_tokens, 0)
+        self.assertGreater(usage.output_tokens, 0)
+
+    def test_invalid_response(self):
+        events = self.run_stream(lambda request: stream_response(['{"chartType": "柱状图"}']))
+        self.assertEqual([event for event, _ in events], ["chartType", "error"])
+        self.assertIn("缺少必要字段", events[-1][1]["message"])
+        self.assertEqual(self.db.query(models.Chart).count(), 0)
+        self.assertEqual(self.db.query(models.LlmUsage).one().status, "failed")
+
+    def test_sync_unparseable_response(self):
+        def handler(request):
+            return completion("抱歉，无法生成图表",
+                              usage={"prompt_tokens": 100, "completion_tokens": 8, "total_tokens": 108})
+
+        service = AiService(llm=make_client(handler), cache=LLMCache(path=None, enabled=False))
+        content = "月份,销售额\n1月,1\n2月,2.5\n".encode('utf-8')
+        file = UploadFile(file=io.BytesIO(content), filename='data.csv', size=len(content))
+
+        async def runner():
+            try:
+                await ai_manage.gen_chart_sync(self.db, file, user_id=1, goal="分析销售额趋势", chart_type="柱状图")
+            finally:
+                await service.llm.aclose()
+
+        with mock.patch.object(ai_manage, 'ai_service', service), \
+                mock.patch.object(service.rag_service, 'query', return_value="未找到相关政策和规定"):
+            with self.assertRaises(HTTPException) as context:
+                asyncio.run(runner())
+        self.assertEqual(context.exception.status_code, 500)
+        usage = self.db.query(models.LlmUsage).one()
+        self.assertEqual((usage.status, usage.input_tokens, usage.output_tokens), ("failed", 100, 8))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,230 @@
+"""
+存量机房数据导入测试模块
+
+本模块用于测试存量机房数据导入的功能，包括：
+1. 向量化类型转换与失败行报告
+2. 批量插入整表替换
+3. 按合同编码增量合并
+4. 影子表校验与原子替换
+5. 上传文件分块读取
+"""
+
+import os
+import sys
+import asyncio
+import unittest
+from unittest import mock
+import pandas as pd
+from io import BytesIO
+from fastapi import UploadFile
+from sqlalchemy import create_engine, inspect, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# 添加项目根目录到系统路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+
+from database import models
+from database.shadow_table import ShadowTable
+from database.fulltext import FTS_TABLE
+from api import data as data_api
+from api.data import coerce_existing_frame, process_existing_data, process_new_data
+from utils.file_stream import spooled_upload, iter_file_chunks
+
+
+def make_existing_frame(n: int) -> pd.DataFrame:
+    """生成存量机房上传文件内容"""
+    return pd.DataFrame({
+        '报账点名称': [f'报账点{i}' for i in range(n)],
+        '合同编码': [f'HT{i:06d}' for i in range(n)],
+        '合同名称': [f'合同{i}' for i in range(n)],
+        '合同期始': ['2024-01-01'] * n,
+        '合同期终': ['2026-12-31'] * n,
+        '合同年租金': [10000 + i for i in range(n)],
+        '合同总金额': [30000 + i for i in range(n)],
+        '机房面积': [50.5] * n,
+        '经度': [108.9 + i * 1e-4 for i in range(n)],
+        '纬度': [34.3 + i * 1e-4 for i in range(n)]
+    })
+
+
+def make_upload(df: pd.DataFrame, filename: str = 'existing.csv') -> UploadFile:
+    """将 DataFrame 包装为上传文件"""
+    if filename.endswith('.xlsx'):
+        buffer = BytesIO()
+        df.to_excel(buffer, index=False)
+        return UploadFile(file=BytesIO(buffer.getvalue()), filename=filename)
+    return UploadFile(file=BytesIO(df.to_csv(index=False).encode('utf-8')), filename=filename)
+
+
+async def read_chunks(df: pd.DataFrame, filename: str, chunk_rows: int):
+    """将 DataFrame 作为上传文件落盘后分块读取"""
+    async with spooled_upload(make_upload(df, filename), chunk_bytes=64) as path:
+        return list(iter_file_chunks(path, filename, chunk_rows))
+
+
+class TestCoerceExistingFrame(unittest.TestCase):
+    def test_failed_rows_reported_with_excel_row_numbers(self):
+        """测试失败行按 Excel 行号报告，每行只报告第一个错误"""
+        df = make_existing_frame(5).astype(object)
+        df.loc[1, '合同年租金'] = 'abc'
+        df.loc[3, '合同期始'] = '不是日期'
+        df.loc[3, '经度'] = 'x'
+
+        records, failed = coerce_existing_frame(df)
+        self.assertEqual(len(records), 3)
+        self.assertEqual([f['row_index'] for f in failed], [3, 5])
+        self.assertIn('合同年租金', failed[0]['error'])
+        self.assertIn('abc', failed[0]['error'])
+        self.assertIn('合同期始', failed[1]['error'])
+        self.assertEqual(records['annual_rent'].dtype, 'float64')
+        self.assertEqual(list(records['contract_code']), ['HT000000', 'HT000002', 'HT000004'])
+
+
+class TestProcessExistingData(unittest.TestCase):
+    def setUp(self):
+        # 导入在线程池中执行，内存数据库需要在线程间共享同一连接
+        engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+        models.Base.metadata.create_all(engine)
+        self.db = sessionmaker(bind=engine)()
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_full_reload(self):
+        """测试整表替换导入"""
+        asyncio.run(process_existing_data(make_upload(make_existing_frame(20)), self.db))
+
+        df = make_existing_frame(30).astype(object)
+        df.loc[4, '机房面积'] = '未知'
+        result = asyncio.run(process_existing_data(make_upload(df), self.db))
+
+        self.assertEqual(result['total_records'], 30)
+        self.assertEqual(result['success_count'], 29)
+        self.assertEqual(result['failed_records'][0]['row_index'], 6)
+        self.assertEqual(self.db.query(models.DataCenter).count(), 29)
+        center = self.db.query(models.DataCenter).filter_by(contract_code='HT000007').one()
+        self.assertEqual(center.annual_rent, 10007)
+        self.assertEqual(center.contract_start.year, 2024)
+
+    def test_upsert(self):
+        """测试按合同编码增量合并"""
+        asyncio.run(process_existing_data(make_upload(make_existing_frame(20)), self.db))
+        updated_id = self.db.query(models.DataCenter).filter_by(contract_code='HT000005').one().id
+
+        # 修改 2 行，新增 5 行，不包含前 3 行
+        df = make_existing_frame(25).iloc[3:].copy()
+        df.loc[5, '合同年租金'] = 99999
+        df.loc[6, '合同期终'] = '2027-06-30'
+        result = asyncio.run(process_existing_data(make_upload(df), self.db, mode='upsert'))
+
+        self.assertEqual(result['inserted_count'], 5)
+        self.assertEqual(result['updated_count'], 2)
+        self.assertEqual(result['deleted_count'], 0)
+        self.assertEqual(result['unchanged_count'], 15)
+        self.assertEqual(self.db.query(models.DataCenter).count(), 25)
+        updated = self.db.query(models.DataCenter).filter_by(contract_code='HT000005').one()
+        self.assertEqual(updated.annual_rent, 99999)
+        self.assertEqual(updated.id, updated_id)
+
+        # 再次上传相同文件并删除缺失记录
+        result = asyncio.run(process_existing_data(make_upload(df), self.db, mode='upsert', delete_missing=True))
+        self.assertEqual(result['inserted_count'], 0)
+        self.assertEqual(result['updated_count'], 0)
+        self.assertEqual(result['deleted_count'], 3)
+        self.assertEqual(result['unchanged_count'], 22)
+        self.assertEqual(self.db.query(models.DataCenter).count(), 22)
+
+    def test_repeated_reload_swaps_tables(self):
+        """测试多次整表替换后影子表被清理且索引保留"""
+        for n in (10, 20, 15):
+            asyncio.run(process_existing_data(make_upload(make_existing_frame(n)), self.db))
+            self.assertEqual(self.db.query(models.DataCenter).count(), n)
+
+        inspector = inspect(self.db.connection())
+        # chart 表的 FTS5 虚拟表及其影子表不属于 ORM 模型
+        tables = {name for name in inspector.get_table_names() if not name.startswith(FTS_TABLE)}
+        self.assertEqual(tables, set(models.Base.metadata.tables))
+        self.assertEqual(len(inspector.get_indexes('data_centers')), len(models.DataCenter.__table__.indexes))
+
+    def test_row_count_mismatch_keeps_live_table(self):
+        """测试影子表行数校验失败时正式表保持不变"""
+        asyncio.run(process_existing_data(make_upload(make_existing_frame(10)), self.db))
+
+        records, _ = coerce_existing_frame(make_existing_frame(5))
+        with self.assertRaises(ValueError):
+            with ShadowTable(self.db, models.DataCenter.__table__) as shadow:
+                self.db.execute(insert(shadow.staging), records.to_dict('records'))
+                shadow.swap(6)
+
+        self.assertEqual(self.db.query(models.DataCenter).count(), 10)
+        self.assertNotIn('data_centers_staging', inspect(self.db.connection()).get_table_names())
+
+
+class TestChunkedIngestion(unittest.TestCase):
+    def setUp(self):
+        # 导入在线程池中执行，内存数据库需要在线程间共享同一连接
+        engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+        models.Base.metadata.create_all(engine)
+        self.db = sessionmaker(bind=engine)()
+        # 使用很小的块，保证测试数据跨越多个块
+        patcher = mock.patch.object(data_api, 'INGEST_CHUNK_ROWS', 7)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_iter_file_chunks(self):
+        """测试 CSV 和 Excel 分块读取，行索引在整个文件内连续"""
+        df = make_existing_frame(23)
+        for filename in ('existing.csv', 'existing.xlsx'):
+            chunks = asyncio.run(read_chunks(df, filename, 10))
+            self.assertEqual([len(chunk) for chunk in chunks], [10, 10, 3])
+            combined = pd.concat(chunks)
+            self.assertEqual(list(combined.index), list(range(23)))
+            self.assertEqual(list(combined['合同编码']), list(df['合同编码']))
+            self.assertEqual(list(combined.columns), list(df.columns))
+
+    def test_failed_rows_across_chunks(self):
+        """测试跨块导入时失败行号与整文件行号一致"""
+        for filename in ('existing.csv', 'existing.xlsx'):
+            df = make_existing_frame(30).astype(object)
+            df.loc[4, '机房面积'] = '未知'
+            df.loc[19, '纬度'] = '未知'
+            result = asyncio.run(process_existing_data(make_upload(df, filename), self.db))
+
+            self.assertEqual(result['total_records'], 30)
+            self.assertEqual(result['success_count'], 28)
+            self.assertEqual([f['row_index'] for f in result['failed_records']], [6, 21])
+            self.assertEqual(self.db.query(models.DataCenter).count(), 28)
+
+    def test_upsert_across_chunks(self):
+        """测试跨块增量合并，后面的块能匹配到前面块新增的记录"""
+        asyncio.run(process_existing_data(make_upload(make_existing_frame(10)), self.db))
+
+        df = pd.concat([make_existing_frame(20).iloc[5:], make_existing_frame(15).iloc[[12]]])
+        df.iloc[-1, df.columns.get_loc('合同年租金')] = 88888
+        result = asyncio.run(process_existing_data(make_upload(df), self.db, mode='upsert', delete_missing=True))
+
+        self.assertEqual(result['inserted_count'], 10)
+        self.assertEqual(result['updated_count'], 1)
+        self.assertEqual(result['deleted_count'], 5)
+        self.assertEqual(self.db.query(models.DataCenter).count(), 15)
+        self.assertEqual(self.db.query(models.DataCenter).filter_by(contract_code='HT000012').one().annual_rent, 88888)
+
+    def test_process_new_data(self):
+        """测试新增机房数据分块读取，无法转换的行被跳过"""
+        df = make_existing_frame(20).astype(object)
+        df.loc[8, '经度'] = 'x'
+        result = asyncio.run(process_new_data(make_upload(df, 'new.xlsx')))
+
+        self.assertEqual(result['total'], 19)
+        self.assertEqual(set(result['data'][0]), {'area', 'longitude', 'latitude', 'annual_rent'})
+        self.assertAlmostEqual(result['data'][8]['annual_rent'], 10009)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+"""
+上传数据概要测试模块
+
+本模块用于测试 AI 提示语中的数据压缩，包括：
+1. 未超出预算的数据原样发送
+2. 超出预算的数据改为概要和样本，总长度不超过预算，包含列类型、时间范围、分组汇总
+3. 样本包含数值列最大值和最小值所在行以及每个主要类别
+4. 无法按表格解析时截取前面的行
+5. AiService 发送给大模型的提示语使用概要，并累计节省的 token 数
+"""
+
+import io
+import os
+import sys
+import json
+import asyncio
+import unittest
+from unittest import mock
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到系统路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+sys.path.insert(0, current_dir)
+
+from api.ai_service import AiService
+from utils.data_profile import DataProfiler
+from utils.llm_cache import LLMCache
+from utils.tokens import count_tokens
+from llm_fakes import completion, make_client
+
+
+def sales_csv(rows: int) -> str:
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "日期": pd.date_range("2023-01-01", periods=rows, freq="h").strftime("%Y-%m-%d %H:%M"),
+        "地区": rng.choice(["华东", "华南", "华北", "西南"], rows),
+        "销售额": rng.normal(1000, 100, rows).round(2),
+        "备注": [f"订单{i}" for i in range(rows)],
+    })
+    df.loc[1234, "销售额"] = 99999.5
+    df.loc[2345, "销售额"] = -5.25
+    return df.to_csv(index=False)
+
+
+class TestDataProfiler(unittest.TestCase):
+    def test_small_data_unchanged(self):
+        csv_data = "月份,销售额\n1月,1\n2月,2\n"
+        result = DataProfiler(token_budget=1000).summarize(csv_data)
+        self.assertFalse(result["summarized"])
+        self.assertEqual(result["text"], csv_data)
+        self.assertEqual(result["saved_tokens"], 0)
+
+    def test_large_data_summarized(self):
+        csv_data = sales_csv(5000)
+        profiler = DataProfiler(token_budget=2000, max_sample_rows=50)
+        result = profiler.summarize(csv_data)
+
+        self.assertTrue(result["summarized"])
+        self.assertEqual(result["rows"], 5000)
+        self.assertLessEqual(count_tokens(result["text"]), 2000)
+        self.assertGreater(result["saved_tokens"], 0)
+        text = result["text"]
+        self.assertIn("- 日期（日期）：缺失 0，范围 2023-01-01 00:00:00 至 2023-07-28 07:00:00", text)
+        self.assertIn("- 地区（类别）", text)
+        self.assertIn("- 销售额（数值）：缺失 0，最小 -5.25，最大 99999.5", text)
+        self.assertIn("- 备注（文本）", text)
+        self.assertIn("按地区分组汇总", text)
+        self.assertIn("按日期（周）汇总", text)
+
+        sample = pd.read_csv(io.StringIO(text.split("行）：\n")[-1]))
+        self.assertLessEqual(len(sample), 50 + 3 + 2 + 4)
+        # 最大值和最小值所在行必选
+        self.assertIn(99999.5, sample["销售额"].tolist())
+        self.assertIn(-5.25, sample["销售额"].tolist())
+        self.assertEqual(set(sample["地区"]), {"华东", "华南", "华北", "西南"})
+
+        metrics = profiler.metrics()
+        self.assertEqual((metrics["requests"], metrics["summarized"]), (1, 1))
+        self.assertEqual(metrics["saved_tokens"], result["saved_tokens"])
+
+    def test_unparseable_truncated(self):
+        csv_data = "a,b\n" + "1,2,3,4\n" * 2000
+        result = DataProfiler(token_budget=200).summarize(csv_data)
+        self.assertTrue(result["summarized"])
+        self.assertLessEqual(result["prompt_tokens"], 220)
+        self.assertTrue(result["text"].startswith("（数据共 2001 行"))
+
+
+class TestAiServicePrompt(unittest.TestCase):
+    def test_prompt_uses_profile(self):
+        prompts = []
+        answer = json.dumps({"chartType": "折线图", "chartData": {"series": []}, "genResult": "平稳"})
+
+        def handler(request):
+            prompts.append(json.loads(request.content)["messages"][-1]["content"])
+            return completion(answer)
+
+        llm = make_client(handler)
+        profiler = DataProfiler(token_budget=1500)
+        service = AiService(llm=llm, cache=LLMCache(path=None, enabled=False), profiler=profiler)
+        csv_data = sales_csv(5000)
+
+        async def runner():
+            try:
+                return await service.generate_chart("分析销售额趋势", "折线图", csv_data)
+            finally:
+                await llm.aclose()
+
+        with mock.patch.object(service.rag_service, 'query', return_value="未找到相关政策和规定"):
+            asyncio.run(runner())
+        self.assertIn("3. 数据概要", prompts[0])
+        self.assertNotIn(csv_data[:2000], prompts[0])
+        self.assertLess(count_tokens(prompts[0]), 1500 + 1000)
+        self.assertGreater(profiler.metrics()["saved_tokens"], count_tokens(csv_data) - 1500)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+"""
+存量机房数据快照测试模块
+
+本模块用于测试存量机房快照的功能，包括：
+1. 字典编码字符串列
+2. 快照从数据库加载并共享
+3. 数据版本递增后重新加载
+"""
+
+import os
+import sys
+import unittest
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# 添加项目根目录到系统路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+sys.path.insert(0, current_dir)
+
+from database import models
+from utils.data_snapshot import StringColumn, DataCenterSnapshot, DataCenterSnapshotStore
+from test_geo_utils import make_sites
+
+
+def add_centers(db, df: pd.DataFrame):
+    """向数据库写入机房数据"""
+    for row in df.itertuples(index=False):
+        db.add(models.DataCenter(
+            report_name=row.report_name,
+            contract_code=row.contract_code,
+            contract_name=row.report_name,
+            contract_start=datetime(2024, 1, 1),
+            contract_end=datetime(2026, 12, 31),
+            annual_rent=row.annual_rent,
+            total_rent=row.annual_rent * 3,
+            area=row.area,
+            longitude=row.longitude,
+            latitude=row.latitude
+        ))
+    db.commit()
+
+
+class TestStringColumn(unittest.TestCase):
+    def test_interning(self):
+        """测试相同取值只保存一份"""
+        column = StringColumn(['甲', '乙', '甲', '甲', '丙'])
+        self.assertEqual(len(column), 5)
+        self.assertEqual(len(column.categories), 3)
+        self.assertEqual(column[2], '甲')
+        self.assertEqual(list(column[np.array([4, 1])]), ['丙', '乙'])
+        self.assertEqual(list(column.to_numpy()), ['甲', '乙', '甲', '甲', '丙'])
+
+
+class TestDataCenterSnapshotStore(unittest.TestCase):
+    def setUp(self):
+        engine = create_engine("sqlite://")
+        models.Base.metadata.create_all(engine)
+        self.db = sessionmaker(bind=engine)()
+        self.sites = make_sites(50, seed=5)
+        add_centers(self.db, self.sites)
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_load_columns(self):
+        """测试快照列与数据库一致"""
+        snapshot = DataCenterSnapshotStore().get(self.db)
+        self.assertEqual(len(snapshot), 50)
+        np.testing.assert_allclose(snapshot.latitude, self.sites['latitude'])
+        np.testing.assert_allclose(snapshot.annual_rent, self.sites['annual_rent'])
+        self.assertEqual(list(snapshot.contract_code.to_numpy()), list(self.sites['contract_code']))
+        self.assertEqual(len(snapshot.index), 50)
+
+    def test_version_bump_reloads(self):
+        """测试版本递增后重新加载快照"""
+        store = DataCenterSnapshotStore()
+        snapshot = store.get(self.db)
+        self.assertEqual(snapshot.version, 0)
+        self.assertIs(store.get(self.db), snapshot)
+
+        add_centers(self.db, make_sites(10, seed=6))
+        self.assertEqual(len(store.get(self.db)), 50)
+
+        self.assertEqual(store.bump_version(), 1)
+        reloaded = store.get(self.db)
+        self.assertEqual(reloaded.version, 1)
+        self.assertEqual(len(reloaded), 60)
+        self.assertEqual(store.refresh(self.db).version, 2)
+
+    def test_empty_table(self):
+        """测试空表"""
+        self.db.query(models.DataCenter).delete()
+        self.db.commit()
+        snapshot = DataCenterSnapshotStore().get(self.db)
+        self.assertEqual(len(snapshot), 0)
+        self.assertEqual(len(snapshot.index.query_radius(34.3, 108.9, 10).indices), 0)
+
+    def test_from_frame(self):
+        """测试从 DataFrame 创建快照"""
+        snapshot = DataCenterSnapshot.from_frame(self.sites, version=7)
+        self.assertEqual(snapshot.version, 7)
+        np.testing.assert_array_equal(snapshot.ids, np.arange(50))
+
+
+if __name__ == '__main__':
+    unittest.main()
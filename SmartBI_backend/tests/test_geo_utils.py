@@ -0,0 +1,129 @@
+"""
+地理计算工具测试模块
+
+本模块用于测试地理计算工具的功能，包括：
+1. 距离矩阵与 haversine 库逐点计算结果一致
+2. 分块计算覆盖所有行
+3. 半径内邻近点查询
+4. 向量化稽核结果与逐对计算结果一致
+"""
+
+import os
+import sys
+import unittest
+import numpy as np
+import pandas as pd
+from haversine import haversine
+
+# 添加项目根目录到系统路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+
+from utils.geo_utils import haversine_matrix, iter_distance_blocks, find_neighbors
+
+
+def make_sites(n: int, seed: int) -> pd.DataFrame:
+    """在西安市周边随机生成机房数据"""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'latitude': 34.34 + rng.uniform(-0.3, 0.3, n),
+        'longitude': 108.94 + rng.uniform(-0.3, 0.3, n),
+        'annual_rent': rng.uniform(5000, 30000, n).round(2),
+        'area': rng.uniform(10, 200, n).round(1),
+        'report_name': [f'报账点{i}' for i in range(n)],
+        'contract_code': [f'HT{i:06d}' for i in range(n)]
+    })
+
+
+class TestGeoUtils(unittest.TestCase):
+    def setUp(self):
+        self.new_data = make_sites(20, seed=1)
+        self.existing_data = make_sites(300, seed=2)
+
+    def test_haversine_matrix_matches_haversine(self):
+        """测试距离矩阵与 haversine 库一致"""
+        matrix = haversine_matrix(
+            self.new_data['latitude'], self.new_data['longitude'],
+            self.existing_data['latitude'], self.existing_data['longitude']
+        )
+        self.assertEqual(matrix.shape, (20, 300))
+        for i in (0, 7, 19):
+            for j in (0, 150, 299):
+                expected = haversine(
+                    (self.new_data['latitude'][i], self.new_data['longitude'][i]),
+                    (self.existing_data['latitude'][j], self.existing_data['longitude'][j])
+                )
+                self.assertAlmostEqual(matrix[i, j], expected, places=6)
+
+    def test_iter_distance_blocks_covers_all_rows(self):
+        """测试分块计算覆盖所有行"""
+        blocks = list(iter_distance_blocks(
+            self.new_data['latitude'], self.new_data['longitude'],
+            self.existing_data['latitude'], self.existing_data['longitude'],
+            block_elements=1000
+        ))
+        self.assertEqual(blocks[0][0], 0)
+        self.assertEqual(blocks[-1][1], 20)
+        full = np.vstack([block for _, _, block in blocks])
+        expected = haversine_matrix(
+            self.new_data['latitude'], self.new_data['longitude'],
+            self.existing_data['latitude'], self.existing_data['longitude']
+        )
+        np.testing.assert_allclose(full, expected)
+
+    def test_find_neighbors_matches_matrix(self):
+        """测试邻近点查询与距离矩阵阈值筛选一致"""
+        radius_km = 5
+        matrix = haversine_matrix(
+            self.new_data['latitude'], self.new_data['longitude'],
+            self.existing_data['latitude'], self.existing_data['longitude']
+        )
+        neighbors = find_neighbors(
+            self.new_data['latitude'], self.new_data['longitude'],
+            self.existing_data['latitude'], self.existing_data['longitude'],
+            radius_km, block_elements=1000
+        )
+        self.assertEqual(len(neighbors), 20)
+        for i in range(20):
+            indices, distances = neighbors.neighbors_of(i)
+            np.testing.assert_array_equal(indices, np.nonzero(matrix[i] <= radius_km)[0])
+            np.testing.assert_allclose(distances, matrix[i, indices])
+        np.testing.assert_array_equal(
+            neighbors.unique_indices(),
+            np.nonzero((matrix <= radius_km).any(axis=0))[0]
+        )
+
+    def test_build_audit_results_matches_pairwise(self):
+        """测试向量化稽核结果与逐对计算一致"""
+        from api.data import build_audit_results, resolve_neighbors
+        from utils.data_snapshot import DataCenterSnapshot
+
+        radius_km = 5
+        snapshot = DataCenterSnapshot.from_frame(self.existing_data)
+        neighbors = resolve_neighbors(self.new_data, snapshot.index, radius_km)
+        results = build_audit_results(self.new_data, snapshot, neighbors, radius_km)
+        self.assertEqual(len(results), len(self.new_data))
+
+        for (_, new_dc), result in zip(self.new_data.iterrows(), results):
+            distances = self.existing_data.apply(
+                lambda row: haversine(
+                    (new_dc['latitude'], new_dc['longitude']),
+                    (row['latitude'], row['longitude'])
+                ),
+                axis=1
+            )
+            nearby = self.existing_data[distances <= radius_km]
+            if nearby.empty:
+                self.assertIn('analysis_result', result)
+                continue
+            nearest = distances[distances <= radius_km].idxmin()
+            self.assertAlmostEqual(result['nearby_avg_rent'], nearby['annual_rent'].mean(), places=6)
+            self.assertEqual(result['nearby_min_rent'], nearby['annual_rent'].min())
+            self.assertEqual(result['nearby_max_rent'], nearby['annual_rent'].max())
+            self.assertEqual(result['nearest_contract_code'], self.existing_data.loc[nearest, 'contract_code'])
+            self.assertEqual(result['nearest_name'], self.existing_data.loc[nearest, 'report_name'])
+
+
+if __name__ == '__main__':
+    unittest.main()
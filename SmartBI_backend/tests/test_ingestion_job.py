@@ -0,0 +1,125 @@
+"""
+数据导入任务测试模块
+
+本模块用于测试存量机房后台导入任务的功能，包括：
+1. 提交任务后在后台完成导入并报告进度，全量替换和增量合并两种方式
+2. 文件校验失败时任务标记为失败
+3. 服务重启后长时间没有更新的未完成任务标记为中断
+"""
+
+import os
+import sys
+import time
+import asyncio
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from fastapi import HTTPException
+
+# 添加项目根目录到系统路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+sys.path.insert(0, current_dir)
+
+from database import models
+from api.ingestion import submit_ingestion_job, get_job_status, recover_interrupted_jobs
+from test_data_ingest import make_existing_frame, make_upload
+
+
+class TestIngestionJob(unittest.TestCase):
+    def setUp(self):
+        # 后台线程使用独立连接，需要文件数据库
+        fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        engine = create_engine(f"sqlite:///{self.db_path}")
+        models.Base.metadata.create_all(engine)
+        self.Session = sessionmaker(bind=engine)
+        self.db = self.Session()
+        self.engine = engine
+
+    def tearDown(self):
+        self.db.close()
+        self.engine.dispose()
+        os.remove(self.db_path)
+
+    def submit(self, df, **kwargs):
+        return asyncio.run(submit_ingestion_job(make_upload(df), self.db, session_factory=self.Session, **kwargs))
+
+    def wait(self, job_id: int, timeout: float = 30):
+        """等待任务结束并返回最终状态"""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            self.db.expire_all()
+            status = get_job_status(self.db, job_id)
+            if status['status'] not in ('waiting', 'running'):
+                return status
+            time.sleep(0.05)
+        self.fail(f"导入任务 {job_id} 未在 {timeout} 秒内结束")
+
+    def test_job_completes(self):
+        """测试任务在后台完成导入"""
+        df = make_existing_frame(50).astype(object)
+        df.loc[3, '合同年租金'] = 'abc'
+        submitted = self.submit(df)
+        self.assertEqual(submitted['status'], 'waiting')
+
+        status = self.wait(submitted['job_id'])
+        self.assertEqual(status['status'], 'succeeded')
+        self.assertEqual(status['phase'], 'done')
+        self.assertEqual(status['total_records'], 50)
+        self.assertEqual(status['success_count'], 49)
+        self.assertEqual(status['failed_count'], 1)
+        self.assertEqual(status['result']['failed_records'][0]['row_index'], 5)
+        self.assertIsNotNone(status['rows_per_second'])
+        self.assertEqual(self.db.query(models.DataCenter).count(), 49)
+
+    def test_upsert_job_completes(self):
+        """测试增量合并任务在 SQLite 上完成，数据写入事务未提交时不提交进度"""
+        first = self.wait(self.submit(make_existing_frame(50), mode='upsert')['job_id'])
+        self.assertEqual(first['status'], 'succeeded', first['exec_message'])
+        self.assertEqual(first['result']['inserted_count'], 50)
+
+        df = make_existing_frame(50).astype(object)
+        df.loc[3, '合同年租金'] = 'abc'
+        df.loc[4, '合同年租金'] = 123456.0
+        status = self.wait(self.submit(df, mode='upsert')['job_id'])
+        self.assertEqual(status['status'], 'succeeded', status['exec_message'])
+        self.assertEqual(status['phase'], 'done')
+        self.assertEqual((status['total_records'], status['success_count'], status['failed_count']), (50, 49, 1))
+        self.assertEqual((status['result']['updated_count'], status['result']['unchanged_count']), (1, 48))
+        self.assertEqual(self.db.query(models.DataCenter).count(), 50)
+
+    def test_job_fails_on_missing_columns(self):
+        """测试文件缺少必要列时任务失败"""
+        status = self.wait(self.submit(make_existing_frame(5).drop(columns=['经度']))['job_id'])
+        self.assertEqual(status['status'], 'failed')
+        self.assertIn('经度', status['exec_message'])
+
+    def test_unknown_job(self):
+        """测试查询不存在的任务"""
+        with self.assertRaises(HTTPException) as context:
+            get_job_status(self.db, 12345)
+        self.assertEqual(context.exception.status_code, 404)
+
+    def test_recover_interrupted_jobs(self):
+        """测试服务重启后长时间没有更新的未完成任务被标记为中断，最近更新过的任务不处理"""
+        stale = datetime.now() - timedelta(hours=2)
+        self.db.add(models.IngestionJob(filename='a.csv', mode='replace', status='running', phase='writing',
+                                        update_time=stale))
+        self.db.add(models.IngestionJob(filename='b.csv', mode='replace', status='succeeded', phase='done',
+                                        update_time=stale))
+        self.db.add(models.IngestionJob(filename='c.csv', mode='upsert', status='running', phase='writing'))
+        self.db.commit()
+
+        self.assertEqual(recover_interrupted_jobs(self.db, stale_seconds=3600), 1)
+        job = self.db.query(models.IngestionJob).filter_by(filename='a.csv').one()
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('writing', job.exec_message)
+        self.assertEqual(self.db.query(models.IngestionJob).filter_by(filename='c.csv').one().status, 'running')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,171 @@
+"""
+大模型结果缓存测试模块
+
+本模块用于测试大模型结果两级缓存，包括：
+1. 进程内命中、磁盘命中（新实例模拟进程重启）和未命中计数
+2. 过期条目不再返回
+3. 磁盘条数超过上限时淘汰最久未使用的条目
+4. CSV 换行符和行尾空白不同时缓存键相同
+5. AiService.generate_chart 重复调用不再请求大模型，bypass 时重新请求并刷新缓存
+6. 磁盘缓存不可用（文件损坏、路径不可写）时按未命中处理，不影响图表生成
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+# 添加项目根目录到系统路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+sys.path.insert(0, current_dir)
+
+from api.ai_service import AiService
+from utils.llm_cache import LLMCache, cache_key, normalize_csv
+from llm_fakes import completion, make_client
+
+
+class TestLLMCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'llm_cache.sqlite3')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_memory_and_disk_hits(self):
+        cache = LLMCache(path=self.path, ttl=60)
+        self.assertIsNone(cache.get('k'))
+        cache.set('k', {"chartType": "柱状图"})
+        self.assertEqual(cache.get('k'), {"chartType": "柱状图"})
+
+        # 新实例没有进程内缓存，从磁盘读取后回填
+        restarted = LLMCache(path=self.path, ttl=60)
+        self.assertEqual(restarted.get('k'), {"chartType": "柱状图"})
+        self.assertEqual(restarted.get('k'), {"chartType": "柱状图"})
+
+        self.assertEqual((cache.metrics()['memory_hits'], cache.metrics()['misses']), (1, 1))
+        metrics = restarted.metrics()
+        self.assertEqual((metrics['memory_hits'], metrics['disk_hits'], metrics['misses']), (1, 1, 0))
+        self.assertEqual(metrics['hit_rate'], 1.0)
+
+    def test_expired(self):
+        cache = LLMCache(path=self.path, ttl=60)
+        cache.set('k', {"v": 1})
+        with mock.patch('utils.llm_cache.time.time', return_value=time.time() + 120):
+            self.assertIsNone(LLMCache(path=self.path, ttl=60).get('k'))
+
+    def test_disk_eviction(self):
+        cache = LLMCache(path=self.path, ttl=60, memory_size=1, disk_entries=2)
+        cache.set('a', {"v": 1})
+        cache.set('b', {"v": 2})
+        # 访问 a 后 b 成为最久未使用的条目
+        with mock.patch('utils.llm_cache.time.time', return_value=time.time() + 1):
+            cache._memory.clear()
+            self.assertIsNotNone(cache.get('a'))
+            cache.set('c', {"v": 3})
+
+        restarted = LLMCache(path=self.path, ttl=60)
+        self.assertIsNotNone(restarted.get('a'))
+        self.assertIsNone(restarted.get('b'))
+        self.assertIsNotNone(restarted.get('c'))
+        self.assertEqual(cache.metrics()['evictions'], 1)
+
+    def test_disabled(self):
+        cache = LLMCache(path=self.path, enabled=False)
+        cache.set('k', {"v": 1})
+        self.assertIsNone(cache.get('k'))
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_disk_errors_ignored(self):
+        # 文件不是 SQLite 数据库，读写都出错
+        with open(self.path, 'wb') as f:
+            f.write(b'not a database' * 100)
+        cache = LLMCache(path=self.path, ttl=60)
+        self.assertIsNone(cache.get('k'))
+        cache.set('k', {"v": 1})
+        # 进程内缓存仍然可用
+        self.assertEqual(cache.get('k'), {"v": 1})
+        metrics = cache.metrics()
+        self.assertEqual((metrics['disk_errors'], metrics['misses'], metrics['writes']), (2, 1, 1))
+
+        # 缓存目录的上级是普通文件，无法创建
+        cache = LLMCache(path=os.path.join(self.path, 'sub', 'llm_cache.sqlite3'), ttl=60)
+        self.assertIsNone(cache.get('k'))
+        cache.set('k', {"v": 1})
+        self.assertEqual(cache.metrics()['disk_errors'], 2)
+
+    def test_normalize_csv(self):
+        self.assertEqual(normalize_csv("\ufeff月份,销售额\r\n1月,1 \r\n\r\n"), "月份,销售额\n1月,1")
+        self.assertEqual(cache_key(normalize_csv("a,b\r\n1,2\r\n"), "目标"),
+                         cache_key(normalize_csv("a,b\n1,2"), "目标"))
+        self.assertNotEqual(cache_key("a,b\n1,2", "目标"), cache_key("a,b\n1,2", "其他目标"))
+
+
+class TestAiServiceCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache = LLMCache(path=os.path.join(self.tmp_dir, 'llm_cache.sqlite3'), ttl=60)
+        self.requests = []
+        answer = json.dumps({
+            "chartType": "柱状图",
+            "chartData": {"xAxis": {"data": ["1月", "2月"]}, "series": [{"data": [1, 2], "type": "bar"}]},
+            "genResult": "销售额上升"
+        }, ensure_ascii=False)
+
+        def handler(request):
+            self.requests.append(request)
+            return completion(answer)
+
+        self.service = AiService(llm=make_client(handler), cache=self.cache)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def generate(self, calls):
+        async def runner():
+            try:
+                return [await self.service.generate_chart(*args, **kwargs) for args, kwargs in calls]
+            finally:
+                await self.service.llm.aclose()
+
+        with mock.patch.object(self.service.rag_service, 'query', return_value="未找到相关政策和规定"):
+            return asyncio.run(runner())
+
+    def test_repeat_served_from_cache(self):
+        goal = "分析销售额趋势"
+        results = self.generate([
+            ((goal, "柱状图", "月份,销售额\n1月,1\n2月,2"), {}),
+            ((goal, "柱状图", "月份,销售额\r\n1月,1\r\n2月,2\r\n"), {}),
+            ((goal, "折线图", "月份,销售额\n1月,1\n2月,2"), {}),
+        ])
+        self.assertEqual(results[0], results[1])
+        # 第二次调用命中缓存，图表类型不同的第三次调用重新请求大模型
+        self.assertEqual(len(self.requests), 2)
+        self.assertEqual(self.cache.metrics()['memory_hits'], 1)
+
+    def test_bypass_cache(self):
+        args = ("分析销售额趋势", "柱状图", "月份,销售额\n1月,1\n2月,2")
+        self.generate([(args, {}), (args, {"use_cache": False}), (args, {})])
+        self.assertEqual(len(self.requests), 2)
+        self.assertEqual(self.cache.metrics()['writes'], 2)
+
+    def test_broken_disk_cache(self):
+        with open(self.cache.path, 'wb') as f:
+            f.write(b'not a database' * 100)
+        args = ("分析销售额趋势", "柱状图", "月份,销售额\n1月,1\n2月,2")
+        results = self.generate([(args, {}), (args, {})])
+        self.assertEqual(results[0]["chartType"], "柱状图")
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(len(self.requests), 1)
+        self.assertGreater(self.cache.metrics()['disk_errors'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+"""
+大模型客户端测试模块
+
+本模块用于测试异步大模型客户端，包括：
+1. 服务端错误和限流按退避重试，重试次数计入指标
+2. 不可重试的错误直接抛出
+3. 同时进行的调用数不超过并发上限
+4. AiService.generate_chart 通过共用客户端调用并解析结果
+"""
+
+import os
+import sys
+import json
+import asyncio
+import unittest
+from unittest import mock
+import httpx
+import openai
+
+# 添加项目根目录到系统路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+sys.path.insert(0, current_dir)
+
+from api.ai_service import AiService
+from utils.llm_client import LLMClient
+from utils.llm_cache import LLMCache
+from llm_fakes import completion, make_client
+
+
+class TestLLMClient(unittest.TestCase):
+    def run_chat(self, client: LLMClient, content: str = '你好'):
+        async def runner():
+            try:
+                return await client.chat([{"role": "user", "content": content}])
+            finally:
+                await client.aclose()
+        return asyncio.run(runner())
+
+    def test_retry_then_succeed(self):
+        responses = [httpx.Response(500, json={"error": {"message": "busy"}}),
+                     httpx.Response(429, json={"error": {"message": "rate limited"}}),
+                     completion("结果")]
+        requests = []
+
+        def handler(request):
+            requests.append(json.loads(request.content))
+            return responses[len(requests) - 1]
+
+        client = make_client(handler, max_retries=3)
+        self.assertEqual(self.run_chat(client), "结果")
+        self.assertEqual(len(requests), 3)
+        self.assertEqual(requests[0]["model"], "deepseek-chat")
+
+        metrics = client.metrics()
+        self.assertEqual((metrics['calls'], metrics['retries'], metrics['failed']), (1, 2, 0))
+        self.assertEqual(metrics['duration_ms']['count'], 3)
+
+    def test_retries_exhausted(self):
+        client = make_client(lambda request: httpx.Response(503, json={"error": {"message": "down"}}), max_retries=2)
+        with self.assertRaises(openai.InternalServerError):
+            self.run_chat(client)
+        self.assertEqual((client.metrics()['retries'], client.metrics()['failed']), (2, 1))
+
+    def test_bad_request_not_retried(self):
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            return httpx.Response(400, json={"error": {"message": "bad request"}})
+
+        with self.assertRaises(openai.BadRequestError):
+            self.run_chat(make_client(handler, max_retries=3))
+        self.assertEqual(len(requests), 1)
+
+    def test_concurrency_limit(self):
+        state = {"running": 0, "peak": 0}
+
+        async def handler(request):
+            state["running"] += 1
+            state["peak"] = max(state["peak"], state["running"])
+            await asyncio.sleep(0.05)
+            state["running"] -= 1
+            return completion("ok")
+
+        client = make_client(handler, max_concurrency=2)
+
+        async def runner():
+            try:
+                return await asyncio.gather(*[client.chat([{"role": "user", "content": str(i)}]) for i in range(6)])
+            finally:
+                await client.aclose()
+
+        self.assertEqual(asyncio.run(runner()), ["ok"] * 6)
+        self.assertEqual(state["peak"], 2)
+        self.assertEqual(client.metrics()['queue_wait_ms']['count'], 6)
+
+
+class TestAiServiceGenerateChart(unittest.TestCase):
+    def test_generate_chart(self):
+        answer = json.dumps({
+            "chartType": "折线图",
+            "chartData": {"xAxis": {"data": ["1月", "2月"]}, "series": [{"data": [1, 2], "type": "line"}]},
+            "genResult": "销售额上升"
+        }, ensure_ascii=False)
+        prompts = []
+
+        def handler(request):
+            prompts.append(json.loads(request.content)["messages"][-1]["content"])
+            return completion(answer)
+
+        service = AiService(llm=make_client(handler), cache=LLMCache(path=None, enabled=False))
+
+        async def runner():
+            try:
+                return await service.generate_chart("分析销售额趋势", "折线图", "月份,销售额\n1月,1\n2月,2")
+            finally:
+                await service.llm.aclose()
+
+        with mock.patch.object(service.rag_service, 'query', return_value="未找到相关政策和规定"):
+            result = asyncio.run(runner())
+        self.assertEqual(result["chartType"], "折线图")
+        self.assertEqual(result["chartData"]["series"][0]["data"], [1, 2])
+        self.assertIn("分析目标：分析销售额趋势", prompts[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
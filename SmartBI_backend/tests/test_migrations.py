@@ -0,0 +1,93 @@
+"""
+数据库迁移测试模块
+
+本模块用于测试 Alembic 迁移脚本，包括：
+1. 在没有新索引的旧表结构上升级后索引齐全，热点查询使用索引
+2. 在 create_all 建好的数据库上升级不重复建索引
+3. 降级后索引被删除
+4. 没有导入任务表的数据库升级后建表，降级后删除
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, inspect, select, text
+
+# 添加项目根目录到系统路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+sys.path.insert(0, current_dir)
+
+from database import models
+from bench_indexes import MIGRATION_INDEXES, create_tables_without_indexes
+
+
+class TestMigrations(unittest.TestCase):
+    def setUp(self):
+        fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        self.url = f"sqlite:///{self.db_path}"
+        self.engine = create_engine(self.url)
+
+        self.config = Config(os.path.join(project_root, 'alembic.ini'))
+        self.config.set_main_option('script_location', os.path.join(project_root, 'migrations'))
+        self.config.set_main_option('sqlalchemy.url', self.url)
+        self.config.attributes['configure_logger'] = False
+
+    def tearDown(self):
+        self.engine.dispose()
+        os.remove(self.db_path)
+
+    def index_names(self):
+        inspector = inspect(self.engine)
+        return {index['name'] for table in ('chart', 'data_centers') for index in inspector.get_indexes(table)}
+
+    def query_plan(self, query) -> str:
+        with self.engine.connect() as conn:
+            compiled = query.compile(conn, compile_kwargs={"literal_binds": True})
+            return " ".join(row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {compiled}")))
+
+    def test_upgrade_adds_indexes(self):
+        create_tables_without_indexes(self.engine)
+        self.assertFalse(MIGRATION_INDEXES & self.index_names())
+
+        command.upgrade(self.config, 'head')
+        self.assertTrue(MIGRATION_INDEXES <= self.index_names())
+
+        chart = models.Chart
+        plan = self.query_plan(
+            select(chart).where(chart.is_delete == 0, chart.user_id == 1)
+            .order_by(chart.create_time.desc(), chart.id.desc()).limit(11)
+        )
+        self.assertIn('ix_chart_user_id_is_delete_create_time', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+        plan = self.query_plan(select(models.DataCenter).where(models.DataCenter.contract_code.in_(['HT1', 'HT2'])))
+        self.assertIn('ix_data_centers_contract_code', plan)
+
+    def test_upgrade_on_current_schema(self):
+        models.Base.metadata.create_all(self.engine)
+        command.upgrade(self.config, 'head')
+        self.assertTrue(MIGRATION_INDEXES <= self.index_names())
+
+    def test_downgrade(self):
+        models.Base.metadata.create_all(self.engine)
+        command.upgrade(self.config, 'head')
+        command.downgrade(self.config, '0001')
+        self.assertFalse(MIGRATION_INDEXES & self.index_names())
+
+    def test_ingestion_job_table(self):
+        models.Base.metadata.create_all(self.engine)
+        models.IngestionJob.__table__.drop(self.engine)
+        command.upgrade(self.config, 'head')
+        self.assertTrue(inspect(self.engine).has_table('ingestion_job'))
+        command.downgrade(self.config, '0006')
+        self.assertFalse(inspect(self.engine).has_table('ingestion_job'))
+
+
+if __name__ == '__main__':
+    unittest.main()
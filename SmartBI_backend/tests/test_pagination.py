@@ -0,0 +1,156 @@
+"""
+游标分页测试模块
+
+本模块用于测试列表接口的游标分页，包括：
+1. 游标编解码
+2. 图表列表按 (create_time, id) 游标翻页，创建时间相同时顺序稳定
+3. 存量机房列表按 id 游标翻页，与 page 分页结果一致
+4. 总数缓存和写入后的失效
+"""
+
+import os
+import sys
+import asyncio
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from fastapi import HTTPException
+
+# 添加项目根目录到系统路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+
+from database import models
+from api import chart as chart_api
+from router.data import get_data_centers, get_existing_data
+from router.chart import ChartQuery, list_my_chart_by_page
+from utils.pagination import NUMBER, encode_cursor, decode_cursor, invalidate_totals
+
+
+class TestCursorEncoding(unittest.TestCase):
+    def test_round_trip(self):
+        values = [datetime(2024, 1, 2, 3, 4, 5), 42]
+        self.assertEqual(decode_cursor(encode_cursor(values), (datetime, int)), values)
+        self.assertEqual(decode_cursor(encode_cursor([1.5, 3]), (NUMBER, int)), [1.5, 3])
+
+    def test_invalid(self):
+        for cursor in ('not-a-cursor', encode_cursor([1])):
+            with self.assertRaises(ValueError):
+                decode_cursor(cursor, (datetime, int))
+
+    def test_wrong_types(self):
+        # 格式正确但排序键类型不符
+        for values in ([1, "x"], [datetime(2024, 1, 1), "abc"], [datetime(2024, 1, 1), 1.5],
+                       [datetime(2024, 1, 1), True], [{"a": 1}, 1]):
+            with self.assertRaises(ValueError):
+                decode_cursor(encode_cursor(values), (datetime, int))
+        with self.assertRaises(ValueError):
+            decode_cursor(encode_cursor(["x", 1]), (NUMBER, int))
+
+
+class TestCursorPagination(unittest.TestCase):
+    def setUp(self):
+        fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        self.engine = create_engine(f"sqlite:///{self.db_path}")
+        models.Base.metadata.create_all(self.engine)
+        self.db = sessionmaker(bind=self.engine)()
+
+        # 每三个图表的创建时间相同，检验第二排序键
+        base_time = datetime(2024, 1, 1)
+        for i in range(1, 11):
+            self.db.add(models.Chart(
+                id=i, name=f'图表{i}', status='succeed', user_id=1,
+                create_time=base_time + timedelta(days=(i - 1) // 3)
+            ))
+        for i in range(1, 24):
+            self.db.add(models.DataCenter(
+                id=i, report_name='报表', contract_code=f'HT{i:03d}', contract_name=f'合同{i}',
+                contract_start=datetime(2023, 1, 1), contract_end=datetime(2025, 1, 1),
+                annual_rent=1000.0, total_rent=2000.0, area=100.0, longitude=116.0, latitude=39.0
+            ))
+        self.db.commit()
+        invalidate_totals(models.Chart.__tablename__)
+        invalidate_totals(models.DataCenter.__tablename__)
+
+    def tearDown(self):
+        self.db.close()
+        self.engine.dispose()
+        os.remove(self.db_path)
+
+    def run_with_session(self, func):
+        async def runner():
+            engine = create_async_engine(f"sqlite+aiosqlite:///{self.db_path}")
+            try:
+                async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+                    return await func(session)
+            finally:
+                await engine.dispose()
+        return asyncio.run(runner())
+
+    def test_chart_cursor_walk(self):
+        ids = []
+        cursor = None
+        while True:
+            result = self.run_with_session(
+                lambda db: chart_api.list_chart_by_page(db, 1, 4, cursor=cursor, with_total=False)
+            )
+            self.assertIsNone(result['total'])
+            ids += [chart['id'] for chart in result['records']]
+            cursor = result['nextCursor']
+            if cursor is None:
+                break
+        self.assertEqual(ids, [10, 9, 8, 7, 6, 5, 4, 3, 2, 1])
+
+    def test_chart_route_cursor(self):
+        query = ChartQuery(current=1, size=4, withTotal=False)
+        first = self.run_with_session(lambda db: list_my_chart_by_page(query, current_user={"id": 1}, db=db))
+        query = ChartQuery(current=1, size=4, cursor=first['data']['nextCursor'], withTotal=False)
+        second = self.run_with_session(lambda db: list_my_chart_by_page(query, current_user={"id": 1}, db=db))
+        self.assertEqual([chart['id'] for chart in second['data']['records']], [6, 5, 4, 3])
+
+    def test_chart_invalid_cursor(self):
+        with self.assertRaises(HTTPException) as context:
+            self.run_with_session(lambda db: chart_api.list_chart_by_page(db, 1, 4, cursor='bad'))
+        self.assertEqual(context.exception.status_code, 400)
+
+        for values in ([1, "x"], [{"dt": "2024-01-01T00:00:00"}, "abc"]):
+            cursor = encode_cursor(values)
+            with self.assertRaises(HTTPException) as context:
+                self.run_with_session(lambda db: chart_api.list_chart_by_page(db, 1, 4, cursor=cursor))
+            self.assertEqual(context.exception.status_code, 400)
+
+    def test_data_center_cursor_matches_pages(self):
+        by_cursor = []
+        cursor = None
+        while True:
+            result = self.run_with_session(lambda db: get_data_centers(page=1, size=5, cursor=cursor, with_total=False, db=db))
+            by_cursor += [item['id'] for item in result['data']]
+            cursor = result['next_cursor']
+            if cursor is None:
+                break
+
+        by_page = []
+        for page in range(1, 6):
+            result = get_existing_data(page=page, size=5, cursor=None, with_total=True, db=self.db)
+            self.assertEqual(result['total'], 23)
+            by_page += [item['id'] for item in result['data']]
+
+        self.assertEqual(by_cursor, list(range(23, 0, -1)))
+        self.assertEqual(by_page, by_cursor)
+
+    def test_total_cached_until_invalidated(self):
+        result = self.run_with_session(lambda db: chart_api.list_chart_by_page(db, 1, 4))
+        self.assertEqual(result['total'], 10)
+
+        chart_api.delete_chart(self.db, 10, 1)
+        result = self.run_with_session(lambda db: chart_api.list_chart_by_page(db, 1, 4))
+        self.assertEqual(result['total'], 9)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+"""
+密码哈希测试模块
+
+本模块用于测试 bcrypt 哈希线程池和登录时的密码升级，包括：
+1. 哈希、校验和成本因子判断
+2. 排队已满时拒绝任务并记录指标
+3. 登录时明文密码和低成本因子哈希在后台升级
+"""
+
+import os
+import sys
+import time
+import asyncio
+import tempfile
+import threading
+import unittest
+from unittest import mock
+import bcrypt
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from fastapi import HTTPException
+
+# 添加项目根目录到系统路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+
+from database import models
+from api import auth as auth_api
+from utils.password import PasswordHasher, PasswordHasherBusy, hash_rounds
+
+
+class TestPasswordHasher(unittest.TestCase):
+    def test_hash_and_verify(self):
+        hasher = PasswordHasher(workers=2, max_queue=4, rounds=4)
+        hashed = asyncio.run(hasher.hash('password@123'))
+        self.assertEqual(hash_rounds(hashed), 4)
+        self.assertTrue(asyncio.run(hasher.verify('password@123', hashed)))
+        self.assertFalse(asyncio.run(hasher.verify('wrong-password', hashed)))
+
+        # 非 bcrypt 哈希直接抛出 ValueError，不进入线程池
+        with self.assertRaises(ValueError):
+            asyncio.run(hasher.verify('password@123', 'password@123'))
+
+        metrics = hasher.metrics()
+        self.assertEqual(metrics['completed'], 3)
+        self.assertEqual(metrics['duration_ms']['count'], 3)
+
+    def test_needs_rehash(self):
+        hasher = PasswordHasher(workers=1, max_queue=1, rounds=5)
+        self.assertTrue(hasher.needs_rehash(bcrypt.hashpw(b'x', bcrypt.gensalt(rounds=4)).decode()))
+        self.assertFalse(hasher.needs_rehash(bcrypt.hashpw(b'x', bcrypt.gensalt(rounds=5)).decode()))
+        self.assertTrue(hasher.needs_rehash('plaintext'))
+
+    def test_queue_limit(self):
+        hasher = PasswordHasher(workers=1, max_queue=1, rounds=4)
+        release = threading.Event()
+        started = threading.Event()
+
+        def block():
+            started.set()
+            release.wait(5)
+
+        running = hasher.submit(block)
+        started.wait(5)
+        queued = hasher.submit(time.sleep, 0)
+        with self.assertRaises(PasswordHasherBusy):
+            hasher.submit(time.sleep, 0)
+
+        metrics = hasher.metrics()
+        self.assertEqual((metrics['running'], metrics['queued'], metrics['rejected']), (1, 1, 1))
+
+        release.set()
+        running.result(5)
+        queued.result(5)
+        self.assertEqual(hasher.metrics()['queued'], 0)
+
+
+class TestLoginPasswordUpgrade(unittest.TestCase):
+    def setUp(self):
+        # 后台升级任务使用独立会话，需要文件数据库
+        fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        self.engine = create_engine(f"sqlite:///{self.db_path}", connect_args={"check_same_thread": False})
+        models.Base.metadata.create_all(self.engine)
+        self.Session = sessionmaker(bind=self.engine)
+        self.db = self.Session()
+
+        self.hasher = PasswordHasher(workers=1, max_queue=4, rounds=5)
+        patcher = mock.patch.object(auth_api, 'password_hasher', self.hasher)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.db.close()
+        self.engine.dispose()
+        os.remove(self.db_path)
+
+    def add_user(self, stored_password: str):
+        self.db.add(models.User(id=1, userAccount='tester', userPassword=stored_password, userRole='user'))
+        self.db.commit()
+
+    def login(self, password: str):
+        return asyncio.run(auth_api.login_user(self.db, 'tester', password, session_factory=self.Session))
+
+    def stored_password(self, previous: str, timeout: float = 10) -> str:
+        """等待后台升级任务改写密码哈希"""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            self.db.expire_all()
+            stored = self.db.get(models.User, 1).userPassword
+            if stored != previous:
+                return stored
+            time.sleep(0.02)
+        self.fail("密码哈希未在后台升级")
+
+    def test_plaintext_upgraded(self):
+        self.add_user('password@123')
+        result = self.login('password@123')
+        self.assertEqual(result['code'], 1)
+
+        stored = self.stored_password('password@123')
+        self.assertEqual(hash_rounds(stored), 5)
+        self.assertTrue(bcrypt.checkpw(b'password@123', stored.encode()))
+
+    def test_low_cost_hash_upgraded(self):
+        old_hash = bcrypt.hashpw(b'password@123', bcrypt.gensalt(rounds=4)).decode()
+        self.add_user(old_hash)
+        self.login('password@123')
+        self.assertEqual(hash_rounds(self.stored_password(old_hash)), 5)
+
+    def test_wrong_password(self):
+        self.add_user(bcrypt.hashpw(b'password@123', bcrypt.gensalt(rounds=5)).decode())
+        with self.assertRaises(HTTPException) as context:
+            self.login('wrong-password')
+        self.assertEqual(context.exception.status_code, 400)
+
+    def test_busy_returns_503(self):
+        self.add_user(bcrypt.hashpw(b'password@123', bcrypt.gensalt(rounds=5)).decode())
+        with mock.patch.object(self.hasher, 'submit', side_effect=PasswordHasherBusy()):
+            with self.assertRaises(HTTPException) as context:
+                self.login('password@123')
+        self.assertEqual(context.exception.status_code, 503)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+"""
+连接池指标测试模块
+
+本模块用于测试数据库连接池的统计功能，包括：
+1. 延迟直方图的累计分桶
+2. 取连接耗时、等待次数和超时次数的记录
+3. 连接池状态的读取和 engine.dispose() 后统计的延续
+4. 运行指标接口需要登录
+"""
+
+import os
+import sys
+import time
+import tempfile
+import threading
+import unittest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, exc, text
+
+# 添加项目根目录到系统路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+
+from database.pool import InstrumentedQueuePool
+from utils import metrics as metrics_module
+from utils.metrics import LatencyHistogram, pool_metrics, register_engine, collect_pool_metrics
+from router import metrics as metrics_router
+from router.auth import get_current_user
+
+
+class TestLatencyHistogram(unittest.TestCase):
+    def test_cumulative_buckets(self):
+        histogram = LatencyHistogram(buckets_ms=(1, 10, 100))
+        for seconds in (0.0005, 0.005, 0.006, 0.05, 2.0):
+            histogram.observe(seconds)
+
+        snapshot = histogram.snapshot()
+        self.assertEqual(snapshot['count'], 5)
+        self.assertEqual(snapshot['buckets'], {'1': 1, '10': 3, '100': 4, '+Inf': 5})
+        self.assertAlmostEqual(snapshot['max_ms'], 2000.0)
+
+    def test_empty(self):
+        snapshot = LatencyHistogram().snapshot()
+        self.assertEqual(snapshot['count'], 0)
+        self.assertIsNone(snapshot['avg_ms'])
+
+
+class TestInstrumentedQueuePool(unittest.TestCase):
+    def setUp(self):
+        fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        self.engine = create_engine(
+            f"sqlite:///{self.db_path}",
+            poolclass=InstrumentedQueuePool,
+            pool_size=1,
+            max_overflow=0,
+            pool_timeout=0.2,
+            connect_args={"check_same_thread": False}
+        )
+
+    def tearDown(self):
+        self.engine.dispose()
+        os.remove(self.db_path)
+
+    def test_checkout_counts(self):
+        for _ in range(3):
+            with self.engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+
+        metrics = pool_metrics(self.engine)
+        self.assertEqual(metrics['pool_class'], 'InstrumentedQueuePool')
+        self.assertEqual(metrics['pool_size'], 1)
+        self.assertEqual(metrics['checked_out'], 0)
+        self.assertEqual(metrics['checkout_latency_ms']['count'], 3)
+        self.assertEqual(metrics['waits'], 0)
+
+    def test_wait_for_returned_connection(self):
+        held = self.engine.connect()
+        self.assertEqual(pool_metrics(self.engine)['checked_out'], 1)
+
+        # 另一个线程在 0.1 秒后归还连接
+        timer = threading.Timer(0.1, held.close)
+        timer.start()
+        start = time.perf_counter()
+        with self.engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        timer.join()
+
+        metrics = pool_metrics(self.engine)
+        self.assertEqual(metrics['waits'], 1)
+        self.assertGreaterEqual(metrics['wait_seconds'], 0.09)
+        self.assertLessEqual(metrics['wait_seconds'], time.perf_counter() - start)
+        self.assertGreaterEqual(metrics['checkout_latency_ms']['max_ms'], 90)
+
+    def test_timeout(self):
+        held = self.engine.connect()
+        with self.assertRaises(exc.TimeoutError):
+            self.engine.connect()
+        held.close()
+
+        metrics = pool_metrics(self.engine)
+        self.assertEqual(metrics['timeouts'], 1)
+        self.assertEqual(metrics['waits'], 1)
+
+    def test_stats_survive_dispose(self):
+        with self.engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        self.engine.dispose()
+        with self.engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+        self.assertEqual(pool_metrics(self.engine)['checkout_latency_ms']['count'], 2)
+
+    def test_collect_registered(self):
+        register_engine("test", self.engine)
+        self.addCleanup(metrics_module._engines.pop, "test", None)
+        self.assertIn("test", collect_pool_metrics())
+
+
+class TestMetricsRoutes(unittest.TestCase):
+    def setUp(self):
+        self.app = FastAPI()
+        self.app.include_router(metrics_router.router)
+        self.client = TestClient(self.app)
+
+    def test_requires_login(self):
+        for path in ("/api/metrics/db-pool", "/api/metrics/llm", "/api/metrics/llm-cache",
+                     "/api/metrics/password-hash", "/api/metrics/data-profile"):
+            self.assertEqual(self.client.get(path).status_code, 401, path)
+
+    def test_logged_in(self):
+        self.app.dependency_overrides[get_current_user] = lambda: {"id": 1, "userRole": "user"}
+        response = self.client.get("/api/metrics/llm-cache")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["code"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
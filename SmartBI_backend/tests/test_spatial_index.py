@@ -0,0 +1,65 @@
+"""
+空间索引测试模块
+
+本模块用于测试空间索引的功能，包括：
+1. 半径查询与暴力计算结果一致
+2. K 近邻查询按距离升序返回
+"""
+
+import os
+import sys
+import unittest
+import numpy as np
+
+# 添加项目根目录到系统路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+sys.path.insert(0, current_dir)
+
+from utils.geo_utils import find_neighbors, haversine_matrix
+from utils.spatial_index import SpatialIndex
+from test_geo_utils import make_sites
+
+
+class TestSpatialIndex(unittest.TestCase):
+    def setUp(self):
+        self.new_data = make_sites(30, seed=3)
+        self.existing_data = make_sites(2000, seed=4)
+        self.index = SpatialIndex(self.existing_data['latitude'], self.existing_data['longitude'])
+
+    def test_query_radius_matches_brute_force(self):
+        """测试半径查询与暴力计算一致"""
+        for radius_km in (0.5, 3, 20):
+            expected = find_neighbors(
+                self.new_data['latitude'], self.new_data['longitude'],
+                self.existing_data['latitude'], self.existing_data['longitude'],
+                radius_km
+            )
+            actual = self.index.query_radius(self.new_data['latitude'], self.new_data['longitude'], radius_km)
+            np.testing.assert_array_equal(actual.offsets, expected.offsets)
+            np.testing.assert_array_equal(actual.indices, expected.indices)
+            np.testing.assert_allclose(actual.distances, expected.distances)
+
+    def test_query_knn(self):
+        """测试 K 近邻查询"""
+        indices, distances = self.index.query_knn(self.new_data['latitude'], self.new_data['longitude'], 5)
+        self.assertEqual(indices.shape, (30, 5))
+        matrix = haversine_matrix(
+            self.new_data['latitude'], self.new_data['longitude'],
+            self.existing_data['latitude'], self.existing_data['longitude']
+        )
+        np.testing.assert_allclose(distances, np.sort(matrix, axis=1)[:, :5])
+        self.assertTrue((np.diff(distances, axis=1) >= 0).all())
+
+    def test_empty_index(self):
+        """测试空索引"""
+        index = SpatialIndex([], [])
+        neighbors = index.query_radius([34.3], [108.9], 10)
+        self.assertEqual(len(neighbors), 1)
+        self.assertEqual(len(neighbors.neighbors_of(0)[0]), 0)
+        self.assertEqual(index.query_knn([34.3], [108.9], 3)[0].shape, (1, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+"""
+token 计数与用量记录测试模块
+
+本模块用于测试发送前的 token 计数和调用用量记录，包括：
+1. 按 token 截断文本不超过上限
+2. 提示语超出上限时先截断政策内容再截断数据，不可截断部分超出上限时抛出异常
+3. LLMClient 记录接口返回的输入/输出 token 数和耗时，流式调用读取最后一段的用量
+4. 用量写入 llm_usage 表，发送前失败时不写入
+"""
+
+import os
+import sys
+import json
+import asyncio
+import tempfile
+import unittest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# 添加项目根目录到系统路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+sys.path.insert(0, current_dir)
+
+from database import models
+from utils.llm_usage import LLMUsage, save_usage
+from utils.tokens import (PromptTooLargeError, TRUNCATED_MARK, count_message_tokens, count_tokens,
+                          fit_prompt, truncate_tokens)
+from llm_fakes import completion, make_client, stream_response
+
+USAGE = {"prompt_tokens": 120, "completion_tokens": 30, "total_tokens": 150}
+
+
+def build(sections):
+    return [
+        {"role": "system", "content": "你是数据分析专家。"},
+        {"role": "user", "content": f"数据：\n{sections['data']}\n政策：\n{sections['policy']}\n请输出 JSON。"}
+    ]
+
+
+class TestTokens(unittest.TestCase):
+    def test_truncate(self):
+        text = "销售额,地区\n" * 500
+        self.assertEqual(truncate_tokens(text, count_tokens(text)), text)
+        truncated = truncate_tokens(text, 100)
+        self.assertLessEqual(count_tokens(truncated), 100)
+        self.assertTrue(truncated.endswith(TRUNCATED_MARK))
+        self.assertTrue(text.startswith(truncated[:-len(TRUNCATED_MARK)]))
+
+    def test_fit_truncates_policy_first(self):
+        sections = {"data": "1月,100\n" * 200, "policy": "租金不得高于周边平均值。" * 200}
+        full = count_message_tokens(build(sections))
+        data_tokens = count_tokens(sections["data"])
+
+        # 只截断政策内容就够用时，数据保持原样
+        messages, total = fit_prompt(build, sections, full - 100, ("policy", "data"))
+        self.assertLessEqual(total, full - 100)
+        self.assertEqual(total, count_message_tokens(messages))
+        self.assertIn(sections["data"], messages[1]["content"])
+        self.assertIn(TRUNCATED_MARK, messages[1]["content"])
+
+        # 政策内容截断完仍不够时再截断数据
+        budget = data_tokens // 2
+        messages, total = fit_prompt(build, sections, budget, ("policy", "data"))
+        self.assertLessEqual(total, budget)
+        self.assertNotIn(sections["data"], messages[1]["content"])
+        self.assertIn("请输出 JSON。", messages[1]["content"])
+
+    def test_fixed_text_too_large(self):
+        with self.assertRaises(PromptTooLargeError):
+            fit_prompt(build, {"data": "1", "policy": "2"}, 10, ("policy", "data"))
+
+
+class TestUsageRecording(unittest.TestCase):
+    def test_chat_usage(self):
+        def handler(request):
+            return completion("好", usage=USAGE)
+
+        client = make_client(handler)
+        usage = LLMUsage("audit_summary")
+
+        async def runner():
+            try:
+                return await client.chat([{"role": "user", "content": "hi"}], usage=usage)
+            finally:
+                await client.aclose()
+
+        self.assertEqual(asyncio.run(runner()), "好")
+        self.assertEqual((usage.input_tokens, usage.output_tokens, usage.status), (120, 30, "succeeded"))
+        self.assertEqual(usage.model, client.model)
+        self.assertGreaterEqual(usage.latency_ms, 0)
+        metrics = client.metrics()
+        self.assertEqual((metrics["input_tokens"], metrics["output_tokens"]), (120, 30))
+
+    def test_stream_usage(self):
+        requests = []
+
+        def handler(request):
+            requests.append(json.loads(request.content))
+            return stream_response(["你好"], usage=USAGE)
+
+        client = make_client(handler)
+        usage = LLMUsage("generate_chart")
+
+        async def runner():
+            try:
+                return [text async for text in client.chat_stream([{"role": "user", "content": "hi"}], usage=usage)]
+            finally:
+                await client.aclose()
+
+        self.assertEqual(asyncio.run(runner()), ["你好"])
+        self.assertEqual(requests[0]["stream_options"], {"include_usage": True})
+        self.assertEqual((usage.input_tokens, usage.output_tokens), (120, 30))
+
+
+class TestSaveUsage(unittest.TestCase):
+    def setUp(self):
+        fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        self.engine = create_engine(f"sqlite:///{self.db_path}")
+        models.Base.metadata.create_all(self.engine)
+        self.db = sessionmaker(bind=self.engine)()
+
+    def tearDown(self):
+        self.db.close()
+        self.engine.dispose()
+        os.remove(self.db_path)
+
+    def test_save(self):
+        usage = LLMUsage("generate_chart", user_id=1)
+        save_usage(self.db, usage, chart_id=5)
+        self.assertEqual(self.db.query(models.LlmUsage).count(), 0)
+
+        usage.model, usage.prompt_tokens, usage.cached = "deepseek-chat", 200, True
+        save_usage(self.db, usage, chart_id=5)
+        row = self.db.query(models.LlmUsage).one()
+        self.assertEqual((row.endpoint, row.user_id, row.chart_id, row.prompt_tokens, row.cached, row.status),
+                         ("generate_chart", 1, 5, 200, 1, "succeeded"))
+        self.assertIsNone(row.input_tokens)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+"""
+认证缓存测试模块
+
+本模块用于测试 get_current_user 的用户和令牌缓存，包括：
+1. 缓存命中时不验证签名也不查询数据库
+2. 登录后升级密码哈希时用户缓存和令牌缓存失效
+3. 令牌缓存不超过令牌自身的有效期
+"""
+
+import os
+import sys
+import time
+import asyncio
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from fastapi import HTTPException
+from jose import jwt
+
+# 添加项目根目录到系统路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+
+from config import JWT_SECRET_KEY, JWT_ALGORITHM
+from database import models
+from api.auth import upgrade_password_hash
+from router import auth as auth_router
+from utils import user_cache
+
+
+class FailingSession:
+    """缓存命中时不应访问数据库"""
+
+    async def scalar(self, *args, **kwargs):
+        raise AssertionError("不应查询数据库")
+
+
+class TestUserCache(unittest.TestCase):
+    def setUp(self):
+        fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        self.engine = create_engine(f"sqlite:///{self.db_path}")
+        models.Base.metadata.create_all(self.engine)
+        self.Session = sessionmaker(bind=self.engine)
+        self.db = self.Session()
+        self.db.add(models.User(id=1, userAccount='tester', userPassword='x', userName='测试用户', userRole='user'))
+        self.db.commit()
+        user_cache.clear()
+
+        expire = datetime.utcnow() + timedelta(minutes=30)
+        self.token = jwt.encode({"sub": "1", "exp": expire}, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
+
+    def tearDown(self):
+        user_cache.clear()
+        self.db.close()
+        self.engine.dispose()
+        os.remove(self.db_path)
+
+    def current_user(self, use_database: bool = True, token: str = None):
+        """调用 get_current_user，use_database 为 False 时访问数据库会失败"""
+        header = f"Bearer {token or self.token}"
+
+        async def runner():
+            if not use_database:
+                return await auth_router.get_current_user(header, FailingSession())
+            engine = create_async_engine(f"sqlite+aiosqlite:///{self.db_path}")
+            try:
+                async with async_sessionmaker(engine)() as session:
+                    return await auth_router.get_current_user(header, session)
+            finally:
+                await engine.dispose()
+        return asyncio.run(runner())
+
+    def test_cache_hit_skips_signature_and_database(self):
+        self.assertEqual(self.current_user()['userRole'], 'user')
+
+        with mock.patch.object(auth_router.jwt, 'decode', side_effect=AssertionError("不应验证签名")):
+            user = self.current_user(use_database=False)
+        self.assertEqual(user['id'], 1)
+
+        # 调用方修改返回值不影响缓存
+        user['userRole'] = 'admin'
+        self.assertEqual(self.current_user(use_database=False)['userRole'], 'user')
+
+    def test_password_change_invalidates(self):
+        self.current_user()
+        self.assertIsNotNone(user_cache.get_cached_token(self.token))
+        upgrade_password_hash(1, 'new-password', self.Session)
+
+        # 令牌缓存也一并失效，需要重新验证签名和查询数据库
+        self.assertIsNone(user_cache.get_cached_user(1))
+        self.assertIsNone(user_cache.get_cached_token(self.token))
+        self.db.expire_all()
+        self.assertNotEqual(self.db.get(models.User, 1).userPassword, 'x')
+        self.assertEqual(self.current_user()['id'], 1)
+
+    def test_invalid_token_not_cached(self):
+        with self.assertRaises(HTTPException):
+            self.current_user(token='not-a-token')
+        self.assertIsNone(user_cache.get_cached_token('not-a-token'))
+
+    def test_token_cache_respects_exp(self):
+        user_cache.cache_token('expired', 1, time.time() - 1)
+        self.assertIsNone(user_cache.get_cached_token('expired'))
+
+        user_cache.cache_token('short', 1, time.time() + 0.05)
+        self.assertEqual(user_cache.get_cached_token('short'), 1)
+        time.sleep(0.1)
+        self.assertIsNone(user_cache.get_cached_token('short'))
+
+
+if __name__ == '__main__':
+    unittest.main()
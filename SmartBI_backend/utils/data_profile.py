@@ -0,0 +1,286 @@
+"""
+上传数据概要模块
+
+本模块在调用 AI 生成图表前压缩上传的数据，使提示语中的数据部分不超过 token 预算，包括：
+
+功能列表：
+1. 预算判断
+   - 原始 CSV 不超过 LLM_PROMPT_DATA_TOKENS 时原样发送
+   - token 数由 utils.tokens 计算（tiktoken，无法加载编码时按字符估算）
+
+2. 数据概要（超出预算时）
+   - 推断列类型：数值、日期、类别、文本
+   - 数值列的最小值、最大值、平均值、合计；日期列的时间范围；类别列的主要取值及行数
+   - 数值列按主要类别列分组汇总，按日期列自动选择日/周/月/季度/年粒度汇总
+   - 各部分按重要程度依次加入，超出预算的部分不再加入
+
+3. 代表性样本
+   - 前几行、各数值列最大值和最小值所在行、主要类别列每个取值的第一行必选，其余按行号均匀抽取
+   - 二分查找均匀抽取的行数，使概要和样本合计不超过预算
+
+4. 运行指标
+   - 请求数、压缩数、原始 token 数、发送 token 数、节省的 token 数
+"""
+
+import io
+import math
+import logging
+import threading
+import warnings
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config import LLM_PROMPT_DATA_TOKENS, DATA_PROFILE_TOP_CATEGORIES, DATA_PROFILE_MAX_SAMPLE_ROWS
+from utils.tokens import count_tokens
+
+logger = logging.getLogger(__name__)
+
+# 时间汇总的粒度，从细到粗选择第一个分组数不超过 MAX_TIME_BUCKETS 的粒度
+TIME_GRAINS = (('D', '日'), ('W', '周'), ('M', '月'), ('Q', '季度'), ('Y', '年'))
+MAX_TIME_BUCKETS = 36
+# 判断日期列时试解析的行数和解析成功比例
+DATE_PROBE_ROWS = 200
+DATE_PARSE_RATIO = 0.9
+# 取值数不超过该值（或不超过行数的 5%）的文本列视为类别列
+CATEGORY_MAX_UNIQUE = 50
+# 样本中必选的前几行
+HEAD_ROWS = 3
+
+
+def _fmt(value: Any) -> str:
+    """格式化统计值，整数不带小数，其他数值保留 4 位小数"""
+    if isinstance(value, (float, np.floating)):
+        if math.isfinite(value) and value.is_integer() and abs(value) < 1e15:
+            return str(int(value))
+        return f"{value:.4f}".rstrip('0').rstrip('.')
+    return str(value)
+
+
+def _fmt_time(values: pd.Series) -> Tuple[str, str]:
+    """返回日期列的起止时间，全部为整天时只显示日期"""
+    start, end = values.min(), values.max()
+    pattern = '%Y-%m-%d' if values.dropna().dt.normalize().eq(values.dropna()).all() else '%Y-%m-%d %H:%M:%S'
+    return start.strftime(pattern), end.strftime(pattern)
+
+
+class DataProfiler:
+    """按 token 预算生成上传数据的概要和代表性样本"""
+
+    def __init__(self, token_budget: int = LLM_PROMPT_DATA_TOKENS, top_categories: int = DATA_PROFILE_TOP_CATEGORIES,
+                 max_sample_rows: int = DATA_PROFILE_MAX_SAMPLE_ROWS):
+        self.token_budget = token_budget
+        self.top_categories = top_categories
+        self.max_sample_rows = max_sample_rows
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._summarized = 0
+        self._original_tokens = 0
+        self._prompt_tokens = 0
+
+    def summarize(self, csv_data: str) -> Dict[str, Any]:
+        """
+        生成提示语中的数据部分
+
+        Returns:
+            text: 发送给大模型的数据文本
+            summarized: 是否为概要（False 表示原样发送）
+            rows: 原始数据行数（原样发送时为 None）
+            sample_rows: 样本行数
+            original_tokens / prompt_tokens / saved_tokens: 原始、发送和节省的 token 数
+        """
+        original_tokens = count_tokens(csv_data)
+        result = {"text": csv_data, "summarized": False, "rows": None, "sample_rows": None}
+        if original_tokens > self.token_budget:
+            try:
+                result = self._profile(pd.read_csv(io.StringIO(csv_data)))
+            except Exception as e:
+                # 无法按表格解析时截取前面的行
+                logger.warning(f"数据概要生成失败，改为截取前面的行: {str(e)}")
+                result = self._truncate(csv_data)
+
+        result["original_tokens"] = original_tokens
+        result["prompt_tokens"] = count_tokens(result["text"])
+        result["saved_tokens"] = original_tokens - result["prompt_tokens"]
+        with self._lock:
+            self._requests += 1
+            self._summarized += int(result["summarized"])
+            self._original_tokens += original_tokens
+            self._prompt_tokens += result["prompt_tokens"]
+        if result["summarized"]:
+            logger.info(f"上传数据约 {original_tokens} tokens，超出预算 {self.token_budget}，"
+                        f"改为发送概要和 {result['sample_rows']} 行样本，约 {result['prompt_tokens']} tokens，"
+                        f"节省 {result['saved_tokens']} tokens")
+        return result
+
+    def _profile(self, df: pd.DataFrame) -> Dict[str, Any]:
+        if df.empty:
+            raise ValueError("数据为空")
+        kinds, dates = self._column_kinds(df)
+        numeric = [name for name, kind in kinds.items() if kind == '数值']
+        categories = [name for name, kind in kinds.items() if kind == '类别' and df[name].nunique() >= 2]
+        # 取值最少的类别列作为分组和分层抽样的依据
+        category = min(categories, key=lambda name: df[name].nunique()) if categories else None
+
+        sections = [self._describe(df, kinds, dates)]
+        if category is not None:
+            sections.append(self._group_by_category(df, category, numeric))
+        if dates:
+            sections.append(self._group_by_time(df, *next(iter(dates.items())), numeric))
+
+        header = f"数据规模：共 {len(df)} 行，{len(df.columns)} 列（数据较大，以下为统计概要和代表性样本）"
+        parts = [header]
+        used = count_tokens(header)
+        for section in sections:
+            tokens = count_tokens(section)
+            if used + tokens <= self.token_budget:
+                parts.append(section)
+                used += tokens
+
+        sample, sample_rows = self._sample(df, numeric, category, self.token_budget - used)
+        if sample_rows:
+            parts.append(f"代表性样本（{sample_rows} 行）：\n{sample.rstrip()}")
+        return {"text": "\n\n".join(parts), "summarized": True, "rows": len(df), "sample_rows": sample_rows}
+
+    def _column_kinds(self, df: pd.DataFrame) -> Tuple[Dict[str, str], Dict[str, pd.Series]]:
+        """推断列类型，返回列类型和日期列解析后的值"""
+        kinds, dates = {}, {}
+        for name in df.columns:
+            column = df[name]
+            if pd.api.types.is_bool_dtype(column):
+                kinds[name] = '类别'
+                continue
+            if pd.api.types.is_numeric_dtype(column):
+                kinds[name] = '数值'
+                continue
+            values = column.dropna()
+            if values.empty:
+                kinds[name] = '文本'
+                continue
+            # 先试解析少量行，确认是日期列后再解析整列，避免逐行回退解析非日期文本
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                probe = pd.to_datetime(values.head(DATE_PROBE_ROWS).astype(str), errors='coerce')
+                if probe.notna().mean() >= DATE_PARSE_RATIO:
+                    parsed = pd.to_datetime(column.astype(str).where(column.notna()), errors='coerce')
+                    if parsed.notna().sum() >= DATE_PARSE_RATIO * len(values):
+                        kinds[name] = '日期'
+                        dates[name] = parsed
+                        continue
+            unique = values.nunique()
+            kinds[name] = '类别' if unique <= max(CATEGORY_MAX_UNIQUE, len(values) * 0.05) else '文本'
+        return kinds, dates
+
+    def _describe(self, df: pd.DataFrame, kinds: Dict[str, str], dates: Dict[str, pd.Series]) -> str:
+        """各列的类型、缺失数和统计信息"""
+        missing = df.isna().sum()
+        numeric = [name for name, kind in kinds.items() if kind == '数值']
+        stats = df[numeric].agg(['min', 'max', 'mean', 'sum']) if numeric else None
+        lines = ["各列信息："]
+        for name, kind in kinds.items():
+            line = f"- {name}（{kind}）：缺失 {missing[name]}"
+            if kind == '数值':
+                column_stats = stats[name]
+                line += (f"，最小 {_fmt(column_stats['min'])}，最大 {_fmt(column_stats['max'])}，"
+                         f"平均 {_fmt(column_stats['mean'])}，合计 {_fmt(column_stats['sum'])}")
+            elif kind == '日期':
+                start, end = _fmt_time(dates[name])
+                line += f"，范围 {start} 至 {end}"
+            elif kind == '类别':
+                counts = df[name].value_counts()
+                top = '、'.join(f"{value} {count}" for value, count in counts.head(self.top_categories).items())
+                line += f"，共 {len(counts)} 个取值，主要取值（行数）：{top}"
+            else:
+                line += f"，共 {df[name].nunique()} 个不同取值"
+            lines.append(line)
+        return "\n".join(lines)
+
+    def _group_by_category(self, df: pd.DataFrame, category: str, numeric: List[str]) -> str:
+        """按类别列对数值列求和，只保留行数最多的前几个取值"""
+        top_values = df[category].value_counts().head(self.top_categories).index
+        grouped = df[df[category].isin(top_values)].groupby(category, sort=False)
+        summary = grouped[numeric].sum() if numeric else pd.DataFrame(index=grouped.size().index)
+        summary.insert(0, '行数', grouped.size())
+        summary = summary.sort_values('行数', ascending=False)
+        return f"按{category}分组汇总（行数最多的前 {len(summary)} 个取值，数值列为合计）：\n{summary.to_csv().rstrip()}"
+
+    def _group_by_time(self, df: pd.DataFrame, name: str, values: pd.Series, numeric: List[str]) -> str:
+        """按日期列汇总，选择分组数不超过 MAX_TIME_BUCKETS 的最细粒度"""
+        valid = values.notna()
+        for freq, label in TIME_GRAINS:
+            periods = values[valid].dt.to_period(freq)
+            if periods.nunique() <= MAX_TIME_BUCKETS:
+                break
+        grouped = df[valid].groupby(periods.rename(name))
+        summary = grouped[numeric].sum() if numeric else pd.DataFrame(index=grouped.size().index)
+        summary.insert(0, '行数', grouped.size())
+        return f"按{name}（{label}）汇总（数值列为合计）：\n{summary.to_csv().rstrip()}"
+
+    def _sample(self, df: pd.DataFrame, numeric: List[str], category: Optional[str], budget: int) -> Tuple[str, int]:
+        """在预算内选取尽量多的代表性样本行，返回样本 CSV 和行数"""
+        total = len(df)
+        required = [np.arange(min(HEAD_ROWS, total))]
+        if numeric:
+            # 数据使用默认的 RangeIndex，idxmax/idxmin 返回的行标签即行号，整列缺失的数值列跳过
+            present = df[numeric].dropna(axis=1, how='all')
+            required += [present.idxmax().to_numpy(), present.idxmin().to_numpy()]
+        if category is not None:
+            top_values = df[category].value_counts().head(self.top_categories).index
+            required.append(df[df[category].isin(top_values)].drop_duplicates(category).index.to_numpy())
+        required = pd.unique(np.concatenate(required).astype(np.int64))
+
+        def render(rows: np.ndarray) -> Tuple[str, int]:
+            text = df.iloc[np.sort(rows)].to_csv(index=False)
+            return text, count_tokens(text)
+
+        def largest(low: int, high: int, build) -> int:
+            """二分查找 build(k) 不超过预算的最大 k"""
+            while low < high:
+                middle = (low + high + 1) // 2
+                if render(build(middle))[1] <= budget:
+                    low = middle
+                else:
+                    high = middle - 1
+            return low
+
+        if render(required)[1] > budget:
+            # 必选行已超出预算时只保留其中靠前的部分
+            count = largest(0, len(required), lambda k: required[:k])
+            rows = required[:count]
+        else:
+            spread = lambda k: np.union1d(required, np.linspace(0, total - 1, k).round().astype(np.int64)) \
+                if k else required
+            rows = spread(largest(0, min(total, self.max_sample_rows), spread))
+        if len(rows) == 0:
+            return "", 0
+        return render(rows)[0], len(rows)
+
+    def _truncate(self, csv_data: str) -> Dict[str, Any]:
+        """保留表头和预算内的前若干行"""
+        lines = csv_data.splitlines()
+        kept, used = [], 0
+        for line in lines:
+            tokens = count_tokens(line) + 1
+            if used + tokens > self.token_budget:
+                break
+            kept.append(line)
+            used += tokens
+        sample_rows = max(len(kept) - 1, 0)
+        note = f"（数据共 {len(lines)} 行，以下为前 {sample_rows} 行）"
+        return {"text": note + "\n" + "\n".join(kept), "summarized": True, "rows": len(lines) - 1,
+                "sample_rows": sample_rows}
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "token_budget": self.token_budget,
+                "requests": self._requests,
+                "summarized": self._summarized,
+                "original_tokens": self._original_tokens,
+                "prompt_tokens": self._prompt_tokens,
+                "saved_tokens": self._original_tokens - self._prompt_tokens
+            }
+
+
+data_profiler = DataProfiler()
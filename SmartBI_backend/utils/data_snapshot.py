@@ -0,0 +1,142 @@
+"""
+存量机房数据快照模块
+
+本模块提供 data_centers 表的进程内列式快照，包括：
+
+功能列表：
+1. 列式快照
+   - 经纬度、租金、面积等数值列存为 NumPy 数组
+   - 报账点名称、合同编码存为字典编码的字符串列
+   - 快照持有空间索引，按需构建
+
+2. 版本管理
+   - 进程内单调递增的数据版本号
+   - 存量数据上传后递增版本，下次读取时重新加载
+"""
+
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from database import models
+from utils.spatial_index import SpatialIndex
+
+logger = logging.getLogger(__name__)
+
+
+class StringColumn:
+    """字典编码的字符串列，相同取值只保存一份"""
+
+    def __init__(self, values):
+        codes, categories = pd.factorize(pd.Series(values, dtype=object), use_na_sentinel=False)
+        self.codes = codes.astype(np.int32)
+        self.categories = np.asarray(categories, dtype=object)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, index):
+        """按行号取值，支持整数下标和下标数组"""
+        return self.categories[self.codes[index]]
+
+    def to_numpy(self) -> np.ndarray:
+        return self.categories[self.codes]
+
+
+class DataCenterSnapshot:
+    """存量机房列式快照，创建后不再修改，可在多个请求间共享"""
+
+    NUMERIC_COLUMNS = ('latitude', 'longitude', 'annual_rent', 'area')
+    STRING_COLUMNS = ('report_name', 'contract_code')
+
+    def __init__(self, version: int, columns: Dict[str, Any]):
+        """
+        Args:
+            version: 数据版本号
+            columns: 列名到列数据的映射，需包含 id、数值列和字符串列
+        """
+        self.version = version
+        self.ids = np.asarray(columns['id'], dtype=np.int64)
+        self.latitude = np.asarray(columns['latitude'], dtype=np.float64)
+        self.longitude = np.asarray(columns['longitude'], dtype=np.float64)
+        self.annual_rent = np.asarray(columns['annual_rent'], dtype=np.float64)
+        self.area = np.asarray(columns['area'], dtype=np.float64)
+        self.report_name = StringColumn(columns['report_name'])
+        self.contract_code = StringColumn(columns['contract_code'])
+        self._index: Optional[SpatialIndex] = None
+        self._index_lock = threading.Lock()
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame, version: int = 0) -> 'DataCenterSnapshot':
+        """从 DataFrame 创建快照，缺少 id 列时按行号编号"""
+        columns = {name: frame[name].to_numpy() for name in cls.NUMERIC_COLUMNS + cls.STRING_COLUMNS}
+        columns['id'] = frame['id'].to_numpy() if 'id' in frame else np.arange(len(frame))
+        return cls(version, columns)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def index(self) -> SpatialIndex:
+        """快照对应的空间索引，首次访问时构建"""
+        if self._index is None:
+            with self._index_lock:
+                if self._index is None:
+                    self._index = SpatialIndex(self.latitude, self.longitude)
+        return self._index
+
+
+class DataCenterSnapshotStore:
+    """存量机房快照存储，进程内共享，所有读取存量机房坐标和租金的接口都通过它查询"""
+
+    def __init__(self):
+        self._version = 0
+        self._snapshot: Optional[DataCenterSnapshot] = None
+        self._lock = threading.Lock()
+
+    @property
+    def version(self) -> int:
+        """当前数据版本号"""
+        return self._version
+
+    def get(self, db: Session) -> DataCenterSnapshot:
+        """获取当前版本的快照，不存在或已过期时从数据库加载"""
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.version != self._version:
+            with self._lock:
+                if self._snapshot is None or self._snapshot.version != self._version:
+                    self._snapshot = self._load(db, self._version)
+                snapshot = self._snapshot
+        return snapshot
+
+    def bump_version(self) -> int:
+        """递增数据版本号，使当前快照失效"""
+        with self._lock:
+            self._version += 1
+            return self._version
+
+    def refresh(self, db: Session) -> DataCenterSnapshot:
+        """递增数据版本号并立即重新加载快照，存量数据整表更新后调用"""
+        self.bump_version()
+        snapshot = self.get(db)
+        # 预先构建空间索引，避免由下一个稽核请求承担构建开销
+        snapshot.index
+        return snapshot
+
+    def _load(self, db: Session, version: int) -> DataCenterSnapshot:
+        table = models.DataCenter.__table__
+        names = ('id',) + DataCenterSnapshot.NUMERIC_COLUMNS + DataCenterSnapshot.STRING_COLUMNS
+        rows = db.execute(select(*[table.c[name] for name in names]).order_by(table.c.id)).all()
+        values = list(zip(*rows)) if rows else [()] * len(names)
+        snapshot = DataCenterSnapshot(version, dict(zip(names, values)))
+        logger.info(f"存量机房快照加载完成: 版本 {version}，共 {len(snapshot)} 个机房")
+        return snapshot
+
+
+# 全局存量机房快照实例
+data_center_snapshot = DataCenterSnapshotStore()
@@ -0,0 +1,93 @@
+"""
+执行器模块
+
+本模块统一管理异步路由中阻塞调用和 CPU 密集计算的执行位置，包括：
+
+功能列表：
+1. 阻塞调用
+   - 同步数据库会话、文件解析、同步 HTTP 客户端等阻塞 I/O 在有界线程池中执行
+   - FastAPI 的同步路由和同步依赖使用同一个线程池，容量由 BLOCKING_POOL_SIZE 配置
+   - 大响应的编码和序列化也在线程池中执行
+
+2. CPU 密集计算
+   - 模型训练等计算在进程池中执行，不占用事件循环和 GIL
+   - 进程池首次使用时创建，容量由 CPU_POOL_SIZE 配置
+
+使用约定：
+- async def 路由中不直接调用阻塞函数，使用 await run_blocking(...) 或 await run_cpu(...)
+- 只调用同步函数的路由直接声明为 def，由 FastAPI 放入线程池执行
+"""
+
+import asyncio
+import functools
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Optional
+
+from anyio import to_thread
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from config import BLOCKING_POOL_SIZE, CPU_POOL_SIZE
+
+logger = logging.getLogger(__name__)
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_lock = threading.Lock()
+
+
+def configure_thread_limiter(size: int = BLOCKING_POOL_SIZE):
+    """设置当前事件循环阻塞调用线程池的容量，应用启动时在事件循环中调用"""
+    to_thread.current_default_thread_limiter().total_tokens = size
+    logger.info(f"阻塞调用线程池容量: {size}")
+
+
+async def run_blocking(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """在阻塞调用线程池中执行同步函数并等待结果"""
+    return await to_thread.run_sync(functools.partial(func, *args, **kwargs))
+
+
+async def render_json(content: Any) -> JSONResponse:
+    """
+    在线程池中编码并序列化响应内容
+
+    async def 路由直接返回字典时，jsonable_encoder 和 json.dumps 在事件循环中执行，
+    稽核结果这类包含大量标记点的响应应改用此函数返回
+    """
+    return await run_blocking(lambda: JSONResponse(content=jsonable_encoder(content)))
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """获取 CPU 密集计算进程池，首次调用时创建"""
+    global _process_pool
+    if _process_pool is None:
+        with _process_pool_lock:
+            if _process_pool is None:
+                # 使用 spawn 启动子进程，避免在多线程进程中 fork
+                _process_pool = ProcessPoolExecutor(
+                    max_workers=CPU_POOL_SIZE,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+                logger.info(f"CPU 计算进程池已创建，进程数: {CPU_POOL_SIZE}")
+    return _process_pool
+
+
+async def run_cpu(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    在进程池中执行 CPU 密集函数并等待结果
+
+    func 和参数需要能被 pickle，func 应定义在模块顶层
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_process_pool(), functools.partial(func, *args, **kwargs))
+
+
+def shutdown_executors():
+    """关闭进程池，应用退出时调用"""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=False, cancel_futures=True)
+            _process_pool = None
@@ -0,0 +1,120 @@
+"""
+上传文件流式读取模块
+
+本模块提供大文件上传的流式读取工具，包括：
+
+功能列表：
+1. 上传文件落盘
+   - 将上传文件分块写入临时文件，不在内存中保存完整文件内容
+   - 同步处理结束后自动删除临时文件，后台任务自行删除
+
+2. 分块读取
+   - CSV 文件按 chunksize 分块读取
+   - Excel 文件使用 openpyxl 只读模式逐行读取后按块组装
+   - 各块的行索引在整个文件内连续编号，便于报告出错的行号
+"""
+
+import os
+import tempfile
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Iterator, List
+
+import pandas as pd
+from fastapi import UploadFile
+from openpyxl import load_workbook
+
+logger = logging.getLogger(__name__)
+
+# 上传文件落盘时每次读取的字节数
+SPOOL_CHUNK_BYTES = 1024 * 1024
+# 分块读取时每块的行数
+READ_CHUNK_ROWS = 10000
+
+
+async def spool_to_tempfile(file: UploadFile, chunk_bytes: int = SPOOL_CHUNK_BYTES) -> str:
+    """
+    将上传文件分块写入临时文件，由调用方负责删除
+
+    Args:
+        file: 上传文件
+        chunk_bytes: 每次读取的字节数
+
+    Returns:
+        str: 临时文件路径
+    """
+    suffix = os.path.splitext(file.filename or '')[1]
+    fd, path = tempfile.mkstemp(prefix='smartbi_upload_', suffix=suffix)
+    try:
+        size = 0
+        with os.fdopen(fd, 'wb') as output:
+            while True:
+                chunk = await file.read(chunk_bytes)
+                if not chunk:
+                    break
+                output.write(chunk)
+                size += len(chunk)
+    except Exception:
+        os.remove(path)
+        raise
+    logger.info(f"上传文件 {file.filename} 已写入临时文件，共 {size} 字节")
+    return path
+
+
+@asynccontextmanager
+async def spooled_upload(file: UploadFile, chunk_bytes: int = SPOOL_CHUNK_BYTES) -> AsyncIterator[str]:
+    """将上传文件分块写入临时文件，返回其路径，离开 with 块后删除"""
+    path = await spool_to_tempfile(file, chunk_bytes)
+    try:
+        yield path
+    finally:
+        os.remove(path)
+
+
+def _excel_header(values) -> List[str]:
+    """Excel 表头，空列名按 pandas 的规则命名"""
+    return [str(value) if value is not None else f'Unnamed: {i}' for i, value in enumerate(values)]
+
+
+def iter_excel_chunks(path: str, chunk_rows: int = READ_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """使用 openpyxl 只读模式逐行读取第一个工作表，每 chunk_rows 行组成一个 DataFrame"""
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = _excel_header(header)
+
+        start = 0
+        batch = []
+        for row in rows:
+            # 只读模式下行长度可能与表头不一致，按表头截断或补齐
+            batch.append(tuple(row[:len(columns)]) + (None,) * (len(columns) - len(row)))
+            if len(batch) >= chunk_rows:
+                yield pd.DataFrame(batch, columns=columns, index=pd.RangeIndex(start, start + len(batch)))
+                start += len(batch)
+                batch = []
+        if batch or start == 0:
+            yield pd.DataFrame(batch, columns=columns, index=pd.RangeIndex(start, start + len(batch)))
+    finally:
+        workbook.close()
+
+
+def iter_file_chunks(path: str, filename: str, chunk_rows: int = READ_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """
+    按块读取 CSV 或 Excel 文件
+
+    Args:
+        path: 文件路径
+        filename: 原始文件名，用于判断文件类型
+        chunk_rows: 每块的行数
+
+    Yields:
+        pd.DataFrame: 数据块，行索引为数据行在文件中的序号（从0开始）
+    """
+    if filename.endswith('.csv'):
+        with pd.read_csv(path, encoding='utf-8', chunksize=chunk_rows) as reader:
+            yield from reader
+    else:
+        yield from iter_excel_chunks(path, chunk_rows)
@@ -0,0 +1,157 @@
+"""
+地理计算工具模块
+
+本模块提供基于 NumPy 的批量地理距离计算，包括：
+
+功能列表：
+1. 距离矩阵
+   - 两组经纬度之间的 haversine 距离矩阵
+   - 按行分块计算，限制单次计算的内存占用
+
+2. 邻近查询
+   - 一次性求出每个点指定半径内的邻近点及距离
+   - 以压缩行格式（offsets/indices/distances）存储，供多个输出共享
+"""
+
+import numpy as np
+from typing import Iterator, NamedTuple, Tuple
+
+# 平均地球半径（公里），与 haversine 库保持一致
+EARTH_RADIUS_KM = 6371.0088
+
+# 单个距离块允许的最大元素个数（约 32MB 的 float64）
+DEFAULT_BLOCK_ELEMENTS = 4_000_000
+
+
+def haversine_distance(
+    lat1: np.ndarray,
+    lng1: np.ndarray,
+    lat2: np.ndarray,
+    lng2: np.ndarray
+) -> np.ndarray:
+    """
+    逐元素计算两组坐标之间的 haversine 距离（公里），参数按 NumPy 规则广播
+    """
+    lat1, lng1, lat2, lng2 = (
+        np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lng1, lat2, lng2)
+    )
+    d = (
+        np.sin((lat2 - lat1) * 0.5) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) * 0.5) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(d, 0.0, 1.0)))
+
+
+def haversine_matrix(
+    lat1: np.ndarray,
+    lng1: np.ndarray,
+    lat2: np.ndarray,
+    lng2: np.ndarray
+) -> np.ndarray:
+    """
+    计算两组坐标之间的 haversine 距离矩阵
+
+    Args:
+        lat1, lng1: 第一组坐标（度），长度为 N
+        lat2, lng2: 第二组坐标（度），长度为 M
+
+    Returns:
+        np.ndarray: 形状为 (N, M) 的距离矩阵（公里）
+    """
+    return haversine_distance(
+        np.asarray(lat1, dtype=np.float64)[:, np.newaxis],
+        np.asarray(lng1, dtype=np.float64)[:, np.newaxis],
+        np.asarray(lat2, dtype=np.float64)[np.newaxis, :],
+        np.asarray(lng2, dtype=np.float64)[np.newaxis, :]
+    )
+
+
+def iter_distance_blocks(
+    lat1: np.ndarray,
+    lng1: np.ndarray,
+    lat2: np.ndarray,
+    lng2: np.ndarray,
+    block_elements: int = DEFAULT_BLOCK_ELEMENTS
+) -> Iterator[Tuple[int, int, np.ndarray]]:
+    """
+    按第一组坐标分块生成距离矩阵
+
+    Args:
+        lat1, lng1: 第一组坐标（度）
+        lat2, lng2: 第二组坐标（度）
+        block_elements: 单个块允许的最大元素个数
+
+    Yields:
+        Tuple[int, int, np.ndarray]: (起始行, 结束行, 该块的距离矩阵)
+    """
+    lat1 = np.asarray(lat1, dtype=np.float64)
+    lng1 = np.asarray(lng1, dtype=np.float64)
+    n, m = len(lat1), len(lat2)
+    rows = max(1, block_elements // max(m, 1))
+
+    for start in range(0, n, rows):
+        stop = min(start + rows, n)
+        yield start, stop, haversine_matrix(lat1[start:stop], lng1[start:stop], lat2, lng2)
+
+
+class NeighborSet(NamedTuple):
+    """
+    半径内邻近点集合（压缩行格式）
+
+    第 i 个点的邻近点下标为 indices[offsets[i]:offsets[i + 1]]，
+    对应距离为 distances[offsets[i]:offsets[i + 1]]，下标按升序排列
+    """
+    offsets: np.ndarray
+    indices: np.ndarray
+    distances: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def neighbors_of(self, i: int) -> Tuple[np.ndarray, np.ndarray]:
+        """返回第 i 个点的邻近点下标和距离"""
+        start, stop = self.offsets[i], self.offsets[i + 1]
+        return self.indices[start:stop], self.distances[start:stop]
+
+    def unique_indices(self) -> np.ndarray:
+        """返回所有点的邻近点下标（去重、升序）"""
+        return np.unique(self.indices)
+
+
+def find_neighbors(
+    lat1: np.ndarray,
+    lng1: np.ndarray,
+    lat2: np.ndarray,
+    lng2: np.ndarray,
+    radius_km: float,
+    block_elements: int = DEFAULT_BLOCK_ELEMENTS
+) -> NeighborSet:
+    """
+    求出第一组中每个点在指定半径内的第二组邻近点
+
+    Args:
+        lat1, lng1: 查询点坐标（度）
+        lat2, lng2: 候选点坐标（度）
+        radius_km: 半径（公里）
+        block_elements: 单个距离块允许的最大元素个数
+
+    Returns:
+        NeighborSet: 每个查询点的邻近点下标及距离
+    """
+    counts = np.zeros(len(lat1), dtype=np.int64)
+    indices = []
+    distances = []
+
+    for start, stop, block in iter_distance_blocks(lat1, lng1, lat2, lng2, block_elements):
+        rows, cols = np.nonzero(block <= radius_km)
+        counts[start:stop] = np.bincount(rows, minlength=stop - start)
+        indices.append(cols)
+        distances.append(block[rows, cols])
+
+    offsets = np.zeros(len(lat1) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    return NeighborSet(
+        offsets=offsets,
+        indices=np.concatenate(indices) if indices else np.empty(0, dtype=np.int64),
+        distances=np.concatenate(distances) if distances else np.empty(0, dtype=np.float64)
+    )
@@ -0,0 +1,176 @@
+"""
+增量 JSON 解析模块
+
+本模块用于在大模型流式返回的过程中解析回复中的 JSON 对象，包括：
+
+功能列表：
+1. 顶层字段
+   - 跳过第一个 '{' 之前的内容（如 Markdown 代码块标记）
+   - 顶层字段的值（对象、数组、字符串、数字等）完整到达后立即解析并返回，不等待整个回复结束
+
+2. 字符串字段流式输出
+   - 指定的字符串字段（如 genResult）边到达边解码转义字符后返回增量文本
+   - 跨分块的转义序列（包括 \\uXXXX 和代理对）缓存到完整后再解码
+
+3. 线性时间
+   - 每个字符只处理一次，只有完整的字段值才交给 json.loads
+"""
+
+import json
+from typing import Any, Iterable, List, Optional, Tuple
+
+# 解析事件：("delta", 字段名, 增量文本) 或 ("field", 字段名, 字段值)
+StreamEvent = Tuple[str, str, Any]
+
+_WHITESPACE = ' \t\r\n'
+
+
+class JsonStreamParser:
+    """按分块输入大模型回复，输出顶层字段完成事件和字符串字段的增量文本"""
+
+    def __init__(self, stream_fields: Iterable[str] = ()):
+        self.stream_fields = set(stream_fields)
+        self.started = False
+        self.done = False
+        # 顶层对象内的位置：key / colon / value / comma
+        self._expect = 'key'
+        self._key: Optional[str] = None
+        self._key_raw: Optional[List[str]] = None
+        # 非流式字段值的原始文本
+        self._value_raw: Optional[List[str]] = None
+        self._value_depth = 0
+        self._in_string = False
+        self._escape = False
+        # 流式字符串字段的状态
+        self._streaming = False
+        self._stream_parts: List[str] = []
+        self._pending: List[str] = []
+        self._escape_buf = ''
+        self._high_surrogate = ''
+
+    def feed(self, chunk: str) -> List[StreamEvent]:
+        """输入一段回复文本，返回这段文本产生的事件"""
+        events: List[StreamEvent] = []
+        for char in chunk:
+            if self.done:
+                break
+            if not self.started:
+                if char == '{':
+                    self.started = True
+                continue
+            if self._streaming:
+                self._stream_char(char, events)
+            elif self._value_raw is not None:
+                self._value_char(char, events)
+            elif self._key_raw is not None:
+                self._key_char(char)
+            else:
+                self._structure_char(char, events)
+        self._flush(events)
+        return events
+
+    def _structure_char(self, char: str, events: List[StreamEvent]):
+        if char in _WHITESPACE:
+            return
+        if self._expect in ('key', 'comma'):
+            if char == '"':
+                self._key_raw = []
+            elif char == '}':
+                self.done = True
+        elif self._expect == 'colon':
+            if char == ':':
+                self._expect = 'value'
+        elif char == '"' and self._key in self.stream_fields:
+            self._streaming = True
+            self._stream_parts = []
+        else:
+            self._value_raw = [char]
+            self._value_depth = 1 if char in '{[' else 0
+            self._in_string = char == '"'
+            self._escape = False
+
+    def _key_char(self, char: str):
+        if self._escape:
+            self._escape = False
+        elif char == '\\':
+            self._escape = True
+        elif char == '"':
+            self._key = json.loads('"' + ''.join(self._key_raw) + '"')
+            self._key_raw = None
+            self._expect = 'colon'
+            return
+        self._key_raw.append(char)
+
+    def _value_char(self, char: str, events: List[StreamEvent]):
+        raw = self._value_raw
+        if self._in_string:
+            raw.append(char)
+            if self._escape:
+                self._escape = False
+            elif char == '\\':
+                self._escape = True
+            elif char == '"':
+                self._in_string = False
+                if self._value_depth == 0:
+                    self._complete_value(events)
+            return
+        if self._value_depth == 0 and char in ',}' + _WHITESPACE:
+            # 数字、true/false/null 等标量以分隔符结束
+            self._complete_value(events)
+            if char == '}':
+                self.done = True
+            return
+        raw.append(char)
+        if char == '"':
+            self._in_string = True
+        elif char in '{[':
+            self._value_depth += 1
+        elif char in '}]':
+            self._value_depth -= 1
+            if self._value_depth == 0:
+                self._complete_value(events)
+
+    def _complete_value(self, events: List[StreamEvent]):
+        raw = ''.join(self._value_raw)
+        self._value_raw = None
+        self._expect = 'comma'
+        try:
+            events.append(('field', self._key, json.loads(raw)))
+        except json.JSONDecodeError:
+            # 字段值不是合法 JSON 时不产生事件，由调用方对完整回复做最终校验
+            pass
+
+    def _stream_char(self, char: str, events: List[StreamEvent]):
+        if self._escape_buf:
+            self._escape_buf += char
+            if len(self._escape_buf) == (6 if self._escape_buf[1] == 'u' else 2):
+                self._decode_escape()
+        elif char == '\\':
+            self._escape_buf = char
+        elif char == '"':
+            self._flush(events)
+            self._streaming = False
+            self._expect = 'comma'
+            events.append(('field', self._key, ''.join(self._stream_parts)))
+        else:
+            self._pending.append(char)
+
+    def _decode_escape(self):
+        sequence, self._escape_buf = self._escape_buf, ''
+        try:
+            text = json.loads('"' + self._high_surrogate + sequence + '"')
+        except json.JSONDecodeError:
+            text = sequence
+        self._high_surrogate = ''
+        # 代理对的高位部分等低位部分到达后一起解码
+        if len(text) == 1 and '\ud800' <= text <= '\udbff':
+            self._high_surrogate = sequence
+            return
+        self._pending.append(text)
+
+    def _flush(self, events: List[StreamEvent]):
+        if self._pending:
+            text = ''.join(self._pending)
+            self._pending = []
+            self._stream_parts.append(text)
+            events.append(('delta', self._key, text))
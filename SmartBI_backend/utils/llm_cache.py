@@ -0,0 +1,208 @@
+"""
+大模型结果缓存模块
+
+本模块缓存 AI 图表生成等大模型调用的解析结果，包括：
+
+功能列表：
+1. 缓存键
+   - 对规范化后的 CSV（去除 BOM、统一换行、去掉行尾空白和末尾空行）、分析目标、图表类型、
+     提示语模板版本和检索到的政策内容计算 SHA-256
+   - 提示语模板或政策文档变化后键随之变化，旧结果自然失效
+
+2. 两级缓存
+   - 进程内 LRU（cachetools.TTLCache），条数由 LLM_CACHE_MEMORY_SIZE 配置
+   - 磁盘缓存（SQLite 文件），进程重启后仍然有效，同一台机器上的多个进程共用，
+     条数超过 LLM_CACHE_DISK_ENTRIES 时淘汰最久未使用的条目
+   - 两级缓存都在 LLM_CACHE_TTL 秒后过期；磁盘命中时回填进程内缓存
+   - 磁盘缓存出错（数据库锁定、磁盘已满、路径不可写）时记录警告，读取按未命中处理，写入跳过，
+     不影响调用方的请求
+
+3. 运行指标
+   - 进程内命中数、磁盘命中数、未命中数、写入数、淘汰数、磁盘缓存出错数
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from cachetools import TTLCache
+
+from config import LLM_CACHE_ENABLED, LLM_CACHE_TTL, LLM_CACHE_MEMORY_SIZE, LLM_CACHE_PATH, LLM_CACHE_DISK_ENTRIES
+from utils.executor import run_blocking
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_csv(csv_data: str) -> str:
+    """规范化 CSV 文本，内容相同但换行符或行尾空白不同的文件得到相同的缓存键"""
+    lines = csv_data.lstrip('\ufeff').replace('\r\n', '\n').replace('\r', '\n').split('\n')
+    return '\n'.join(line.rstrip() for line in lines).strip('\n')
+
+
+def cache_key(*parts: Any) -> str:
+    """按顺序对各部分计算 SHA-256"""
+    payload = json.dumps(parts, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class LLMCache:
+    """进程内 LRU + SQLite 磁盘两级缓存，值为可 JSON 序列化的字典"""
+
+    def __init__(self, path: Optional[str] = LLM_CACHE_PATH, ttl: int = LLM_CACHE_TTL,
+                 memory_size: int = LLM_CACHE_MEMORY_SIZE, disk_entries: int = LLM_CACHE_DISK_ENTRIES,
+                 enabled: bool = LLM_CACHE_ENABLED):
+        self.path = path
+        self.ttl = ttl
+        self.disk_entries = disk_entries
+        self.enabled = enabled
+        self._memory = TTLCache(maxsize=memory_size, ttl=ttl)
+        self._lock = threading.Lock()
+        # sqlite3 连接不能跨线程使用，每个线程一个连接
+        self._local = threading.local()
+        self._schema_ready = False
+        self._memory_hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._writes = 0
+        self._evictions = 0
+        self._disk_errors = 0
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        if not self.path:
+            return None
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            if not self._schema_ready:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS llm_cache ("
+                    "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS ix_llm_cache_last_access ON llm_cache (last_access)")
+                self._schema_ready = True
+            self._local.conn = conn
+        return conn
+
+    def _disk_error(self, action: str, error: Exception):
+        """磁盘缓存出错时记录警告，并丢弃当前线程的连接，下次使用时重新连接"""
+        self._count('_disk_errors')
+        logger.warning(f"大模型结果磁盘缓存{action}失败，已忽略: {str(error)}")
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            self._local.conn = None
+            conn.close()
+
+    def _count(self, name: str, n: int = 1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + n)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """读取缓存，依次查找进程内缓存和磁盘缓存，未命中或已过期返回 None"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            value = self._memory.get(key)
+        if value is not None:
+            self._count('_memory_hits')
+            return json.loads(value)
+
+        try:
+            row = self._disk_get(key)
+        except (sqlite3.Error, OSError) as e:
+            self._disk_error("读取", e)
+            row = None
+        if row is not None:
+            with self._lock:
+                self._memory[key] = row[0]
+            self._count('_disk_hits')
+            return json.loads(row[0])
+
+        self._count('_misses')
+        return None
+
+    def _disk_get(self, key: str):
+        conn = self._connect()
+        if conn is None:
+            return None
+        now = time.time()
+        row = conn.execute("SELECT value, expires_at FROM llm_cache WHERE key = ? AND expires_at > ?",
+                           (key, now)).fetchone()
+        if row is not None:
+            conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+        return row
+
+    def set(self, key: str, value: Dict[str, Any]):
+        """写入两级缓存，磁盘条数超过上限时淘汰过期和最久未使用的条目"""
+        if not self.enabled:
+            return
+        payload = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._memory[key] = payload
+        try:
+            self._disk_set(key, payload)
+        except (sqlite3.Error, OSError) as e:
+            self._disk_error("写入", e)
+        self._count('_writes')
+
+    def _disk_set(self, key: str, payload: str):
+        conn = self._connect()
+        if conn is None:
+            return
+        now = time.time()
+        conn.execute("INSERT OR REPLACE INTO llm_cache (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                     (key, payload, now + self.ttl, now))
+        evicted = conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,)).rowcount
+        evicted += conn.execute(
+            "DELETE FROM llm_cache WHERE key IN "
+            "(SELECT key FROM llm_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+            (self.disk_entries,)
+        ).rowcount
+        if evicted:
+            self._count('_evictions', evicted)
+
+    async def aget(self, key: str) -> Optional[Dict[str, Any]]:
+        """读取缓存，磁盘查询在阻塞调用线程池中执行"""
+        if not self.enabled:
+            return None
+        return await run_blocking(self.get, key)
+
+    async def aset(self, key: str, value: Dict[str, Any]):
+        if self.enabled:
+            await run_blocking(self.set, key, value)
+
+    def clear(self):
+        """清空两级缓存"""
+        with self._lock:
+            self._memory.clear()
+        conn = self._connect()
+        if conn is not None:
+            conn.execute("DELETE FROM llm_cache")
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._memory_hits + self._disk_hits + self._misses
+            return {
+                "enabled": self.enabled,
+                "ttl": self.ttl,
+                "memory_entries": len(self._memory),
+                "memory_size": self._memory.maxsize,
+                "disk_entries_limit": self.disk_entries,
+                "memory_hits": self._memory_hits,
+                "disk_hits": self._disk_hits,
+                "misses": self._misses,
+                "writes": self._writes,
+                "evictions": self._evictions,
+                "disk_errors": self._disk_errors,
+                "hit_rate": round((self._memory_hits + self._disk_hits) / lookups, 4) if lookups else None
+            }
+
+
+llm_cache = LLMCache()
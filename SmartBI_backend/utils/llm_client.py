@@ -0,0 +1,270 @@
+"""
+大模型客户端模块
+
+本模块提供全进程共用的异步大模型（OpenAI 兼容接口）客户端，包括：
+
+功能列表：
+1. 连接复用
+   - 使用 AsyncOpenAI 和一个 httpx.AsyncClient 连接池，保持长连接，避免每次调用重新建立连接和 TLS 握手
+   - 连接数和空闲连接数由 LLM_MAX_CONNECTIONS / LLM_MAX_KEEPALIVE 配置
+
+2. 并发控制和超时
+   - 同时进行的调用数不超过 LLM_MAX_CONCURRENCY，超出的调用在事件循环中等待，不占用线程
+   - 每次调用使用 LLM_TIMEOUT 超时，可按调用覆盖
+
+3. 重试
+   - 连接失败、超时、限流（429）和服务端错误（5xx）按带随机抖动的指数退避重试
+   - 退避等待期间不占用并发名额
+
+4. 流式调用
+   - 逐段返回回复内容，流开始前的失败按相同策略重试，开始后的失败直接抛出
+   - 整个流读取期间占用一个并发名额
+
+5. 运行指标
+   - 等待数、执行数、调用数、重试数、失败数
+   - 接口返回的输入、输出 token 累计数
+   - 传入 LLMUsage 时记录本次调用的模型、token 数和耗时
+   - 排队等待时间和调用耗时直方图
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+import openai
+from openai import AsyncOpenAI
+from tenacity import AsyncRetrying, retry_if_exception_type, stop_after_attempt, wait_random_exponential
+
+from config import (
+    LLM_API_KEY, LLM_BASE_URL, LLM_MODEL, LLM_MAX_CONCURRENCY, LLM_MAX_CONNECTIONS, LLM_MAX_KEEPALIVE,
+    LLM_TIMEOUT, LLM_CONNECT_TIMEOUT, LLM_MAX_RETRIES, LLM_RETRY_MAX_WAIT
+)
+from utils.metrics import LatencyHistogram
+from utils.llm_usage import LLMUsage
+from utils.tokens import count_tokens
+
+logger = logging.getLogger(__name__)
+
+# 大模型调用耗时直方图分桶上限（毫秒）
+LLM_LATENCY_BUCKETS_MS = (100, 500, 1000, 2500, 5000, 10000, 20000, 40000, 60000, 120000)
+
+# 可以重试的错误：连接失败和超时（APITimeoutError 是 APIConnectionError 的子类）、限流、服务端错误
+RETRYABLE_ERRORS = (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)
+
+
+class LLMClient:
+    """异步大模型客户端，连接池、并发上限和重试策略在所有调用间共用"""
+
+    def __init__(self, api_key: str = LLM_API_KEY, base_url: str = LLM_BASE_URL, model: str = LLM_MODEL,
+                 max_concurrency: int = LLM_MAX_CONCURRENCY, timeout: float = LLM_TIMEOUT,
+                 max_retries: int = LLM_MAX_RETRIES, retry_max_wait: float = LLM_RETRY_MAX_WAIT,
+                 http_client: Optional[httpx.AsyncClient] = None):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.retry_max_wait = retry_max_wait
+        self._http_client = http_client
+        self._client: Optional[AsyncOpenAI] = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._running = 0
+        self._calls = 0
+        self._retries = 0
+        self._failed = 0
+        self._input_tokens = 0
+        self._output_tokens = 0
+        self.queue_wait = LatencyHistogram()
+        self.duration = LatencyHistogram(LLM_LATENCY_BUCKETS_MS)
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        """首次使用时创建 AsyncOpenAI 客户端和连接池"""
+        if self._client is None:
+            http_client = self._http_client or httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=LLM_MAX_CONNECTIONS, max_keepalive_connections=LLM_MAX_KEEPALIVE),
+                timeout=httpx.Timeout(self.timeout, connect=LLM_CONNECT_TIMEOUT)
+            )
+            # 重试由本类统一处理，关闭 SDK 自带的重试
+            self._client = AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=0,
+                                       timeout=self.timeout, http_client=http_client)
+        return self._client
+
+    @asynccontextmanager
+    async def _slot(self):
+        """占用一个并发名额"""
+        submitted = time.perf_counter()
+        with self._lock:
+            self._waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            with self._lock:
+                self._waiting -= 1
+        started = time.perf_counter()
+        self.queue_wait.observe(started - submitted)
+        with self._lock:
+            self._running += 1
+        try:
+            yield
+        finally:
+            self._semaphore.release()
+            self.duration.observe(time.perf_counter() - started)
+            with self._lock:
+                self._running -= 1
+
+    def _record_usage(self, usage: Optional[LLMUsage], model: str, started: float, response_usage,
+                      reply: Optional[str] = None, failed: bool = False):
+        """累计接口返回的 token 数，并填写调用方传入的用量对象"""
+        input_tokens = response_usage.prompt_tokens if response_usage is not None else None
+        output_tokens = response_usage.completion_tokens if response_usage is not None else None
+        with self._lock:
+            self._input_tokens += input_tokens or 0
+            self._output_tokens += output_tokens or 0
+        if usage is None:
+            return
+        usage.model = model
+        usage.input_tokens = input_tokens
+        # 接口未返回用量时按回复内容计算输出 token 数
+        usage.output_tokens = output_tokens if output_tokens is not None or reply is None else count_tokens(reply)
+        usage.latency_ms = int((time.perf_counter() - started) * 1000)
+        if failed:
+            usage.status = 'failed'
+
+    def _before_retry(self, retry_state):
+        with self._lock:
+            self._retries += 1
+        logger.warning(f"大模型调用失败，第 {retry_state.attempt_number} 次重试: {retry_state.outcome.exception()}")
+
+    async def chat(self, messages: List[Dict[str, str]], timeout: Optional[float] = None,
+                   usage: Optional[LLMUsage] = None, **kwargs) -> str:
+        """
+        调用对话补全接口，返回第一条回复的内容
+
+        Args:
+            messages: 对话消息列表
+            timeout: 本次调用的超时秒数，默认使用 LLM_TIMEOUT
+            usage: 传入时填写本次调用的模型、token 数和耗时
+            **kwargs: 传给 chat.completions.create 的其他参数（如 temperature）
+
+        Raises:
+            openai.APIError: 重试用尽或遇到不可重试的错误
+        """
+        model = kwargs.pop('model', self.model)
+        started = time.perf_counter()
+        with self._lock:
+            self._calls += 1
+        try:
+            async for attempt in AsyncRetrying(
+                stop=stop_after_attempt(self.max_retries + 1),
+                wait=wait_random_exponential(multiplier=1, max=self.retry_max_wait),
+                retry=retry_if_exception_type(RETRYABLE_ERRORS),
+                before_sleep=self._before_retry,
+                reraise=True
+            ):
+                with attempt:
+                    async with self._slot():
+                        response = await self.client.chat.completions.create(
+                            model=model,
+                            messages=messages,
+                            timeout=timeout or self.timeout,
+                            stream=False,
+                            **kwargs
+                        )
+        except Exception:
+            with self._lock:
+                self._failed += 1
+            self._record_usage(usage, model, started, None, failed=True)
+            raise
+        self._record_usage(usage, model, started, response.usage)
+        return response.choices[0].message.content
+
+    async def chat_stream(self, messages: List[Dict[str, str]], timeout: Optional[float] = None,
+                          usage: Optional[LLMUsage] = None, **kwargs) -> AsyncIterator[str]:
+        """
+        流式调用对话补全接口，逐段返回回复内容
+
+        Args:
+            messages: 对话消息列表
+            timeout: 等待相邻两段内容的超时秒数，默认使用 LLM_TIMEOUT
+            usage: 传入时在流结束后填写本次调用的模型、token 数和耗时
+            **kwargs: 传给 chat.completions.create 的其他参数（如 temperature）
+
+        Raises:
+            openai.APIError: 建立流时重试用尽或遇到不可重试的错误，或读取过程中连接中断
+        """
+        model = kwargs.pop('model', self.model)
+        started = time.perf_counter()
+        parts = []
+        response_usage = None
+        with self._lock:
+            self._calls += 1
+        try:
+            async for attempt in AsyncRetrying(
+                stop=stop_after_attempt(self.max_retries + 1),
+                wait=wait_random_exponential(multiplier=1, max=self.retry_max_wait),
+                retry=retry_if_exception_type(RETRYABLE_ERRORS),
+                before_sleep=self._before_retry,
+                reraise=True
+            ):
+                with attempt:
+                    # 建立流失败时释放并发名额，成功后名额和流一起转交给下面的读取过程
+                    async with AsyncExitStack() as attempt_stack:
+                        await attempt_stack.enter_async_context(self._slot())
+                        stream = await self.client.chat.completions.create(
+                            model=model,
+                            messages=messages,
+                            timeout=timeout or self.timeout,
+                            stream=True,
+                            # 最后一个分块返回本次调用的 token 用量
+                            stream_options={"include_usage": True},
+                            **kwargs
+                        )
+                        attempt_stack.push_async_callback(stream.close)
+                        stack = attempt_stack.pop_all()
+            async with stack:
+                async for chunk in stream:
+                    if chunk.usage is not None:
+                        response_usage = chunk.usage
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        parts.append(chunk.choices[0].delta.content)
+                        yield chunk.choices[0].delta.content
+        except Exception:
+            with self._lock:
+                self._failed += 1
+            self._record_usage(usage, model, started, response_usage, ''.join(parts), failed=True)
+            raise
+        self._record_usage(usage, model, started, response_usage, ''.join(parts))
+
+    async def aclose(self):
+        """关闭连接池，应用退出时调用"""
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = {
+                "model": self.model,
+                "max_concurrency": self.max_concurrency,
+                "waiting": self._waiting,
+                "running": self._running,
+                "calls": self._calls,
+                "retries": self._retries,
+                "failed": self._failed,
+                "input_tokens": self._input_tokens,
+                "output_tokens": self._output_tokens
+            }
+        counts["queue_wait_ms"] = self.queue_wait.snapshot()
+        counts["duration_ms"] = self.duration.snapshot()
+        return counts
+
+
+llm_client = LLMClient()
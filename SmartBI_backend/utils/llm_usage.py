@@ -0,0 +1,65 @@
+"""
+大模型调用用量模块
+
+本模块记录每次大模型调用的 token 用量和耗时，包括：
+
+功能列表：
+1. 用量对象
+   - 调用方按调用场景（generate_chart / audit_summary）创建，传给 AiService 和 LLMClient 填写
+   - 发送前计算的提示语 token 数、接口返回的输入/输出 token 数（流式调用未返回时按回复内容计算输出 token 数）、
+     耗时（含重试）、是否命中结果缓存、调用结果
+   - 调用结果在大模型调用失败、回复解析失败或后续处理失败时记为 failed，由出错的一方设置
+
+2. 持久化
+   - 调用结束后写入 llm_usage 表，关联用户和图表
+   - 写入失败只记录日志，不影响调用结果
+"""
+
+import logging
+from typing import Any, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from database import models
+
+logger = logging.getLogger(__name__)
+
+
+class LLMUsage:
+    """一次大模型调用的用量"""
+
+    def __init__(self, endpoint: str, user_id: Optional[int] = None):
+        self.endpoint = endpoint
+        self.user_id = user_id
+        self.model: Optional[str] = None
+        self.prompt_tokens: Optional[int] = None
+        self.input_tokens: Optional[int] = None
+        self.output_tokens: Optional[int] = None
+        self.latency_ms: Optional[int] = None
+        self.cached = False
+        self.status = 'succeeded'
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "endpoint": self.endpoint,
+            "model": self.model,
+            "user_id": self.user_id,
+            "prompt_tokens": self.prompt_tokens,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "latency_ms": self.latency_ms,
+            "cached": int(self.cached),
+            "status": self.status
+        }
+
+
+def save_usage(db: Session, usage: LLMUsage, chart_id: Optional[int] = None):
+    """写入 llm_usage 表并提交，发送前失败（没有调用大模型也没有命中缓存）时不写入"""
+    if usage.model is None:
+        return
+    try:
+        db.add(models.LlmUsage(chart_id=chart_id, **usage.to_dict()))
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"记录大模型调用用量失败: {str(e)}")
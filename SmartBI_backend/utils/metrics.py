@@ -0,0 +1,137 @@
+"""
+运行指标模块
+
+本模块收集服务运行时的性能指标，包括：
+
+功能列表：
+1. 延迟直方图
+   - 按固定的毫秒分桶累计观测次数，同时记录总次数、总耗时和最大耗时
+   - 线程安全，可在同步路由线程、后台任务线程和事件循环中同时记录
+
+2. 数据库连接池指标
+   - 连接池注册后可随时读取当前连接数、溢出连接数等状态
+   - 使用 InstrumentedQueuePool 的连接池额外报告取连接的等待次数、等待时间、超时次数和耗时分布
+"""
+
+import threading
+from typing import Any, Dict, Optional, Sequence
+
+from sqlalchemy.engine import Engine
+
+# 延迟直方图分桶上限（毫秒）
+LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class LatencyHistogram:
+    """延迟直方图，分桶计数为累计值（小于等于该上限的观测次数）"""
+
+    def __init__(self, buckets_ms: Sequence[float] = LATENCY_BUCKETS_MS):
+        self.buckets_ms = tuple(buckets_ms)
+        self._counts = [0] * (len(self.buckets_ms) + 1)
+        self._count = 0
+        self._sum_ms = 0.0
+        self._max_ms = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        """记录一次观测"""
+        ms = seconds * 1000
+        with self._lock:
+            for i, bound in enumerate(self.buckets_ms):
+                if ms <= bound:
+                    self._counts[i] += 1
+                    break
+            else:
+                self._counts[-1] += 1
+            self._count += 1
+            self._sum_ms += ms
+            self._max_ms = max(self._max_ms, ms)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """返回当前统计，buckets 的键为分桶上限（毫秒），最后一个为 +Inf"""
+        with self._lock:
+            buckets = {}
+            total = 0
+            for bound, count in zip(self.buckets_ms + ('+Inf',), self._counts):
+                total += count
+                buckets[str(bound)] = total
+            return {
+                "count": self._count,
+                "sum_ms": round(self._sum_ms, 3),
+                "max_ms": round(self._max_ms, 3),
+                "avg_ms": round(self._sum_ms / self._count, 3) if self._count else None,
+                "buckets": buckets
+            }
+
+
+class PoolStats:
+    """连接池取连接的统计"""
+
+    def __init__(self):
+        self.checkout_latency = LatencyHistogram()
+        self._waits = 0
+        self._wait_seconds = 0.0
+        self._timeouts = 0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, waited: bool, timed_out: bool = False):
+        """
+        记录一次取连接
+
+        Args:
+            seconds: 取连接耗时，包括等待和新建连接
+            waited: 取连接时连接池已满，需要等待其他请求归还连接
+            timed_out: 等待超过 pool_timeout 后失败
+        """
+        self.checkout_latency.observe(seconds)
+        with self._lock:
+            if waited:
+                self._waits += 1
+                self._wait_seconds += seconds
+            if timed_out:
+                self._timeouts += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            waits = {
+                "waits": self._waits,
+                "wait_seconds": round(self._wait_seconds, 3),
+                "timeouts": self._timeouts
+            }
+        waits["checkout_latency_ms"] = self.checkout_latency.snapshot()
+        return waits
+
+
+# 已注册的数据库引擎，键为名称（sync/async）
+_engines: Dict[str, Engine] = {}
+
+
+def register_engine(name: str, engine):
+    """注册数据库引擎，异步引擎按其同步引擎注册"""
+    _engines[name] = getattr(engine, 'sync_engine', engine)
+
+
+def pool_metrics(engine: Engine) -> Dict[str, Any]:
+    """读取一个引擎的连接池状态"""
+    pool = engine.pool
+    metrics: Dict[str, Any] = {"pool_class": type(pool).__name__}
+    if hasattr(pool, 'checkedout'):
+        metrics.update({
+            "pool_size": pool.size(),
+            "max_overflow": pool._max_overflow,
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            # 连接池未满时 overflow() 为负数，表示还可在池内新建的连接数
+            "overflow": max(pool.overflow(), 0),
+            "timeout": pool.timeout(),
+            "recycle": pool._recycle
+        })
+    stats: Optional[PoolStats] = getattr(pool, 'stats', None)
+    if stats is not None:
+        metrics.update(stats.snapshot())
+    return metrics
+
+
+def collect_pool_metrics() -> Dict[str, Dict[str, Any]]:
+    """读取所有已注册引擎的连接池状态"""
+    return {name: pool_metrics(engine) for name, engine in _engines.items()}
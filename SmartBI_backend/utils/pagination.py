@@ -0,0 +1,95 @@
+"""
+游标分页模块
+
+本模块提供列表接口使用的游标分页工具，包括：
+
+功能列表：
+1. 游标编解码
+   - 游标为上一页最后一行排序键（如 (create_time, id) 或 id）的 URL 安全 Base64 编码，对客户端不透明
+   - 下一页查询使用 WHERE 排序键 < 游标 代替 OFFSET，每页代价与页码无关
+   - 解码时按排序键逐个校验类型，格式正确但类型不符的游标同样视为无效
+
+2. 总数缓存
+   - 列表总数按表名和查询条件缓存 PAGE_TOTAL_CACHE_TTL 秒，翻页时不再每次统计全表
+   - 数据写入后按表名失效
+"""
+
+import base64
+import json
+import threading
+from datetime import datetime
+from typing import Any, Callable, Hashable, List, Optional, Sequence, Tuple, Type, Union
+
+from cachetools import TTLCache
+
+from config import PAGE_TOTAL_CACHE_TTL
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """将排序键编码为游标，datetime 按 ISO 格式保存"""
+    payload = [{"dt": value.isoformat()} if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+# 游标中排序键的类型，数值不包括 bool
+CursorType = Union[Type, Tuple[Type, ...]]
+NUMBER = (int, float)
+
+
+def decode_cursor(cursor: str, types: Sequence[CursorType]) -> List[Any]:
+    """
+    解码游标
+
+    Args:
+        cursor: encode_cursor 生成的游标
+        types: 每个排序键的类型，如 (datetime, int)
+
+    Raises:
+        ValueError: 游标格式不正确或排序键类型不符
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        values = [datetime.fromisoformat(value["dt"]) if isinstance(value, dict) else value for value in payload]
+    except (ValueError, TypeError, KeyError) as e:
+        raise ValueError(f"无效的分页游标: {cursor}") from e
+    if not isinstance(values, list) or len(values) != len(types) or not all(
+        isinstance(value, expected) and not isinstance(value, bool) for value, expected in zip(values, types)
+    ):
+        raise ValueError(f"无效的分页游标: {cursor}")
+    return values
+
+
+def split_page(rows: Sequence[Any], size: int, sort_key: Callable[[Any], Sequence[Any]]) -> Tuple[Sequence[Any], Optional[str]]:
+    """
+    拆分多取一行的查询结果
+
+    查询时 LIMIT size + 1，多出的一行说明还有下一页，返回本页数据和下一页游标（没有下一页时为 None）
+    """
+    if len(rows) <= size:
+        return rows, None
+    rows = rows[:size]
+    return rows, encode_cursor(sort_key(rows[-1]))
+
+
+# 列表总数缓存，键为 (表名, 查询条件...)
+_lock = threading.Lock()
+_totals = TTLCache(maxsize=1024, ttl=PAGE_TOTAL_CACHE_TTL)
+
+
+def get_cached_total(key: Hashable) -> Optional[int]:
+    with _lock:
+        return _totals.get(key)
+
+
+def cache_total(key: Hashable, total: int):
+    with _lock:
+        _totals[key] = total
+
+
+def invalidate_totals(table: str):
+    """删除某张表的全部总数缓存，在数据写入后调用"""
+    with _lock:
+        for key in [key for key in _totals.keys() if key[0] == table]:
+            _totals.pop(key, None)
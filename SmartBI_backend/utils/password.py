@@ -0,0 +1,144 @@
+"""
+密码哈希模块
+
+本模块在独立的有界线程池中执行 bcrypt 计算，包括：
+
+功能列表：
+1. 哈希和校验
+   - bcrypt.hashpw / bcrypt.checkpw 在专用线程池中执行，不占用事件循环和阻塞调用线程池
+   - bcrypt 计算期间释放 GIL，线程数即同时进行的哈希计算数，由 PASSWORD_HASH_WORKERS 配置
+   - 排队任务超过 PASSWORD_HASH_MAX_QUEUE 时直接拒绝（PasswordHasherBusy），避免登录高峰时请求无限堆积
+
+2. 成本因子
+   - 新哈希使用 BCRYPT_ROUNDS 配置的成本因子
+   - needs_rehash 判断已有哈希的成本因子是否低于配置值
+
+3. 运行指标
+   - 排队数、执行数、完成数、拒绝数
+   - 排队等待时间和计算耗时直方图
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+import bcrypt
+
+from config import BCRYPT_ROUNDS, PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_QUEUE
+from utils.metrics import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordHasherBusy(RuntimeError):
+    """哈希线程池排队已满"""
+
+
+def hash_rounds(hashed: str) -> int:
+    """
+    读取 bcrypt 哈希的成本因子
+
+    Raises:
+        ValueError: 不是 bcrypt 哈希
+    """
+    parts = hashed.split('$')
+    if len(parts) != 4 or not parts[2].isdigit():
+        raise ValueError("不是 bcrypt 哈希")
+    return int(parts[2])
+
+
+class PasswordHasher:
+    """在有界线程池中执行 bcrypt 计算"""
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, max_queue: int = PASSWORD_HASH_MAX_QUEUE,
+                 rounds: int = BCRYPT_ROUNDS):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.rounds = rounds
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bcrypt')
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self.queue_wait = LatencyHistogram()
+        self.duration = LatencyHistogram()
+
+    def submit(self, func: Callable[..., Any], *args) -> Future:
+        """
+        提交任务到哈希线程池
+
+        Raises:
+            PasswordHasherBusy: 排队任务数已达上限
+        """
+        with self._lock:
+            if self._queued >= self.max_queue:
+                self._rejected += 1
+                raise PasswordHasherBusy(f"密码哈希排队任务已达上限 {self.max_queue}")
+            self._queued += 1
+        submitted = time.perf_counter()
+
+        def task():
+            started = time.perf_counter()
+            self.queue_wait.observe(started - submitted)
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+            try:
+                return func(*args)
+            finally:
+                self.duration.observe(time.perf_counter() - started)
+                with self._lock:
+                    self._running -= 1
+                    self._completed += 1
+
+        return self._executor.submit(task)
+
+    def hash_sync(self, password: str) -> str:
+        """在当前线程计算哈希，只应在哈希线程池内调用"""
+        return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds=self.rounds)).decode()
+
+    async def hash(self, password: str) -> str:
+        """使用配置的成本因子计算密码哈希"""
+        return await asyncio.wrap_future(self.submit(self.hash_sync, password))
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        """
+        校验密码
+
+        Raises:
+            ValueError: hashed 不是 bcrypt 哈希（例如历史明文密码）
+        """
+        # 先在事件循环中检查格式，非 bcrypt 哈希不占用哈希线程池
+        hash_rounds(hashed)
+        return await asyncio.wrap_future(
+            self.submit(bcrypt.checkpw, password.encode(), hashed.encode())
+        )
+
+    def needs_rehash(self, hashed: str) -> bool:
+        """哈希的成本因子低于配置值时需要重新计算"""
+        try:
+            return hash_rounds(hashed) < self.rounds
+        except ValueError:
+            return True
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "rounds": self.rounds,
+                "queued": self._queued,
+                "running": self._running,
+                "completed": self._completed,
+                "rejected": self._rejected
+            }
+        counts["queue_wait_ms"] = self.queue_wait.snapshot()
+        counts["duration_ms"] = self.duration.snapshot()
+        return counts
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,111 @@
+"""
+空间索引模块
+
+本模块提供存量机房的内存空间索引，包括：
+
+功能列表：
+1. 空间索引
+   - 将经纬度映射为单位球面上的三维坐标并构建 KD 树
+   - 半径查询和 K 近邻查询，返回 haversine 距离
+
+存量机房的索引由 utils.data_snapshot 中的快照持有，随快照版本一起重建。
+"""
+
+from typing import Tuple
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from utils.geo_utils import EARTH_RADIUS_KM, NeighborSet, haversine_distance
+
+# 弦长查询半径的放大系数，避免浮点误差漏掉恰好位于边界上的点
+_CHORD_TOLERANCE = 1 + 1e-9
+
+
+def to_unit_vectors(latitude: np.ndarray, longitude: np.ndarray) -> np.ndarray:
+    """将经纬度（度）转换为单位球面上的三维坐标"""
+    lat = np.radians(np.asarray(latitude, dtype=np.float64))
+    lng = np.radians(np.asarray(longitude, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.column_stack((cos_lat * np.cos(lng), cos_lat * np.sin(lng), np.sin(lat)))
+
+
+def chord_length(distance_km: float) -> float:
+    """球面距离（公里）对应的单位球弦长"""
+    return float(2 * np.sin(min(distance_km / EARTH_RADIUS_KM, np.pi) / 2))
+
+
+class SpatialIndex:
+    """基于单位球面三维坐标 KD 树的空间索引"""
+
+    def __init__(self, latitude: np.ndarray, longitude: np.ndarray):
+        """
+        Args:
+            latitude, longitude: 被索引点的坐标（度），查询结果中的下标即其在数组中的位置
+        """
+        self.latitude = np.asarray(latitude, dtype=np.float64)
+        self.longitude = np.asarray(longitude, dtype=np.float64)
+        self.tree = cKDTree(to_unit_vectors(self.latitude, self.longitude)) if len(self.latitude) else None
+
+    def __len__(self) -> int:
+        return len(self.latitude)
+
+    def query_radius(self, latitude: np.ndarray, longitude: np.ndarray, radius_km: float) -> NeighborSet:
+        """
+        半径查询
+
+        Args:
+            latitude, longitude: 查询点坐标（度）
+            radius_km: 半径（公里）
+
+        Returns:
+            NeighborSet: 每个查询点半径内的索引点下标及距离
+        """
+        lat = np.atleast_1d(np.asarray(latitude, dtype=np.float64))
+        lng = np.atleast_1d(np.asarray(longitude, dtype=np.float64))
+        offsets = np.zeros(len(lat) + 1, dtype=np.int64)
+        if self.tree is None or len(lat) == 0:
+            return NeighborSet(offsets, np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64))
+
+        candidates = self.tree.query_ball_point(
+            to_unit_vectors(lat, lng),
+            chord_length(radius_km) * _CHORD_TOLERANCE,
+            return_sorted=True
+        )
+
+        indices = []
+        distances = []
+        for i, candidate in enumerate(candidates):
+            candidate = np.asarray(candidate, dtype=np.int64)
+            distance = haversine_distance(lat[i], lng[i], self.latitude[candidate], self.longitude[candidate])
+            keep = distance <= radius_km
+            indices.append(candidate[keep])
+            distances.append(distance[keep])
+            offsets[i + 1] = offsets[i] + int(keep.sum())
+
+        return NeighborSet(offsets, np.concatenate(indices), np.concatenate(distances))
+
+    def query_knn(self, latitude: np.ndarray, longitude: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        K 近邻查询
+
+        Args:
+            latitude, longitude: 查询点坐标（度）
+            k: 近邻个数，超过索引点数时取索引点数
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: 形状为 (查询点数, k) 的下标和距离（公里），按距离升序
+        """
+        lat = np.atleast_1d(np.asarray(latitude, dtype=np.float64))
+        lng = np.atleast_1d(np.asarray(longitude, dtype=np.float64))
+        k = min(k, len(self))
+        if self.tree is None or k <= 0 or len(lat) == 0:
+            return np.empty((len(lat), 0), dtype=np.int64), np.empty((len(lat), 0), dtype=np.float64)
+
+        _, indices = self.tree.query(to_unit_vectors(lat, lng), k=list(range(1, k + 1)))
+        distances = haversine_distance(
+            lat[:, np.newaxis], lng[:, np.newaxis],
+            self.latitude[indices], self.longitude[indices]
+        )
+        return indices, distances
+
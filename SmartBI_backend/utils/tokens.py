@@ -0,0 +1,137 @@
+"""
+token 计数与预算模块
+
+本模块提供发送给大模型之前的 token 计数和提示语预算控制，包括：
+
+功能列表：
+1. token 计数
+   - 使用 tiktoken 编码器计数，编码器在进程内只加载一次
+   - 编码文件从 TIKTOKEN_CACHE_DIR 读取，离线部署时预先放入；无法加载时按字符估算
+     （中日韩字符约每字一个 token，其他字符约每 4 个字符一个 token）
+   - 对话消息按 OpenAI 的消息格式额外计入每条消息的固定开销
+
+2. 截断
+   - 按 token 截断文本，保留开头并加上截断标记
+
+3. 提示语预算
+   - 提示语按可截断的部分（如政策内容、数据）拼装，超出接口的 token 上限时按接口指定的顺序依次截断
+   - 未列入截断顺序的部分（如任务说明、输出格式要求）不截断，截断后仍超出上限时抛出异常，不发送请求
+"""
+
+import os
+import re
+import math
+import logging
+from functools import lru_cache
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from config import LLM_TOKEN_ENCODING, TIKTOKEN_CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+# 中日韩文字和全角符号，每个字符约占一个 token
+_WIDE_CHARS = re.compile(r'[\u2e80-\u9fff\uac00-\ud7af\uf900-\ufaff\uff00-\uffef]')
+
+# 对话消息格式的固定开销：每条消息 3 个 token，回复的起始标记 3 个 token
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+
+TRUNCATED_MARK = "……（内容过长，已截断）"
+
+
+class PromptTooLargeError(ValueError):
+    """不可截断的部分已超出提示语 token 上限"""
+
+
+@lru_cache(maxsize=None)
+def get_encoder():
+    """加载 tiktoken 编码器，无法加载时返回 None（只尝试一次）"""
+    # tiktoken 从环境变量读取编码文件缓存目录
+    os.environ.setdefault("TIKTOKEN_CACHE_DIR", TIKTOKEN_CACHE_DIR)
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(LLM_TOKEN_ENCODING)
+    except Exception as e:
+        logger.warning(f"无法加载 tiktoken 编码 {LLM_TOKEN_ENCODING}，改为按字符估算 token 数: {str(e)}")
+        return None
+
+
+def estimate_tokens(text: str) -> int:
+    """按字符估算文本的 token 数"""
+    wide = _WIDE_CHARS.subn('', text)[1]
+    return wide + math.ceil((len(text) - wide) / 4)
+
+
+def count_tokens(text: str) -> int:
+    """计算文本的 token 数"""
+    encoder = get_encoder()
+    if encoder is None:
+        return estimate_tokens(text)
+    return len(encoder.encode(text, disallowed_special=()))
+
+
+def count_message_tokens(messages: List[Dict[str, str]]) -> int:
+    """计算对话消息的 token 数"""
+    return sum(TOKENS_PER_MESSAGE + count_tokens(message["content"]) for message in messages) + TOKENS_PER_REPLY
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """截断文本使其不超过 max_tokens 个 token，截断时在末尾加上截断标记"""
+    if count_tokens(text) <= max_tokens:
+        return text
+    keep = max_tokens - count_tokens(TRUNCATED_MARK)
+    if keep <= 0:
+        return ""
+    encoder = get_encoder()
+    if encoder is not None:
+        return encoder.decode(encoder.encode(text, disallowed_special=())[:keep]) + TRUNCATED_MARK
+    # 按字符估算时二分查找能保留的最长前缀
+    low, high = 0, len(text)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if estimate_tokens(text[:middle]) <= keep:
+            low = middle
+        else:
+            high = middle - 1
+    return text[:low] + TRUNCATED_MARK
+
+
+def fit_prompt(
+    build: Callable[[Dict[str, str]], List[Dict[str, str]]],
+    sections: Dict[str, str],
+    budget: int,
+    truncate_order: Sequence[str]
+) -> Tuple[List[Dict[str, str]], int]:
+    """
+    在 token 上限内拼装提示语
+
+    Args:
+        build: 由各部分内容生成对话消息的函数
+        sections: 可截断部分的名称和内容
+        budget: 对话消息的 token 上限
+        truncate_order: 超出上限时依次截断的部分名称
+
+    Returns:
+        (对话消息, token 数)
+
+    Raises:
+        PromptTooLargeError: 截断全部可截断部分后仍超出上限
+    """
+    originals, sections = sections, dict(sections)
+    messages = build(sections)
+    total = count_message_tokens(messages)
+    for name in truncate_order:
+        if total <= budget:
+            break
+        original_tokens = limit = count_tokens(originals[name])
+        # 每次从原文截断，拼装后的 token 数与各部分之和略有出入时继续缩小
+        while total > budget and limit > 0:
+            limit = max(limit - (total - budget), 0)
+            sections[name] = truncate_tokens(originals[name], limit)
+            messages = build(sections)
+            total = count_message_tokens(messages)
+        logger.info(f"提示语超出 token 上限 {budget}，{name} 从 {original_tokens} tokens 截断为 {limit} tokens")
+    if total > budget:
+        raise PromptTooLargeError(f"提示语约 {total} tokens，超出上限 {budget}")
+    return messages, total
+
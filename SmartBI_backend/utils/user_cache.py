@@ -0,0 +1,90 @@
+"""
+认证缓存模块
+
+本模块缓存 get_current_user 使用的用户信息和已验证的令牌，包括：
+
+功能列表：
+1. 用户信息缓存
+   - 按用户ID缓存，超过 USER_CACHE_TTL 秒或超出 USER_CACHE_SIZE 条（按最近使用淘汰）后失效
+   - 修改密码（包括登录后的密码哈希升级）时由 database.crud 调用 invalidate_user 立即失效；
+     以后新增修改角色、删除用户的接口时同样需要调用
+
+2. 令牌缓存
+   - 缓存已验证签名的令牌对应的用户ID，同一令牌的后续请求不再验证签名
+   - 缓存时间取 TOKEN_CACHE_TTL 和令牌剩余有效期中较短的一个
+
+缓存在进程内，多进程部署时各进程独立缓存，失效只作用于当前进程，其他进程依靠过期时间失效。
+"""
+
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from cachetools import TLRUCache, TTLCache
+
+from config import USER_CACHE_TTL, USER_CACHE_SIZE, TOKEN_CACHE_TTL, TOKEN_CACHE_SIZE
+
+
+def _token_expire_at(token: str, entry, now: float) -> float:
+    """令牌缓存的过期时刻（time.monotonic 时间），entry 为 (用户ID, 令牌 exp)"""
+    _, exp = entry
+    ttl = TOKEN_CACHE_TTL
+    if exp is not None:
+        ttl = min(ttl, exp - time.time())
+    return now + ttl
+
+
+# cachetools 的缓存不是线程安全的，同步路由线程和事件循环共用一把锁
+_lock = threading.Lock()
+_users = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+_tokens = TLRUCache(maxsize=TOKEN_CACHE_SIZE, ttu=_token_expire_at)
+
+
+def get_cached_user(user_id: int) -> Optional[Dict[str, Any]]:
+    """读取缓存的用户信息，返回副本"""
+    with _lock:
+        user_info = _users.get(user_id)
+    return dict(user_info) if user_info is not None else None
+
+
+def cache_user(user_id: int, user_info: Dict[str, Any]):
+    """缓存用户信息"""
+    with _lock:
+        _users[user_id] = dict(user_info)
+
+
+def get_cached_token(token: str) -> Optional[int]:
+    """读取已验证令牌对应的用户ID"""
+    with _lock:
+        entry = _tokens.get(token)
+    return entry[0] if entry is not None else None
+
+
+def cache_token(token: str, user_id: int, exp: Optional[float] = None):
+    """
+    缓存已验证的令牌
+
+    Args:
+        token: 令牌
+        user_id: 令牌中的用户ID
+        exp: 令牌的过期时间戳（payload 中的 exp），没有时按 TOKEN_CACHE_TTL 过期
+    """
+    if exp is not None and exp <= time.time():
+        return
+    with _lock:
+        _tokens[token] = (user_id, exp)
+
+
+def invalidate_user(user_id: int):
+    """删除用户信息缓存和该用户的令牌缓存"""
+    with _lock:
+        _users.pop(user_id, None)
+        for token in [token for token, (cached_id, _) in _tokens.items() if cached_id == user_id]:
+            _tokens.pop(token, None)
+
+
+def clear():
+    """清空全部认证缓存"""
+    with _lock:
+        _users.clear()
+        _tokens.clear()